@@ -0,0 +1,159 @@
+import argparse
+import collections
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import kociemba
+
+from cubecore import check_facelets, faces_to_facelets
+from tracing import span
+
+# --- Batch Solver ---
+# Solves many cube states across a process pool and streams the results as JSONL.
+# Each input line is one of:
+#   * a bare 54-character facelet string
+#   * a JSON string holding a facelet string
+#   * a JSON object with a "facelet_string" key (like cube_solution.json)
+#   * a cube_detected.json / cube_colors.json-style document on a single line
+# Usage:  python batchsolve.py scans.jsonl > solutions.jsonl
+#         cat scans.jsonl | python batchsolve.py --workers 8 --verify
+WARM_UP_STATE = "DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD" # From test.py
+CHUNKS_IN_FLIGHT_PER_WORKER = 2  # Submitted chunks per worker; input is only read this far ahead
+
+
+def parse_line(line):
+    """Turns one input line into a facelet string (raises ValueError for unusable lines)."""
+    text = line.strip()
+    if len(text) == 54 and text.isalpha():
+        return text
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        raise ValueError("Neither a facelet string nor JSON")
+    if isinstance(data, str):
+        return data.strip()
+    if isinstance(data, dict) and "facelet_string" in data:
+        return data["facelet_string"].strip()
+    if isinstance(data, dict):
+        return faces_to_facelets(data)
+    raise ValueError("Unsupported JSON document")
+
+
+def warm_up_worker():
+    """Pool initializer: loads the Kociemba pruning tables once per worker process."""
+    kociemba.solve(WARM_UP_STATE)
+
+
+def solve_one(item):
+    """Solves one (index, facelet_string) pair inside a worker; never raises."""
+    index, facelet_string = item
+    started = time.perf_counter()
+    try:
+        check_facelets(facelet_string)
+        with span("kociemba.solve", "solve"):
+            solution = kociemba.solve(facelet_string)
+        return {"index": index, "facelet_string": facelet_string, "solution": solution,
+                "seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"index": index, "facelet_string": facelet_string, "error": str(e),
+                "seconds": time.perf_counter() - started}
+
+
+def solve_chunk(items):
+    """Solves a list of (index, facelet_string) pairs in one worker call."""
+    return [solve_one(item) for item in items]
+
+
+def solve_stream(pool, items, workers, chunksize):
+    """
+    Yields solve_one() results in input order as soon as they are ready. Unlike pool.map(),
+    which submits the whole input first, only a bounded window of chunks is in flight, so
+    input is read while results are written.
+    """
+    pending = collections.deque()
+    items = iter(items)
+    while chunk := list(itertools.islice(items, chunksize)):
+        pending.append(pool.submit(solve_chunk, chunk))
+        if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values), math.ceil(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[rank]
+
+
+def verify_result(result):
+    """Marks a result whose solution does not solve its state (checked on the cube model)."""
+    from cubestate import CubeState
+
+    if "solution" in result:
+        result["verified"] = CubeState.from_string(result["facelet_string"]).apply(result["solution"]).is_solved()
+
+
+def read_items(stream, failures, output):
+    """Yields (index, facelet_string) for every usable line; reports unusable lines as failures."""
+    for index, line in enumerate(stream):
+        if not line.strip():
+            continue
+        try:
+            yield index, parse_line(line)
+        except (ValueError, KeyError, IndexError) as e:
+            failures.append(index)
+            output.write(json.dumps({"index": index, "error": f"Could not parse input: {e}"}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many cube states in parallel and report throughput.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of states ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=4, help="States handed to a worker at a time")
+    parser.add_argument("--verify", action="store_true", help="Check every solution on the cube model")
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.input == "-" else open(args.input, "r")
+    output = sys.stdout
+    failures = []
+    latencies = []
+    solved_count = 0
+
+    workers = args.workers or os.cpu_count()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up_worker) as pool:
+        for result in solve_stream(pool, read_items(stream, failures, output), workers, args.chunksize):
+            latencies.append(result["seconds"])
+            if args.verify:
+                verify_result(result)
+            if "error" in result or result.get("verified") is False:
+                failures.append(result["index"])
+            else:
+                solved_count += 1
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    elapsed = time.perf_counter() - started
+
+    if stream is not sys.stdin:
+        stream.close()
+
+    latencies.sort()
+    report = [
+        f"Solved {solved_count} states in {elapsed:.2f} s ({solved_count / elapsed if elapsed else 0:.1f} solves/s)",
+        f"Latency p50 {percentile(latencies, 50) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f} ms",
+        f"Failures: {len(failures)}" + (f" (lines {', '.join(str(i + 1) for i in sorted(failures)[:20])})" if failures else ""),
+    ]
+    print("\n".join(report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,234 @@
+import argparse
 import cv2
 import numpy as np
 import json
 import os
 
+from colorlut import MIN_STICKER_AREA, build_lut_file, get_classifier
+from videopipeline import VideoPipeline
+
 def nothing(x):
     pass
 
 # Color names to calibrate
 colors = ["Red", "Blue", "Yellow", "Green", "Orange", "White"]
-hsv_ranges = {}
-
-cap = cv2.VideoCapture(2)
-cv2.namedWindow("Calibration")
-
-# Create trackbars
-for t in ["L-H", "L-S", "L-V", "U-H", "U-S", "U-V"]:
-    cv2.createTrackbar(t, "Calibration", 0 if 'L' in t else 255, 255, nothing)
-
-# Calibration loop
-for color in colors:
-    print(f"Calibrating {color}... Press SPACE when ready to save this color.")
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+
+def main():
+    hsv_ranges = {}
+
+    # Current trackbar bounds, written by this (UI) thread and read by the processing thread
+    bounds = {"lower": np.array([0, 0, 0]), "upper": np.array([255, 255, 255])}
+
+    def process(frame):
         frame = cv2.resize(frame, (640, 480))
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, bounds["lower"], bounds["upper"])
+        return cv2.bitwise_and(frame, frame, mask=mask)
+
+    # Capture and masking run on their own threads (see videopipeline.py)
+    pipeline = VideoPipeline(process).start()
+    cv2.namedWindow("Calibration")
+
+    # Create trackbars
+    for t in ["L-H", "L-S", "L-V", "U-H", "U-S", "U-V"]:
+        cv2.createTrackbar(t, "Calibration", 0 if 'L' in t else 255, 255, nothing)
+
+    # Calibration loop
+    for color in colors:
+        print(f"Calibrating {color}... Press SPACE when ready to save this color.")
+        while True:
+            # Get HSV values from trackbars
+            l_h = cv2.getTrackbarPos("L-H", "Calibration")
+            l_s = cv2.getTrackbarPos("L-S", "Calibration")
+            l_v = cv2.getTrackbarPos("L-V", "Calibration")
+            u_h = cv2.getTrackbarPos("U-H", "Calibration")
+            u_s = cv2.getTrackbarPos("U-S", "Calibration")
+            u_v = cv2.getTrackbarPos("U-V", "Calibration")
+
+            lower = np.array([l_h, l_s, l_v])
+            upper = np.array([u_h, u_s, u_v])
+            bounds["lower"], bounds["upper"] = lower, upper
+
+            processed = pipeline.latest()
+            if processed is None and pipeline.finished.is_set():
+                break
+            if processed is not None:
+                result = processed.result
+                cv2.putText(result, f"{color}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255,255,255), 2)
+                cv2.putText(result, pipeline.report(), (10, 470), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255,255,255), 1)
+                cv2.imshow("Calibration", result)
+                pipeline.displayed(processed)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == 32:  # SPACE to save
+                hsv_ranges[color] = {
+                    "lower": lower.tolist(),
+                    "upper": upper.tolist()
+                }
+                break
+            elif key == 27:
+                break
+
+    print("Pipeline:", pipeline.report())
+    pipeline.stop()
+    cv2.destroyAllWindows()
+
+    # Save HSV ranges
+    with open("cube_config.json", "w") as f:
+        json.dump(hsv_ranges, f, indent=4)
+    print("Saved to hsv_ranges.json ✅")
+
+# --- Headless Calibration ---
+# Fits the color ranges from a few frames of a solved cube instead of trackbars: every frame
+# shows one face (nine stickers of one color). The stickers are found without any color
+# model (bright blobs separated by the dark plastic), the inner part of each is sampled,
+# and per-color HSV bounds are fitted with percentiles. Hue is circular, so it is rotated
+# around its circular mean before taking percentiles; the resulting range may wrap
+# (lower H > upper H), which colorlut.py understands. Nearly unsaturated colors (white)
+# get the full hue range. The fitted cube_config.json is compiled into its lookup table
+# right away, so the detector starts without a rebuild.
+# Usage:  python calibration.py --headless red.png blue.png ...   (color from the file name)
+#         python calibration.py --headless sessions/cal1           (visionbench.py session; one
+#                                                                   SPACE press per color, in `colors` order)
+HUE_RANGE = 180              # OpenCV 8-bit hue covers 0..179
+FIT_PERCENTILES = (1, 99)
+HUE_MARGIN = 4
+SV_MARGIN = 20
+WHITE_MAX_SATURATION = 60    # Median saturation below this: fit S/V only, accept any hue
+SAMPLE_FRAMES = 5            # Session frames used per SPACE press (the press and the ones before it)
+
+def find_sticker_boxes(frame):
+    """Boxes (x, y, w, h) of the sticker-like bright, roughly square blobs in a BGR frame."""
+    value = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[:, :, 2]
+    _, bright = cv2.threshold(value, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    bright = cv2.morphologyEx(bright, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(bright)
+    boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, count)
+             if stats[i, cv2.CC_STAT_AREA] >= MIN_STICKER_AREA and 0.6 <= stats[i, 2] / stats[i, 3] <= 1.6]
+    if not boxes:
+        return []
+    # Keep the nine blobs closest in size to the typical sticker
+    median_area = np.median([w * h for _, _, w, h in boxes])
+    return sorted(boxes, key=lambda box: abs(box[2] * box[3] - median_area))[:9]
+
+def sample_stickers(frame, boxes):
+    """HSV pixels (N, 3) from the inner half of every box, away from edges and glare on the borders."""
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    patches = [hsv[y + h // 4:y + h - h // 4, x + w // 4:x + w - w // 4].reshape(-1, 3) for x, y, w, h in boxes]
+    return np.concatenate(patches) if patches else np.empty((0, 3), np.uint8)
+
+def circular_mean_hue(hues):
+    angles = hues.astype(np.float64) * 2 * np.pi / HUE_RANGE
+    return np.arctan2(np.sin(angles).mean(), np.cos(angles).mean()) * HUE_RANGE / (2 * np.pi) % HUE_RANGE
+
+def fit_hsv_range(pixels):
+    """Percentile HSV bounds {"lower": [h, s, v], "upper": [h, s, v]} for one color's pixels."""
+    low_p, high_p = FIT_PERCENTILES
+    s_low, v_low = np.percentile(pixels[:, 1:], low_p, axis=0) - SV_MARGIN
+    s_high, v_high = np.percentile(pixels[:, 1:], high_p, axis=0) + SV_MARGIN
+    if np.median(pixels[:, 1]) < WHITE_MAX_SATURATION:
+        h_low, h_high = 0, HUE_RANGE - 1
+    else:
+        # Rotate the hue so its circular mean sits in the middle of the range, take the
+        # percentiles there and rotate back (a red range then wraps around 0/179)
+        shift = HUE_RANGE // 2 - int(round(circular_mean_hue(pixels[:, 0])))
+        rotated = (pixels[:, 0].astype(np.int32) + shift) % HUE_RANGE
+        h_low = int(np.percentile(rotated, low_p)) - HUE_MARGIN - shift
+        h_high = int(np.percentile(rotated, high_p)) + HUE_MARGIN - shift
+        if h_high - h_low >= HUE_RANGE - 1:
+            h_low, h_high = 0, HUE_RANGE - 1
+        else:
+            h_low, h_high = h_low % HUE_RANGE, h_high % HUE_RANGE
+    clip = lambda value: int(min(max(value, 0), 255))
+    return {"lower": [h_low, clip(s_low), clip(v_low)], "upper": [h_high, clip(s_high), clip(v_high)]}
+
+def hue_mask(hsv_range):
+    """Boolean mask over the 180 hues covered by a (possibly wrapping) range."""
+    hues = np.arange(HUE_RANGE)
+    low, high = hsv_range["lower"][0], hsv_range["upper"][0]
+    return (hues >= low) & (hues <= high) if low <= high else (hues >= low) | (hues <= high)
+
+def separate_hues(hsv_ranges, hue_means):
+    """
+    Neighbouring colors (red/orange) can get overlapping hue ranges from the margins; the
+    overlap is split halfway between the two colors' mean hues.
+    """
+    chromatic = [color for color in hsv_ranges if color in hue_means]
+    for a_index, a in enumerate(chromatic):
+        for b in chromatic[a_index + 1:]:
+            if not (hue_mask(hsv_ranges[a]) & hue_mask(hsv_ranges[b])).any():
+                continue
+            low, high = (a, b) if (hue_means[b] - hue_means[a]) % HUE_RANGE < HUE_RANGE / 2 else (b, a)
+            boundary = int(hue_means[low] + ((hue_means[high] - hue_means[low]) % HUE_RANGE) / 2) % HUE_RANGE
+            hsv_ranges[low]["upper"][0] = boundary
+            hsv_ranges[high]["lower"][0] = (boundary + 1) % HUE_RANGE
+
+def load_samples(inputs):
+    """{color: [frames]} from image files named after colors, or from a recorded session."""
+    samples = {}
+    if len(inputs) == 1 and os.path.isdir(inputs[0]):
+        from visionbench import iter_frames, load_keys
+        presses = sorted(index for index, key in load_keys(inputs[0]).items() if key == 32)
+        frames = list(iter_frames(inputs[0]))
+        for color, press in zip(colors, presses):
+            samples[color] = frames[max(press - SAMPLE_FRAMES + 1, 0):press + 1]
+        return samples
+    for position, path in enumerate(inputs):
+        stem = os.path.splitext(os.path.basename(path))[0].split("_")[0].capitalize()
+        color = stem if stem in colors else colors[position]
+        frame = cv2.imread(path)
+        if frame is None:
+            raise ValueError(f"Could not read image {path}")
+        samples.setdefault(color, []).append(frame)
+    return samples
+
+def calibrate_headless(inputs, config_path="cube_config.json"):
+    """Fits every color found in the inputs, writes the config and its lookup table."""
+    pixels = {}
+    for color, frames in load_samples(inputs).items():
+        color_pixels = []
+        for frame in frames:
+            boxes = find_sticker_boxes(frame)
+            if len(boxes) < 9:
+                print(f"⚠️ {color}: only {len(boxes)} stickers found in one frame.")
+            color_pixels.append(sample_stickers(frame, boxes))
+        pixels[color] = np.concatenate(color_pixels)
+
+    hsv_ranges = {}
+    hue_means = {}
+    for color in colors:
+        if color not in pixels or not len(pixels[color]):
+            print(f"⚠️ No samples for {color}; it is left out of the config.")
+            continue
+        hsv_ranges[color] = fit_hsv_range(pixels[color])
+        if np.median(pixels[color][:, 1]) >= WHITE_MAX_SATURATION:
+            hue_means[color] = circular_mean_hue(pixels[color][:, 0])
+    separate_hues(hsv_ranges, hue_means)
+
+    for color in hsv_ranges:
+        print(f"{color:<7} lower {hsv_ranges[color]['lower']}  upper {hsv_ranges[color]['upper']}  "
+              f"({len(pixels[color])} pixels)")
+
+    with open(config_path, "w") as f:
+        json.dump(hsv_ranges, f, indent=4)
+    print(f"Saved to {config_path} and compiled {build_lut_file(config_path)} ✅")
+
+    # How the compiled table classifies the samples it was fitted on
+    classifier = get_classifier(config_path)
+    label_names = np.array([""] + classifier.colors)
+    for color, color_pixels in pixels.items():
+        if color in hsv_ranges:
+            correct = np.mean(label_names[classifier.lookup(color_pixels)] == color)
+            print(f"  {color:<7} {100 * correct:5.1f}% of sampled pixels classified correctly")
+    return hsv_ranges
 
-        # Get HSV values from trackbars
-        l_h = cv2.getTrackbarPos("L-H", "Calibration")
-        l_s = cv2.getTrackbarPos("L-S", "Calibration")
-        l_v = cv2.getTrackbarPos("L-V", "Calibration")
-        u_h = cv2.getTrackbarPos("U-H", "Calibration")
-        u_s = cv2.getTrackbarPos("U-S", "Calibration")
-        u_v = cv2.getTrackbarPos("U-V", "Calibration")
-
-        lower = np.array([l_h, l_s, l_v])
-        upper = np.array([u_h, u_s, u_v])
-
-        mask = cv2.inRange(hsv, lower, upper)
-        result = cv2.bitwise_and(frame, frame, mask=mask)
-
-        cv2.putText(result, f"{color}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255,255,255), 2)
-        cv2.imshow("Calibration", result)
-
-        key = cv2.waitKey(1) & 0xFF
-        if key == 32:  # SPACE to save
-            hsv_ranges[color] = {
-                "lower": lower.tolist(),
-                "upper": upper.tolist()
-            }
-            break
-        elif key == 27:
-            break
-
-cap.release()
-cv2.destroyAllWindows()
-
-# Save HSV ranges
-with open("cube_config.json", "w") as f:
-    json.dump(hsv_ranges, f, indent=4)
-print("Saved to hsv_ranges.json ✅")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the sticker colors.")
+    parser.add_argument("--headless", nargs="+", metavar="INPUT",
+                        help="Fit from images named after colors (red.png ...) or a visionbench.py session")
+    parser.add_argument("--config", default="cube_config.json")
+    args = parser.parse_args()
+    if args.headless:
+        calibrate_headless(args.headless, args.config)
+    else:
+        main()
@@ -0,0 +1,153 @@
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# --- HSV Lookup Table ---
+# The calibrated ranges in cube_config.json are compiled once into a 256x256x256 table
+# mapping every (H, S, V) triple to a label: 0 for "no color", n for the n-th color of
+# the config. It is indexed [V, S, H], so the flat index of a pixel is simply its HSV
+# bytes plus a zero byte read as one little-endian uint32. The table (16 MB) is saved as a .npy next to the config and memory-mapped,
+# so classifying a frame is a single vectorized lookup instead of one inRange() plus
+# dilate/open per color. It is rebuilt whenever the config is newer than the table.
+#
+# Overlapping ranges: the most specific range (smallest HSV box) wins.
+# Hue wrap-around: a range whose lower H is above its upper H covers H >= lower or H <= upper.
+CONFIG_FILE = "cube_config.json"
+LUT_SUFFIX = ".lut.npy"
+SMOOTHING_KERNEL = 5      # Median filter on the label image; replaces the per-mask dilate + open
+MIN_STICKER_AREA = 2000   # Smaller blobs are noise, not stickers
+
+COLORS_BGR = {
+    "Red": (0, 0, 255),
+    "Blue": (255, 0, 0),
+    "Yellow": (0, 255, 255),
+    "Green": (0, 255, 0),
+    "Orange": (0, 128, 255),
+    "White": (255, 255, 255)
+}
+
+
+def lut_path(config_path=CONFIG_FILE):
+    """cube_config.json -> cube_config.lut.npy"""
+    return os.path.splitext(config_path)[0] + LUT_SUFFIX
+
+
+def hue_slices(lower_h, upper_h):
+    """Hue index ranges covered by a calibrated range, splitting ranges that wrap around."""
+    if lower_h <= upper_h:
+        return [slice(lower_h, upper_h + 1)]
+    return [slice(lower_h, 256), slice(0, upper_h + 1)]
+
+
+def box_volume(ranges):
+    lower, upper = ranges["lower"], ranges["upper"]
+    hue = upper[0] - lower[0] + 1 if lower[0] <= upper[0] else 180 - lower[0] + upper[0] + 1  # OpenCV hue is 0..179
+    return hue * max(upper[1] - lower[1] + 1, 0) * max(upper[2] - lower[2] + 1, 0)
+
+
+def compile_lut(color_ranges, out=None):
+    """Fills a (256, 256, 256) uint8 table, indexed [V, S, H], with 1-based color labels in config order."""
+    lut = np.zeros((256, 256, 256), dtype=np.uint8) if out is None else out
+    lut[...] = 0
+    labels = {color: label for label, color in enumerate(color_ranges, start=1)}
+
+    # Largest boxes first, so more specific ranges overwrite them where they overlap
+    for color in sorted(color_ranges, key=lambda color: box_volume(color_ranges[color]), reverse=True):
+        lower, upper = color_ranges[color]["lower"], color_ranges[color]["upper"]
+        for hue in hue_slices(lower[0], upper[0]):
+            lut[lower[2]:upper[2] + 1, lower[1]:upper[1] + 1, hue] = labels[color]
+    return lut
+
+
+def build_lut_file(config_path=CONFIG_FILE):
+    """Compiles the config into its .npy table on disk and returns the path."""
+    with open(config_path, "r") as f:
+        color_ranges = json.load(f)
+    path = lut_path(config_path)
+    lut = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(256, 256, 256))
+    compile_lut(color_ranges, out=lut)
+    lut.flush()
+    del lut
+    return path
+
+
+class ColorClassifier:
+    """Classifies HSV frames into label images with the memory-mapped lookup table."""
+
+    def __init__(self, config_path=CONFIG_FILE):
+        with open(config_path, "r") as f:
+            self.colors = list(json.load(f))
+        path = lut_path(config_path)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(config_path):
+            build_lut_file(config_path)
+        self.lut = np.load(path, mmap_mode="r")
+        self.flat_lut = self.lut.reshape(-1)
+
+    def color_name(self, label):
+        return self.colors[label - 1]
+
+    def lookup(self, hsv_pixels):
+        """Labels for an array of HSV pixels of any shape (..., 3), without smoothing."""
+        hsv_pixels = np.asarray(hsv_pixels)
+        h, s, v = (hsv_pixels[..., channel].astype(np.int32) for channel in range(3))
+        return np.take(self.flat_lut, (v << 16) | (s << 8) | h)
+
+    def classify(self, hsv_frame):
+        """Label image (uint8, 0 = no color) for an HSV frame, smoothed with one median filter."""
+        if np.little_endian:
+            pixels = cv2.cvtColor(hsv_frame, cv2.COLOR_BGR2BGRA)  # Appends a fourth byte per pixel...
+            pixels[..., 3] = 0                                    # ...zeroed, so each pixel reads as H | S << 8 | V << 16
+            index = pixels.view(np.uint32)[..., 0]
+            labels = np.take(self.flat_lut, index)
+        else:
+            labels = self.lookup(hsv_frame)
+        return cv2.medianBlur(labels, SMOOTHING_KERNEL)
+
+
+_classifiers = {}
+
+
+def get_classifier(config_path=CONFIG_FILE):
+    """Returns a cached classifier, reloading it only when the config file changes."""
+    mtime = os.path.getmtime(config_path)
+    cached = _classifiers.get(config_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, ColorClassifier(config_path))
+        _classifiers[config_path] = cached
+    return cached[1]
+
+
+def find_stickers(label_image, min_area=MIN_STICKER_AREA):
+    """
+    One connected-components pass over the label image. A pixel whose earlier neighbour
+    (left, up-left, up or up-right) has a different color is cut, so touching stickers of
+    different colors never join. Returns [(x, y, w, h, label)] for blobs of min_area pixels or more.
+    """
+    foreground = label_image > 0
+    # (pixel slice, earlier-neighbour slice) for the left, up-left, up and up-right neighbours
+    neighbours = [
+        ((slice(None), slice(1, None)), (slice(None), slice(None, -1))),
+        ((slice(1, None), slice(1, None)), (slice(None, -1), slice(None, -1))),
+        ((slice(1, None), slice(None)), (slice(None, -1), slice(None))),
+        ((slice(1, None), slice(None, -1)), (slice(None, -1), slice(1, None))),
+    ]
+    for here, earlier in neighbours:
+        foreground[here] &= (label_image[here] == label_image[earlier]) | (label_image[earlier] == 0)
+
+    count, components, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+        foreground.view(np.uint8), 8, cv2.CV_32S, cv2.CCL_GRANA)
+    stickers = []
+    for i in np.nonzero(stats[1:, cv2.CC_STAT_AREA] >= min_area)[0] + 1:
+        x, y, w, h = (int(value) for value in stats[i, :4])
+        # The top row of a component's bounding box always holds one of its pixels
+        first = x + int(np.argmax(components[y, x:x + w] == i))
+        stickers.append((x, y, w, h, int(label_image[y, first])))
+    return stickers
+
+
+if __name__ == "__main__":
+    config = sys.argv[1] if len(sys.argv) > 1 else CONFIG_FILE
+    print(f"Compiled {config} into {build_lut_file(config)}")
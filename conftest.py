@@ -0,0 +1,55 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+import simulator
+from movestream import LineReader
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Executor:
+    """motorun.py running against simulator.py's fakes on a background thread (clock speed 0)."""
+
+    def __init__(self):
+        self.clock = simulator.SimulatedClock(0.0)
+        self.motorun, self.recorder = simulator.load_executor(self.clock, quiet=True)
+        self.motorun.HOST, self.motorun.PORT = "127.0.0.1", free_port()
+        self.motorun.setup_gpio()
+        threading.Thread(target=lambda: asyncio.run(self.motorun.main_server_loop()), daemon=True).start()
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            try:
+                socket.create_connection(self.address(), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.02)
+        raise RuntimeError("Simulated executor did not start")
+
+    def address(self):
+        return self.motorun.HOST, self.motorun.PORT
+
+    def connect(self):
+        """(socket, LineReader) of a new client connection."""
+        sock = socket.create_connection(self.address(), timeout=5)
+        return sock, LineReader(sock)
+
+
+@pytest.fixture(scope="session")
+def executor():
+    return Executor()
+
+
+@pytest.fixture
+def client(executor):
+    sock, reader = executor.connect()
+    yield sock, reader
+    sock.close()
+    time.sleep(0.05)  # Lets the executor release the control lock before the next client
@@ -0,0 +1,205 @@
+import multiprocessing
+import sys
+import time
+
+import kociemba
+import numpy as np
+
+from batchsolve import warm_up_worker
+from cubecore import FACE_LETTERS, KOCIEMBA_TO_MOTOR_MAP, check_facelets
+from cubestate import CubeState, sequence_permutation
+from motionprofile import MOTION_PROFILES, MOTOR_PROFILES, build_delay_table, move_duration_us, STEPS_PER_BASE_TURN
+from moveoptimizer import optimize_moves
+from movestream import group_motor_moves
+from tracing import span
+
+# --- Cost-Aware Solving ---
+# kociemba.solve() returns the first solution it finds, but move count is not execution
+# time on our robot: half turns need twice the microsteps and every command pays a fixed
+# settle and network overhead. Within a time budget we collect several candidates - the
+# same state solved in all 24 whole-cube orientations (the search finds different
+# solutions for each) and with tighter max_depth limits - score each with the robot cost
+# model below and keep the cheapest.
+TIME_BUDGET_S = 2.0
+MAX_DEPTHS = (24, 21, 20)  # Tighter limits find shorter solutions but take much longer
+
+# --- Execution Cost Model ---
+# Motor time per move comes from the motors' acceleration profiles (motionprofile.py,
+# built from STEPS_PER_BASE_TURN and the step delays) and includes the settle pause.
+COMMAND_OVERHEAD_MS = 3.0       # Ack / parsing / Wi-Fi cost per executor command
+PARALLEL_OPPOSITE_FACES = True  # Score opposite-face pairs as one parallel command, as solve.py sends them
+OPTIMIZE_MOVES = True           # Score the move list after moveoptimizer.py, as solve.py sends it
+
+
+def move_time_ms(motor_idx, turns, motor_profiles=MOTOR_PROFILES):
+    """Motor time of one move (including settle) under the motor's acceleration profile."""
+    table = build_delay_table(MOTION_PROFILES[motor_profiles[motor_idx]], STEPS_PER_BASE_TURN * turns)
+    return move_duration_us(table) / 1000
+
+
+MOVE_TIME_MS = {(motor_idx, turns): move_time_ms(motor_idx, turns) for motor_idx in range(6) for turns in (1, 2)}
+
+
+def estimate_execution_ms(moves, overhead_ms=COMMAND_OVERHEAD_MS, parallel=PARALLEL_OPPOSITE_FACES, optimize=OPTIMIZE_MOVES):
+    """Estimated robot time for a solution (string or list of moves)."""
+    if isinstance(moves, str):
+        moves = moves.split()
+    if optimize:
+        moves = optimize_moves(moves)
+    total = 0.0
+    for group in group_motor_moves(moves, KOCIEMBA_TO_MOTOR_MAP, parallel):
+        total += max(MOVE_TIME_MS[(motor_idx, turns)] for motor_idx, _, turns in group) + overhead_ms
+    return total
+
+
+def build_orientations():
+    """The 24 whole-cube orientations as rotation sequences ("" first), found by breadth-first search."""
+    orientations = {tuple(sequence_permutation("")): ""}
+    frontier = [""]
+    while frontier:
+        next_frontier = []
+        for rotation in frontier:
+            for step in ("x", "y", "z"):
+                candidate = (rotation + " " + step).strip()
+                key = tuple(sequence_permutation(candidate))
+                if key not in orientations:
+                    orientations[key] = candidate
+                    next_frontier.append(candidate)
+        frontier = next_frontier
+    return list(orientations.values())
+
+
+ORIENTATIONS = build_orientations()
+
+
+def reorient(facelet_string, rotation):
+    """
+    Views the cube after a whole-cube rotation. Returns the facelet string of that view
+    (relabelled so each center names its own face) and a map from the view's face letters
+    back to the physical faces, which is how solutions found in the view are translated.
+    """
+    perm = sequence_permutation(rotation)
+    codes = CubeState.from_string(facelet_string).facelets[perm]
+    view_to_physical = {FACE_LETTERS[face]: FACE_LETTERS[perm[9 * face + 4] // 9] for face in range(6)}
+    relabel = np.zeros(6, dtype=np.uint8)
+    for face in range(6):
+        relabel[codes[9 * face + 4]] = face
+    return CubeState(relabel[codes]).to_string(), view_to_physical
+
+
+def solve_candidate(task):
+    """Pool worker: solves one (facelet_string, rotation, max_depth) task; returns (rotation, max_depth, solution or None)."""
+    facelet_string, rotation, max_depth = task
+    view, view_to_physical = reorient(facelet_string, rotation)
+    try:
+        with span("kociemba.solve", "solve", rotation=rotation, max_depth=max_depth):
+            solution = kociemba.solve(view, max_depth=max_depth)
+    except ValueError:
+        return rotation, max_depth, None
+    moves = [view_to_physical[move[0]] + move[1:] for move in solution.split()]
+    return rotation, max_depth, " ".join(moves)
+
+
+# --- Solver Pool ---
+# Spawning workers and loading the Kociemba tables in each costs far more than a solve, so
+# one pool is kept for the life of the process and warmed up as it starts. Searches still
+# running when a budget expires cannot be cancelled; the pool is then replaced at once, and
+# the new one warms up while the robot executes instead of during the next search.
+POOL_START_S = 1.5  # Start-up until a new pool's first result; replaced by the measured time
+
+_pool = None
+_pool_workers = None
+_pool_started = None  # time.monotonic() when the pool started; None once it has returned a result
+_pool_start_s = POOL_START_S
+
+
+def start_pool(workers=None):
+    """Starts a fresh solver pool, replacing (and terminating) the current one."""
+    global _pool, _pool_workers, _pool_started
+    if _pool is not None:
+        _pool.terminate()
+    _pool = multiprocessing.get_context("spawn").Pool(workers, initializer=warm_up_worker)
+    _pool_workers = workers
+    _pool_started = time.monotonic()
+    return _pool
+
+
+def solver_pool(workers=None):
+    """The persistent solver pool, started on first use."""
+    if _pool is None or workers != _pool_workers:
+        return start_pool(workers)
+    return _pool
+
+
+def pool_delay_s():
+    """Expected wait before the solver pool can return its first result."""
+    if _pool is None:
+        return _pool_start_s
+    if _pool_started is None:
+        return 0.0
+    return max(_pool_start_s - (time.monotonic() - _pool_started), 0.0)
+
+
+def gather_candidates(facelet_string, time_budget_s=TIME_BUDGET_S, workers=None):
+    """
+    Solves the state in every orientation and depth limit until the budget runs out.
+    Returns a list of (estimated_ms, solution, rotation, max_depth), cheapest first.
+    Always waits for at least one solution, so an invalid state raises ValueError.
+    """
+    global _pool_started, _pool_start_s
+    check_facelets(facelet_string)  # Rejects impossible states before any work is queued
+    tasks = [(facelet_string, rotation, depth) for depth in MAX_DEPTHS for rotation in ORIENTATIONS]
+    started = time.monotonic()
+    deadline = started + time_budget_s  # Pool start-up and the first result are part of the budget
+    candidates = []
+    state = CubeState.from_string(facelet_string)
+
+    pool = solver_pool(workers)
+    results = pool.imap_unordered(solve_candidate, tasks)
+    finished = 0
+    for _ in tasks:
+        remaining = deadline - time.monotonic()
+        try:
+            rotation, max_depth, solution = results.next(timeout=max(remaining, 0) if candidates else None)
+        except multiprocessing.TimeoutError:
+            break
+        finished += 1
+        if _pool_started is not None:
+            if _pool_started >= started:  # Only a pool started by this call measures its start-up
+                _pool_start_s = time.monotonic() - _pool_started
+            _pool_started = None
+        # Every candidate is checked on the cube model before it can be chosen
+        if solution is not None and state.apply(solution).is_solved():
+            candidates.append((estimate_execution_ms(solution), solution, rotation, max_depth))
+        elif not candidates and rotation == "" and max_depth == MAX_DEPTHS[0]:
+            start_pool(workers)  # Drops the rest of this state's searches
+            raise ValueError(f"Could not solve cube state {facelet_string}")
+    if finished < len(tasks):
+        start_pool(workers)  # Drops the searches that did not finish within the budget
+
+    unique = {}
+    for candidate in candidates:
+        unique.setdefault(candidate[1], candidate)
+    return sorted(unique.values(), key=lambda candidate: (candidate[0], len(candidate[1].split())))
+
+
+def cheapest_solution(facelet_string, time_budget_s=TIME_BUDGET_S):
+    """
+    Drop-in replacement for kociemba.solve() that returns the cheapest candidate found.
+    Returns kociemba.solve()'s own solution when the pool cannot answer within the budget.
+    """
+    if time_budget_s <= pool_delay_s():
+        solver_pool()  # Warms up for the next call
+        check_facelets(facelet_string)
+        return kociemba.solve(facelet_string)
+    return gather_candidates(facelet_string, time_budget_s)[0][1]
+
+
+if __name__ == "__main__":
+    facelets = sys.argv[1] if len(sys.argv) > 1 else "DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD"
+    baseline = kociemba.solve(facelets)
+    print(f"kociemba.solve: {len(baseline.split())} moves, {estimate_execution_ms(baseline):.0f} ms  {baseline}")
+    candidates = gather_candidates(facelets)
+    print(f"{len(candidates)} candidates within {TIME_BUDGET_S}s, cheapest five:")
+    for estimated_ms, solution, rotation, max_depth in candidates[:5]:
+        print(f"  {estimated_ms:7.0f} ms  {len(solution.split()):2d} moves  [{rotation or '-'}, depth {max_depth}]  {solution}")
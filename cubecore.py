@@ -0,0 +1,274 @@
+# --- Shared Cube Definitions ---
+# Face names used in cube_detected.json / cube_colors.json, and their Kociemba letters.
+FACE_TO_LETTER = {
+    'Top': 'U',
+    'Right': 'R',
+    'Front': 'F',
+    'Bottom': 'D',
+    'Left': 'L',
+    'Back': 'B'
+}
+LETTER_TO_FACE = {letter: face for face, letter in FACE_TO_LETTER.items()}
+
+# Kociemba facelet strings list the faces in URFDLB order, 9 stickers each
+KOCIEMBA_FACE_ORDER = ['Top', 'Right', 'Front', 'Bottom', 'Left', 'Back']
+FACE_LETTERS = "URFDLB"
+SOLVED_FACELETS = "".join(letter * 9 for letter in FACE_LETTERS)
+# Opposite faces turn about the same axis, so their moves commute (URFDLB index i and i + 3)
+OPPOSITE_FACE = {letter: FACE_LETTERS[(index + 3) % 6] for index, letter in enumerate(FACE_LETTERS)}
+
+# Center colors of our cube (same as the fixed centers in manualinput.py)
+DEFAULT_CENTER_COLORS = {
+    'Front': 'white',
+    'Back': 'yellow',
+    'Left': 'red',
+    'Right': 'orange',
+    'Top': 'green',
+    'Bottom': 'blue'
+}
+
+# --- Kociemba Move to Motor Command Mapping ---
+# Kociemba move -> (motor_index, direction_code, base turns; see motionprofile.STEPS_PER_BASE_TURN).
+# Motor order U0 R1 F2 D3 L4 B5; it MUST match the wiring assumed by motorun.py on the Pico W.
+KOCIEMBA_TO_MOTOR_MAP = {
+    "U":   (0, 'CW',  1),  # Up face
+    "U'":  (0, 'CCW', 1),
+    "U2":  (0, 'CW',  2),
+    "U2'": (0, 'CCW', 2),  # Half turn driven CCW (see moveoptimizer.py)
+
+    "R":   (1, 'CW',  1),  # Right face
+    "R'":  (1, 'CCW', 1),
+    "R2":  (1, 'CW',  2),
+    "R2'": (1, 'CCW', 2),
+
+    "F":   (2, 'CW',  1),  # Front face
+    "F'":  (2, 'CCW', 1),
+    "F2":  (2, 'CW',  2),
+    "F2'": (2, 'CCW', 2),
+
+    "D":   (3, 'CW',  1),  # Down face
+    "D'":  (3, 'CCW', 1),
+    "D2":  (3, 'CW',  2),
+    "D2'": (3, 'CCW', 2),
+
+    "L":   (4, 'CW',  1),  # Left face
+    "L'":  (4, 'CCW', 1),
+    "L2":  (4, 'CW',  2),
+    "L2'": (4, 'CCW', 2),
+
+    "B":   (5, 'CW',  1),  # Back face
+    "B'":  (5, 'CCW', 1),
+    "B2":  (5, 'CW',  2),
+    "B2'": (5, 'CCW', 2),
+}
+OPPOSITE_MOTOR = {KOCIEMBA_TO_MOTOR_MAP[face][0]: KOCIEMBA_TO_MOTOR_MAP[OPPOSITE_FACE[face]][0] for face in FACE_LETTERS}
+
+
+def faces_to_facelets(cube_data):
+    """
+    Builds the 54-character Kociemba facelet string from a cube_detected.json-style
+    document ({face name: [9 colors]}), using each face's center color to identify it.
+    Raises ValueError if the colors cannot be mapped.
+    """
+    # Use center colors to map actual face colors
+    center_colors = {}
+    for face, squares in cube_data.items():
+        center_color = squares[4]  # center piece is always at index 4
+        center_colors[center_color] = FACE_TO_LETTER[face]
+
+    # Build the full facelet string in URFDLB order
+    facelet_string = ""
+    for face in KOCIEMBA_FACE_ORDER:
+        for color in cube_data[face]:
+            face_label = center_colors.get(color, 'X')
+            facelet_string += face_label
+
+    if 'X' in facelet_string or len(facelet_string) != 54:
+        raise ValueError("Color mapping incomplete or cube data invalid.")
+
+    return facelet_string
+
+
+def facelets_to_faces(facelet_string, center_colors=DEFAULT_CENTER_COLORS):
+    """Converts a facelet string back into a cube_detected.json-style document."""
+    letter_to_color = {FACE_TO_LETTER[face]: color for face, color in center_colors.items()}
+    cube_data = {}
+    for index, face in enumerate(KOCIEMBA_FACE_ORDER):
+        cube_data[face] = [letter_to_color[letter] for letter in facelet_string[9 * index:9 * index + 9]]
+    return cube_data
+
+
+# --- Cubie Model ---
+# The 8 corners and 12 edges in Kociemba's order, each listed by the facelet indices of
+# its stickers (into the 54-character string) and the faces those stickers show when the
+# piece is solved. The first sticker of every piece is its U/D (or F/B for FR..BR edges)
+# sticker, the one orientation is counted from.
+CORNER_NAMES = ["URF", "UFL", "ULB", "UBR", "DFR", "DLF", "DBL", "DRB"]
+CORNER_FACELETS = [(8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+                   (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51)]
+EDGE_NAMES = ["UR", "UF", "UL", "UB", "DR", "DF", "DL", "DB", "FR", "FL", "BL", "BR"]
+EDGE_FACELETS = [(5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25),
+                 (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14)]
+
+
+def permutation_parity(perm):
+    """0 for an even permutation, 1 for an odd one."""
+    return sum(perm[i] > perm[j] for i in range(len(perm)) for j in range(i + 1, len(perm))) % 2
+
+
+def cubies_to_facelets(corner_perm, corner_orient, edge_perm, edge_orient):
+    """
+    Builds the facelet string of a cubie state: corner_perm[i] is the corner sitting at
+    position i, twisted corner_orient[i] (0-2) clockwise; likewise for the edges (0-1 flips).
+    """
+    facelets = list(SOLVED_FACELETS)
+    for position, (piece, twist) in enumerate(zip(corner_perm, corner_orient)):
+        for n in range(3):
+            facelets[CORNER_FACELETS[position][(n + twist) % 3]] = CORNER_NAMES[piece][n]
+    for position, (piece, flip) in enumerate(zip(edge_perm, edge_orient)):
+        for n in range(2):
+            facelets[EDGE_FACELETS[position][(n + flip) % 2]] = EDGE_NAMES[piece][n]
+    return "".join(facelets)
+
+
+# --- State Validation ---
+# Cheap invariant checks run before a state reaches the solver, so a bad scan is rejected
+# in microseconds with the stickers at fault instead of a generic solver exception.
+# The checks run in stages; a stage only runs if the previous ones passed, because e.g.
+# cubies cannot be identified while a color is miscounted:
+#   1. 54 stickers of the six face letters, each center on its own face
+#   2. nine stickers of every color
+#   3. every corner and edge position holds a real piece, and every piece exactly once
+#   4. corner twists sum to a multiple of 3, edge flips to an even number
+#   5. corner and edge permutations have the same parity
+# Stickers are named like "Front 9 (F9)": face name and 1-9 in reading order.
+
+def sticker_name(index):
+    letter = FACE_LETTERS[index // 9]
+    return f"{LETTER_TO_FACE[letter]} {index % 9 + 1} ({letter}{index % 9 + 1})"
+
+
+def piece_stickers(facelets):
+    return ", ".join(sticker_name(index) for index in facelets)
+
+
+def read_corner(facelet_string, position):
+    """(piece, twist) of the corner at `position`, or None if its stickers match no corner."""
+    letters = [facelet_string[index] for index in CORNER_FACELETS[position]]
+    for twist in range(3):
+        if letters[twist] in "UD":
+            break
+    else:
+        return None
+    rotated = letters[twist] + letters[(twist + 1) % 3] + letters[(twist + 2) % 3]
+    if rotated not in CORNER_NAMES:
+        return None
+    return CORNER_NAMES.index(rotated), twist
+
+
+def read_edge(facelet_string, position):
+    """(piece, flip) of the edge at `position`, or None if its stickers match no edge."""
+    letters = "".join(facelet_string[index] for index in EDGE_FACELETS[position])
+    for flip, name in enumerate((letters, letters[::-1])):
+        if name in EDGE_NAMES:
+            return EDGE_NAMES.index(name), flip
+    return None
+
+
+def find_cubies(facelet_string, errors):
+    """Identifies every piece; appends an error per unknown or repeated piece. Returns (cp, co, ep, eo)."""
+    pieces = []
+    for kind, names, facelets, read in (("corner", CORNER_NAMES, CORNER_FACELETS, read_corner),
+                                        ("edge", EDGE_NAMES, EDGE_FACELETS, read_edge)):
+        perm, orient, seen = [], [], {}
+        for position in range(len(names)):
+            found = read(facelet_string, position)
+            if found is None:
+                shown = "".join(facelet_string[index] for index in facelets[position])
+                errors.append(f"The {kind} at {piece_stickers(facelets[position])} shows {shown}, "
+                              f"which no {kind} has")
+                continue
+            piece, orientation = found
+            if piece in seen:
+                errors.append(f"The {names[piece]} {kind} appears twice: at {piece_stickers(facelets[seen[piece]])} "
+                              f"and at {piece_stickers(facelets[position])}")
+            seen[piece] = position
+            perm.append(piece)
+            orient.append(orientation)
+        pieces += [perm, orient]
+    return pieces
+
+
+def find_state_errors(facelet_string):
+    """Returns a list of messages describing why the state is impossible (empty if it is valid)."""
+    if len(facelet_string) != 54:
+        return [f"A state has 54 stickers, got {len(facelet_string)}"]
+    errors = [f"{sticker_name(index)} is '{letter}', not a face letter"
+              for index, letter in enumerate(facelet_string) if letter not in FACE_LETTERS]
+    errors += [f"The center {sticker_name(9 * face + 4)} is '{facelet_string[9 * face + 4]}', expected '{letter}'"
+               for face, letter in enumerate(FACE_LETTERS) if facelet_string[9 * face + 4] != letter]
+    if errors:
+        return errors
+
+    for letter in FACE_LETTERS:
+        count = facelet_string.count(letter)
+        if count != 9:
+            errors.append(f"There are {count} stickers of the {LETTER_TO_FACE[letter]} color ({letter}), "
+                          f"expected 9")
+    if errors:
+        return errors
+
+    corner_perm, corner_orient, edge_perm, edge_orient = find_cubies(facelet_string, errors)
+    if errors:
+        return errors
+
+    if sum(corner_orient) % 3:
+        twisted = [CORNER_NAMES[position] for position, twist in enumerate(corner_orient) if twist]
+        errors.append(f"The corner twists add up to {sum(corner_orient) % 3}/3 of a turn: a corner is twisted "
+                      f"in place (corners not in their home orientation: {', '.join(twisted)})")
+    if sum(edge_orient) % 2:
+        flipped = [EDGE_NAMES[position] for position, flip in enumerate(edge_orient) if flip]
+        errors.append(f"An odd number of edges is flipped: an edge is flipped in place "
+                      f"(edges not in their home orientation: {', '.join(flipped)})")
+    if errors:
+        return errors
+
+    if permutation_parity(corner_perm) != permutation_parity(edge_perm):
+        errors.append("Two pieces are swapped: corner and edge permutations have different parity")
+    return errors
+
+
+def check_facelets(facelet_string):
+    """Raises ValueError listing every problem found by find_state_errors()."""
+    errors = find_state_errors(facelet_string)
+    if errors:
+        raise ValueError("Invalid cube state: " + "; ".join(errors))
+
+
+def check_faces(cube_data):
+    """
+    Checks a cube_detected.json-style document before it is mapped to facelets: six faces
+    of nine stickers and six different center colors. Raises ValueError.
+    """
+    errors = []
+    for face in KOCIEMBA_FACE_ORDER:
+        if face not in cube_data:
+            errors.append(f"The {face} face is missing")
+        elif len(cube_data[face]) != 9:
+            errors.append(f"The {face} face has {len(cube_data[face])} stickers, expected 9")
+    if errors:
+        raise ValueError("Invalid cube scan: " + "; ".join(errors))
+
+    faces_by_center = {}
+    for face in KOCIEMBA_FACE_ORDER:
+        faces_by_center.setdefault(cube_data[face][4], []).append(face)
+    for color, faces in faces_by_center.items():
+        if len(faces) > 1:
+            errors.append(f"The {' and '.join(faces)} faces both have a {color} center")
+    centers = set(faces_by_center)
+    for face in KOCIEMBA_FACE_ORDER:
+        for index, color in enumerate(cube_data[face]):
+            if color not in centers:
+                errors.append(f"{face} {index + 1} is {color}, which is no center's color")
+    if errors:
+        raise ValueError("Invalid cube scan: " + "; ".join(errors))
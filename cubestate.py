@@ -0,0 +1,187 @@
+import numpy as np
+
+from cubecore import FACE_LETTERS, faces_to_facelets, facelets_to_faces, DEFAULT_CENTER_COLORS
+
+# --- Facelet Geometry ---
+# Every sticker is identified by the position of its cubie (x right, y up, z front; each
+# -1, 0 or 1) and the outward normal of the face it is on. For each face: its normal, then
+# the directions in which the rows and columns of the Kociemba facelet layout run.
+FACE_AXES = {
+    'U': ((0, 1, 0), (0, 0, 1), (1, 0, 0)),
+    'R': ((1, 0, 0), (0, -1, 0), (0, 0, -1)),
+    'F': ((0, 0, 1), (0, -1, 0), (1, 0, 0)),
+    'D': ((0, -1, 0), (0, 0, -1), (1, 0, 0)),
+    'L': ((-1, 0, 0), (0, -1, 0), (0, 0, 1)),
+    'B': ((0, 0, -1), (0, -1, 0), (-1, 0, 0)),
+}
+
+# Whole-cube rotations, named as usual after the face turn they follow
+ROTATION_AXES = {'x': 'R', 'y': 'U', 'z': 'F'}
+
+
+def sticker_positions():
+    """Returns the (cubie position, normal) of each of the 54 facelets, in URFDLB order."""
+    stickers = []
+    for face in FACE_LETTERS:
+        normal, row_dir, col_dir = FACE_AXES[face]
+        for row in range(3):
+            for col in range(3):
+                position = tuple(n + (col - 1) * c + (row - 1) * r for n, r, c in zip(normal, row_dir, col_dir))
+                stickers.append((position, normal))
+    return stickers
+
+
+def rotate_clockwise(vector, axis):
+    """Rotates a vector 90 degrees clockwise as seen looking at the face whose normal is `axis`."""
+    dot = sum(a * v for a, v in zip(axis, vector))
+    cross = (
+        axis[1] * vector[2] - axis[2] * vector[1],
+        axis[2] * vector[0] - axis[0] * vector[2],
+        axis[0] * vector[1] - axis[1] * vector[0],
+    )
+    return tuple(axis[i] * dot - cross[i] for i in range(3))
+
+
+def quarter_turn_permutation(face, whole_cube=False):
+    """
+    Index array `perm` for a clockwise quarter turn of `face` (or of the whole cube about
+    that face's axis), such that new_facelets = old_facelets[perm].
+    """
+    stickers = sticker_positions()
+    index = {sticker: i for i, sticker in enumerate(stickers)}
+    axis = FACE_AXES[face][0]
+    perm = np.arange(54, dtype=np.intp)
+    for i, (position, normal) in enumerate(stickers):
+        if whole_cube or sum(a * p for a, p in zip(axis, position)) == 1:
+            perm[index[(rotate_clockwise(position, axis), rotate_clockwise(normal, axis))]] = i
+    return perm
+
+
+def power(perm, count):
+    """Applies a permutation `count` times."""
+    result = np.arange(54, dtype=np.intp)
+    for _ in range(count):
+        result = result[perm]
+    return result
+
+
+def build_move_permutations():
+    """Precompiles every face move (as in KOCIEMBA_TO_MOTOR_MAP) and whole-cube rotation to an index array."""
+    permutations = {}
+    quarter_turns = {face: quarter_turn_permutation(face) for face in FACE_LETTERS}
+    quarter_turns.update({name: quarter_turn_permutation(face, whole_cube=True) for name, face in ROTATION_AXES.items()})
+    for name, perm in quarter_turns.items():
+        permutations[name] = perm
+        permutations[name + "2"] = power(perm, 2)
+        permutations[name + "2'"] = permutations[name + "2"]  # Half turn driven CCW (see moveoptimizer.py)
+        permutations[name + "'"] = power(perm, 3)
+    return permutations
+
+
+MOVE_PERMUTATIONS = build_move_permutations()
+IDENTITY = np.arange(54, dtype=np.intp)
+SOLVED_ARRAY = np.repeat(np.arange(6, dtype=np.uint8), 9)
+LETTER_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _letter in enumerate(FACE_LETTERS):
+    LETTER_CODES[ord(_letter)] = _code
+
+
+def sequence_permutation(moves):
+    """Composes a move sequence (string or list) into a single index array."""
+    if isinstance(moves, str):
+        moves = moves.split()
+    result = IDENTITY
+    for move in moves:
+        if move not in MOVE_PERMUTATIONS:
+            raise ValueError(f"Unknown move '{move}'")
+        result = result[MOVE_PERMUTATIONS[move]]
+    return result
+
+
+def encode_facelets(facelet_strings):
+    """Converts facelet strings to an (N, 54) uint8 array of face codes (0-5 for URFDLB)."""
+    raw = np.frombuffer("".join(facelet_strings).encode('ascii'), dtype=np.uint8).reshape(-1, 54)
+    codes = LETTER_CODES[raw]
+    if (codes == 255).any():
+        raise ValueError("Facelet strings may only contain the letters URFDLB.")
+    return codes
+
+
+def decode_facelets(states):
+    """Converts an (N, 54) array of face codes back to a list of facelet strings."""
+    letters = np.frombuffer(FACE_LETTERS.encode('ascii'), dtype=np.uint8)[states]
+    return [row.tobytes().decode('ascii') for row in np.atleast_2d(letters)]
+
+
+def apply_batch(states, moves):
+    """Applies the same move sequence to every row of an (N, 54) state array at once."""
+    return states[:, sequence_permutation(moves)]
+
+
+def apply_sequences(states, sequences):
+    """Applies sequences[i] to states[i] for an (N, 54) state array."""
+    perms = np.stack([sequence_permutation(moves) for moves in sequences]) if len(sequences) else np.empty((0, 54), np.intp)
+    return np.take_along_axis(states, perms, axis=1)
+
+
+def solves(facelet_strings, solutions):
+    """Boolean array: does solutions[i] bring facelet_strings[i] to the solved state?"""
+    results = apply_sequences(encode_facelets(facelet_strings), solutions)
+    return (results == SOLVED_ARRAY).all(axis=1)
+
+
+class CubeState:
+    """A cube state backed by a NumPy array of 54 face codes in Kociemba facelet order."""
+
+    def __init__(self, facelets=None):
+        self.facelets = SOLVED_ARRAY.copy() if facelets is None else np.asarray(facelets, dtype=np.uint8)
+
+    @classmethod
+    def from_string(cls, facelet_string):
+        return cls(encode_facelets([facelet_string])[0])
+
+    @classmethod
+    def from_faces(cls, cube_data):
+        """Builds a state from a cube_detected.json / cube_colors.json-style document."""
+        return cls.from_string(faces_to_facelets(cube_data))
+
+    @classmethod
+    def from_moves(cls, moves):
+        """The state reached by applying `moves` to a solved cube."""
+        return cls().apply(moves)
+
+    def to_string(self):
+        return decode_facelets(self.facelets)[0]
+
+    def to_faces(self, center_colors=DEFAULT_CENTER_COLORS):
+        """Converts to a cube_detected.json-style document."""
+        return facelets_to_faces(self.to_string(), center_colors)
+
+    def apply(self, moves):
+        """Returns the state after applying a move sequence (string or list)."""
+        return CubeState(self.facelets[sequence_permutation(moves)])
+
+    def is_solved(self):
+        return bool((self.facelets == SOLVED_ARRAY).all())
+
+    def __eq__(self, other):
+        return isinstance(other, CubeState) and bool((self.facelets == other.facelets).all())
+
+    def __repr__(self):
+        return f"CubeState('{self.to_string()}')"
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    # Check that the stored solution really solves the stored state
+    filename = sys.argv[1] if len(sys.argv) > 1 else "cube_solution.json"
+    with open(filename, "r") as f:
+        data = json.load(f)
+    state = CubeState.from_string(data["facelet_string"])
+    if state.apply(data["solution"]).is_solved():
+        print(f"OK: the solution in {filename} solves its facelet string.")
+    else:
+        print(f"MISMATCH: the solution in {filename} does not solve {data['facelet_string']}.")
+        sys.exit(1)
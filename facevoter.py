@@ -0,0 +1,75 @@
+import numpy as np
+
+from cubecore import DEFAULT_CENTER_COLORS
+
+# --- Temporal Voting and Auto-Capture ---
+# A single noisy frame used to be enough to make a SPACE press fail or store a wrong
+# color. Instead, the last VOTE_FRAMES detections of each of the nine stickers are kept
+# in a ring buffer and every sticker takes the majority label. Once all nine majority
+# labels have stayed the same for STABLE_FRAMES frames the face is captured on its own.
+# Faces are identified by their center color, so they can be scanned in any order.
+VOTE_FRAMES = 7
+STABLE_FRAMES = 5
+VOTE_COLORS = list(DEFAULT_CENTER_COLORS.values())  # Index = label stored in the ring buffer
+NO_VOTE = -1                                         # Frame without nine stickers, or an unknown color
+
+
+class FaceVoter:
+    """Majority vote over the last frames of one face; reports a face once it is stable."""
+
+    def __init__(self, vote_frames=VOTE_FRAMES, stable_frames=STABLE_FRAMES, center_colors=DEFAULT_CENTER_COLORS):
+        self.ring = np.full((vote_frames, 9), NO_VOTE, dtype=np.int8)
+        self.position = 0
+        self.stable_frames = stable_frames
+        self.center_to_face = {color: face for face, color in center_colors.items()}
+        self.voted = None   # Last complete majority vote (tuple of 9 labels)
+        self.stable = 0     # Consecutive frames with that same vote
+        self.captured = None
+
+    def reset(self):
+        self.ring[:] = NO_VOTE
+        self.voted = None
+        self.stable = 0
+
+    def add(self, colors):
+        """Adds one frame's nine colors (reading order), or None when the frame had no full face."""
+        labels = NO_VOTE
+        if colors is not None and len(colors) == 9:
+            labels = [VOTE_COLORS.index(color) if color in VOTE_COLORS else NO_VOTE for color in colors]
+        self.ring[self.position] = labels
+        self.position = (self.position + 1) % len(self.ring)
+
+    def vote(self):
+        """Majority label per sticker, or None if any sticker lacks a strict majority."""
+        counts = (self.ring[:, :, None] == np.arange(len(VOTE_COLORS))).sum(axis=0)  # (9, colors)
+        if (counts.max(axis=1) * 2 <= len(self.ring)).any():
+            return None
+        return tuple(int(label) for label in counts.argmax(axis=1))
+
+    def update(self, colors):
+        """
+        Feeds one frame. Returns (face_name, [9 colors]) the first time a face has been
+        stable for stable_frames frames, otherwise None.
+        """
+        self.add(colors)
+        voted = self.vote()
+        if voted is None or voted != self.voted:
+            self.voted = voted
+            self.stable = 1 if voted is not None else 0
+            return None
+        self.stable += 1
+        if self.stable < self.stable_frames or voted == self.captured:
+            return None
+
+        face_colors = [VOTE_COLORS[label] for label in voted]
+        face_name = self.center_to_face.get(face_colors[4])
+        if face_name is None:
+            return None
+        self.captured = voted  # Not captured again until the camera sees a different face
+        return face_name, face_colors
+
+    def progress(self):
+        """Fraction of the way to an automatic capture, for the on-screen status."""
+        if self.voted is None or self.voted == self.captured:
+            return 0.0
+        return min(self.stable / self.stable_frames, 1.0)
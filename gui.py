@@ -1,42 +1,76 @@
 import tkinter as tk
-import subprocess
+
+from toolworker import ToolWorker
+
+POLL_INTERVAL_MS = 100 # How often the launcher checks for messages from the tool worker
+
+# Tools run in a persistent worker process (see toolworker.py) instead of a new python3 per click
+worker = ToolWorker()
 
 
 def run_calibration():
-    subprocess.run(["python3", "calibration.py"])
+    worker.submit("calibration")
 
 def run_visual_detection():
-    subprocess.run(["python3", "visualdetection.py"])
+    worker.submit("visualdetection")
 
 def run_manual_input():
-    subprocess.run(["python3", "manualinput.py"])
+    worker.submit("manualinput")
 
 def run_shuffle():
-    subprocess.run(["python3", "shuffle.py"])
+    worker.submit("shuffle")
 
 def run_solve():
-    subprocess.run(["python3", "solve.py"])
-    
-# Create the main window
-root = tk.Tk()
-root.title("Rubik's Cube Tools")
-root.geometry("200x350")
+    worker.submit("solve")
+
+def poll_worker(root, status):
+    """Shows worker progress and startup timings without blocking the Tk main loop."""
+    for event, name, seconds, error in worker.poll():
+        if event == "preloaded":
+            text = f"Preloaded {name} in {seconds * 1000:.0f} ms" + (f" (failed: {error})" if error else "")
+        elif event == "started":
+            text = f"{name}: started {seconds * 1000:.0f} ms after click"
+        elif event == "finished":
+            text = f"{name}: finished after {seconds:.1f} s"
+        else:
+            text = f"{name}: failed after {seconds:.1f} s ({error})"
+        print(text)
+        status.config(text=text)
+    root.after(POLL_INTERVAL_MS, poll_worker, root, status)
+
+def main():
+    worker.start() # Start (and warm up) the worker before any click
+
+    # Create the main window
+    root = tk.Tk()
+    root.title("Rubik's Cube Tools")
+    root.geometry("200x400")
+
+    # Create buttons
+    btn_calibration = tk.Button(root, text="Run Calibration", command=run_calibration, height=2, width=20)
+    btn_calibration.pack(pady=10)
+
+    btn_visual_detection = tk.Button(root, text="Run Visual Detection", command=run_visual_detection, height=2, width=20)
+    btn_visual_detection.pack(pady=10)
 
-# Create buttons
-btn_calibration = tk.Button(root, text="Run Calibration", command=run_calibration, height=2, width=20)
-btn_calibration.pack(pady=10)
+    btn_manual_input = tk.Button(root, text="Run Manual Input", command=run_manual_input, height=2, width=20)
+    btn_manual_input.pack(pady=10)
 
-btn_visual_detection = tk.Button(root, text="Run Visual Detection", command=run_visual_detection, height=2, width=20)
-btn_visual_detection.pack(pady=10)
+    btn_shuffle = tk.Button(root, text="Run  Shuffle", command=run_shuffle, height=2, width=20)
+    btn_shuffle.pack(pady=10)
 
-btn_manual_input = tk.Button(root, text="Run Manual Input", command=run_manual_input, height=2, width=20)
-btn_manual_input.pack(pady=10)
+    btn_solve = tk.Button(root, text="Run  Solve", command=run_solve, height=2, width=20)
+    btn_solve.pack(pady=10)
 
-btn_manual_input = tk.Button(root, text="Run  Shuffle", command=run_shuffle, height=2, width=20)
-btn_manual_input.pack(pady=10)
+    status = tk.Label(root, text="Starting tool worker...", wraplength=180)
+    status.pack(pady=10)
 
-btn_manual_input = tk.Button(root, text="Run  Solve", command=run_solve, height=2, width=20)
-btn_manual_input.pack(pady=10)
+    # Run the GUI loop
+    root.after(POLL_INTERVAL_MS, poll_worker, root, status)
+    try:
+        root.mainloop()
+    finally:
+        worker.stop()
 
-# Run the GUI loop
-root.mainloop()
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox
 import json
-import kociemba
+from solve import solve_faces
 
 class CubeColorInput:
     def __init__(self, root):
@@ -104,51 +104,19 @@ class CubeColorInput:
             with open(json_path, "r") as file:
                 cube_data = json.load(file)
 
-            # Map file face names to Kociemba face letters
-            face_order = {
-                'Top': 'U',
-                'Right': 'R',
-                'Front': 'F',
-                'Bottom': 'D',
-                'Left': 'L',
-                'Back': 'B'
-            }
-
-            # Use center colors to map actual face colors
-            center_colors = {}
-            for face, squares in cube_data.items():
-                center_color = squares[4]  # center piece is always at index 4
-                center_colors[center_color] = face_order[face]
-
-            # Build the full facelet string in URFDLB order
-            facelet_string = ""
-            kociemba_order = ['Top', 'Right', 'Front', 'Bottom', 'Left', 'Back']
-
-            for face in kociemba_order:              
-                for color in cube_data[face]:
-                    face_label = center_colors.get(color, 'X')
-                    facelet_string += face_label
-            
-            if 'X' in facelet_string or len(facelet_string) != 54:
-                raise ValueError("Color mapping incomplete or cube data invalid.")
-
-            # Solve and show result
-            solution = kociemba.solve(facelet_string)
+            # Checks the scan, then picks the solution our robot executes fastest (see solve.py)
+            solution = solve_faces(cube_data)["solution"]
             messagebox.showinfo("Cube Solution", solution)
-            solution_data = {
-                "facelet_string": facelet_string,
-                "solution": solution
-            }
-            with open("cube_solution.json", "w") as f:
-                json.dump(solution_data, f, indent=4)
-
             return solution
 
         except Exception as e:
             messagebox.showerror("Error", f"Could not solve the cube:\n{e}")
             return None
 
-if __name__ == "__main__":
+def main():
     root = tk.Tk()
     app = CubeColorInput(root)
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from array import array
+
+# This module runs on both the Pico W (copy it next to motorun.py) and the desktop,
+# so it must stay MicroPython-compatible (standard library only).
+
+# --- Motor and Movement Parameters ---
+DEGREES_PER_FULL_STEP = 1.8
+MICROSTEPS_PER_FULL_STEP = 16
+STEPS_PER_BASE_TURN = int((45 / DEGREES_PER_FULL_STEP) * MICROSTEPS_PER_FULL_STEP)
+BASE_STEP_DELAY_US = 100 # Microseconds (adjust this for motor speed on the Pico W)
+SETTLE_DELAY_MS = 10     # Pause after every move so the motor settles
+PRECOMPUTED_TURNS = (1, 2) # Delay tables built at boot (quarter and half turns)
+
+# --- Acceleration Profiles ---
+# Every microstep is a HIGH pulse and a LOW pause of the same delay, so a step takes
+# 2 * delay microseconds. A profile starts at `start_delay_us` (slow enough not to stall),
+# accelerates linearly in speed over `ramp_steps` microsteps to `cruise_delay_us`, and
+# decelerates symmetrically before the end of the move. Short moves get a triangular ramp:
+# the same acceleration, turning into deceleration before cruise speed is reached.
+MOTION_PROFILES = {
+    'constant':  {'start_delay_us': BASE_STEP_DELAY_US, 'cruise_delay_us': BASE_STEP_DELAY_US, 'ramp_steps': 0},
+    'trapezoid': {'start_delay_us': 150, 'cruise_delay_us': 45, 'ramp_steps': 120},
+    'fast':      {'start_delay_us': 150, 'cruise_delay_us': 30, 'ramp_steps': 200},
+}
+
+# Fixed profile order; the binary step schedule (stepschedule.py) refers to profiles by
+# their position in this list (profile id = index + 1).
+PROFILE_NAMES = ['constant', 'trapezoid', 'fast']
+
+# Profile used by each motor (motor order U, R, F, D, L, B). 'constant' is the proven timing;
+# switch a motor to 'trapezoid' or 'fast' once it has been tested for missed steps.
+MOTOR_PROFILES = ['constant', 'constant', 'constant', 'constant', 'constant', 'constant']
+
+
+def build_delay_table(profile, total_steps):
+    """Returns the per-microstep delay (us) for a move of `total_steps` as a compact array('H')."""
+    start_delay = profile['start_delay_us']
+    cruise_delay = profile['cruise_delay_us']
+    full_ramp_steps = profile['ramp_steps']
+    ramp_steps = min(full_ramp_steps, total_steps // 2)
+
+    start_speed = 1 / start_delay
+    cruise_speed = 1 / cruise_delay
+
+    def ramp_delay(i):
+        return int(1 / (start_speed + (cruise_speed - start_speed) * i / full_ramp_steps))
+
+    ramp = [ramp_delay(i) for i in range(ramp_steps)]
+    # A short move peaks where its ramps meet (the middle step of an odd count runs at that speed)
+    peak_delay = cruise_delay if ramp_steps == full_ramp_steps else ramp_delay(ramp_steps)
+
+    table = array('H', [peak_delay] * total_steps)
+    for i in range(ramp_steps):
+        table[i] = ramp[i]                   # Accelerate
+        table[total_steps - 1 - i] = ramp[i] # Decelerate
+    return table
+
+
+def build_delay_tables(profile_names=PROFILE_NAMES, turns=PRECOMPUTED_TURNS):
+    """Builds {(profile_name, num_base_turns): table} for the given profiles; motors share tables."""
+    tables = {}
+    for name in profile_names:
+        for num_base_turns in turns:
+            if (name, num_base_turns) not in tables:
+                tables[(name, num_base_turns)] = build_delay_table(MOTION_PROFILES[name], STEPS_PER_BASE_TURN * num_base_turns)
+    return tables
+
+
+def move_duration_us(table):
+    """Time a move driven by `table` takes, including the settle pause."""
+    return 2 * sum(table) + SETTLE_DELAY_MS * 1000
+
+
+if __name__ == "__main__":
+    # Host-side report: how long a move takes under each profile
+    print(f"{STEPS_PER_BASE_TURN} microsteps per base turn, {SETTLE_DELAY_MS} ms settle per move\n")
+    print(f"{'Profile':<12}{'Start/cruise (us)':>20}{'Ramp':>8}{'1 turn (ms)':>14}{'2 turns (ms)':>14}")
+    for name, profile in MOTION_PROFILES.items():
+        durations = [
+            move_duration_us(build_delay_table(profile, STEPS_PER_BASE_TURN * num_base_turns)) / 1000
+            for num_base_turns in PRECOMPUTED_TURNS
+        ]
+        delays = f"{profile['start_delay_us']}/{profile['cruise_delay_us']}"
+        print(f"{name:<12}{delays:>20}{profile['ramp_steps']:>8}{durations[0]:>14.1f}{durations[1]:>14.1f}")
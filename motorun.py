@@ -1,8 +1,15 @@
 from machine import Pin
 import time
 import network
-import socket
-import sys
+try:
+    import uasyncio as asyncio
+except ImportError:  # MicroPython 1.21+ names it asyncio
+    import asyncio
+
+# motionprofile.py must be copied to the Pico W alongside this file
+from motionprofile import STEPS_PER_BASE_TURN, SETTLE_DELAY_MS, MOTION_PROFILES, MOTOR_PROFILES, PROFILE_NAMES, build_delay_table, build_delay_tables
+# stepschedule.py must be copied as well
+from stepschedule import MAX_FRAME_SIZE, check_frame, decode_entry
 
 # --- Wi-Fi Configuration ---
 # IMPORTANT: Replace with your Wi-Fi credentials
@@ -26,10 +33,15 @@ motor_pins = [
 ]
 
 # --- Motor and Movement Parameters ---
-DEGREES_PER_FULL_STEP = 1.8
-MICROSTEPS_PER_FULL_STEP = 16 
-STEPS_PER_BASE_TURN = int((45 / DEGREES_PER_FULL_STEP) * MICROSTEPS_PER_FULL_STEP) 
-BASE_STEP_DELAY_US = 100 # Microseconds (adjust this for motor speed on the Pico W)
+# Step geometry, step delays and per-motor acceleration profiles live in motionprofile.py.
+step_pins = []    # Pin objects, created once in setup_gpio()
+dir_pins = []
+delay_tables = {} # (profile_name, num_base_turns) -> array('H') of per-step delays, built at boot
+
+# --- Binary Step Schedules ---
+# Frames (see stepschedule.py) are received straight into this buffer, which is reused for every schedule.
+schedule_buffer = bytearray(MAX_FRAME_SIZE)
+schedule_view = memoryview(schedule_buffer)
 
 # --- Kociemba Move Direction Mapping ---
 # This mapping dictates the GPIO state for CW/CCW.
@@ -38,42 +50,124 @@ BASE_STEP_DELAY_US = 100 # Microseconds (adjust this for motor speed on the Pico
 DIR_HIGH_IS_CW = 1 # Set to 1 if HIGH (1) on DIR pin means Clockwise, 0 if LOW (0) means Clockwise.
                    # Adjust based on physical testing.
 
+# --- Parallel Moves ---
+# Opposite faces commute, so their motors may turn at the same time (P commands).
+# Motor order follows KOCIEMBA_TO_MOTOR_MAP: U, R, F, D, L, B.
+OPPOSITE_MOTOR = [3, 4, 5, 0, 1, 2]
+
 def setup_gpio():
-    """Initializes GPIO pins for motor control."""
+    """Initializes GPIO pins for motor control and precomputes the step-delay tables."""
     for motor_idx in range(len(motor_pins)):
         step_pin_num = motor_pins[motor_idx][0]
         dir_pin_num = motor_pins[motor_idx][1]
         
         # Configure pins as outputs and ensure they are low initially
-        Pin(step_pin_num, Pin.OUT).value(0)
-        Pin(dir_pin_num, Pin.OUT).value(0)
+        step_pins.append(Pin(step_pin_num, Pin.OUT))
+        dir_pins.append(Pin(dir_pin_num, Pin.OUT))
+        step_pins[motor_idx].value(0)
+        dir_pins[motor_idx].value(0)
         
+    delay_tables.update(build_delay_tables(PROFILE_NAMES))
     print("GPIO setup complete.")
 
-def rotate_motor(motor_index, direction_state, num_base_turns):
+def get_delay_table(motor_index, num_base_turns, profile_name=None):
+    """
+    Returns the precomputed delay table for a move, building it only for unusual turn counts.
+    `profile_name` overrides the motor's own profile.
+    """
+    key = (profile_name or MOTOR_PROFILES[motor_index], num_base_turns)
+    table = delay_tables.get(key)
+    if table is None:
+        table = build_delay_table(MOTION_PROFILES[key[0]], int(STEPS_PER_BASE_TURN * num_base_turns))
+    return table
+
+# --- Cooperative Stepping ---
+# Step pulses are timed with sleep_us busy-waits, which would starve the receive task and
+# the Wi-Fi stack for a whole move. So after every YIELD_INTERVAL_US of stepping the
+# stepping loop hands control to the event loop from inside a pulse's LOW phase, and only
+# waits out whatever is left of that phase afterwards: pulse timing is kept as long as the
+# other tasks give the CPU back within one step delay.
+YIELD_INTERVAL_US = 2000
+
+async def yield_within(delay_us):
+    """Lets the other tasks run, then busy-waits the rest of `delay_us`."""
+    started = time.ticks_us()
+    await asyncio.sleep_ms(0)
+    remaining = delay_us - time.ticks_diff(time.ticks_us(), started)
+    if remaining > 0:
+        time.sleep_us(remaining)
+
+async def rotate_motor(motor_index, direction_state, num_base_turns, profile_name=None):
     """
-    Rotates a specified motor by a given number of base turns in a specified direction.
+    Rotates a specified motor by a given number of base turns in a specified direction,
+    following the motor's acceleration profile (or `profile_name` if given).
     """
     if motor_index < 0 or motor_index >= len(motor_pins):
         print(f"Error: Invalid motor index {motor_index}. Skipping rotation.")
         return
 
-    step_pin = Pin(motor_pins[motor_index][0], Pin.OUT)
-    dir_pin = Pin(motor_pins[motor_index][1], Pin.OUT)
+    step_pin = step_pins[motor_index]
+    dir_pins[motor_index].value(direction_state) # Set direction
     
-    dir_pin.value(direction_state) # Set direction
+    table = get_delay_table(motor_index, num_base_turns, profile_name)
     
-    total_steps = int(STEPS_PER_BASE_TURN * num_base_turns)
+    print(f"  Motor {motor_index + 1}: Executing {len(table)} microsteps (Profile: {profile_name or MOTOR_PROFILES[motor_index]})...")
     
-    print(f"  Motor {motor_index + 1}: Executing {total_steps} microsteps (Delay: {BASE_STEP_DELAY_US}us)...")
-    
-    for _ in range(total_steps):
+    sleep_us = time.sleep_us
+    stepped_us = 0
+    for delay in table:
         step_pin.value(1) # Pulse HIGH
-        time.sleep_us(BASE_STEP_DELAY_US) # Microsecond delay
+        sleep_us(delay) # Microsecond delay
         step_pin.value(0) # Pulse LOW
-        time.sleep_us(BASE_STEP_DELAY_US) # Microsecond delay
+        stepped_us += delay
+        if stepped_us >= YIELD_INTERVAL_US:
+            stepped_us = 0
+            await yield_within(delay)
+        else:
+            sleep_us(delay) # Microsecond delay
     
-    time.sleep_ms(10) # Small delay for motor to settle
+    await asyncio.sleep_ms(SETTLE_DELAY_MS) # Small delay for motor to settle
+
+async def rotate_motors_parallel(moves, profile_name=None):
+    """
+    Rotates several motors at once, e.g. two opposite faces, which commute.
+    `moves` is a list of (motor_index, direction_state, num_base_turns). The timing loop
+    follows the delay table of the longest part; shorter parts spread their pulses evenly
+    over it, so every motor starts, accelerates, decelerates and stops together.
+    """
+    longest = max(moves, key=lambda move: move[2])
+    table = get_delay_table(longest[0], longest[2], profile_name)
+    total_steps = len(table)
+
+    pins = []
+    step_counts = []
+    for motor_index, direction_state, num_base_turns in moves:
+        dir_pins[motor_index].value(direction_state) # Set direction
+        pins.append(step_pins[motor_index])
+        step_counts.append(int(STEPS_PER_BASE_TURN * num_base_turns))
+
+    print(f"  Motors {', '.join(str(m[0] + 1) for m in moves)}: Executing {total_steps} parallel microsteps (Profile: {profile_name or MOTOR_PROFILES[longest[0]]})...")
+
+    sleep_us = time.sleep_us
+    progress = [0] * len(pins) # Bresenham accumulators
+    stepped_us = 0
+    for delay in table:
+        for i in range(len(pins)):
+            progress[i] += step_counts[i]
+            if progress[i] >= total_steps:
+                progress[i] -= total_steps
+                pins[i].value(1) # Pulse HIGH
+        sleep_us(delay) # Microsecond delay
+        for pin in pins:
+            pin.value(0) # Pulse LOW
+        stepped_us += delay
+        if stepped_us >= YIELD_INTERVAL_US:
+            stepped_us = 0
+            await yield_within(delay)
+        else:
+            sleep_us(delay) # Microsecond delay
+
+    await asyncio.sleep_ms(SETTLE_DELAY_MS) # Small delay for motors to settle
 
 def connect_to_wifi(ssid, password):
     """Connects the Pico W to the specified Wi-Fi network."""
@@ -103,56 +197,280 @@ def connect_to_wifi(ssid, password):
         print("Please check SSID, password, and Wi-Fi signal.")
         return False
 
-def main_server_loop():
-    """Starts the TCP/IP server and listens for commands."""
+def parse_motor_spec(spec):
+    """Parses '<motor_index>_<direction_code>_<turns>' into (motor_index, direction_state, turns)."""
+    parts = spec.split('_')
+    if len(parts) != 3:
+        raise ValueError("Invalid format")
+
+    motor_idx = int(parts[0])
+    if motor_idx < 0 or motor_idx >= len(motor_pins):
+        raise ValueError(f"Invalid motor index {motor_idx}")
+    direction_str = parts[1] # e.g., 'CW' or 'CCW'
+    turns = int(parts[2])
+
+    # Translate direction string to GPIO state based on DIR_HIGH_IS_CW
+    if direction_str == 'CW':
+        direction_state = DIR_HIGH_IS_CW
+    elif direction_str == 'CCW':
+        direction_state = 1 - DIR_HIGH_IS_CW # Opposite of CW state
+    else:
+        raise ValueError("Invalid direction code")
+
+    return motor_idx, direction_state, turns
+
+def parse_command(command):
+    """
+    Parses a motor command into a list of (motor_index, direction_state, turns):
+      M<motor_index>_<direction_code>_<turns>                   one motor
+      P<motor_index>_<direction_code>_<turns>+<motor_index>_...  two opposite motors together
+    """
+    if command.startswith('M'):
+        return [parse_motor_spec(command[1:])]
+
+    if command.startswith('P'):
+        moves = [parse_motor_spec(spec) for spec in command[1:].split('+')]
+        check_parallel_moves(moves)
+        return moves
+
+    raise ValueError("Invalid format")
+
+def check_parallel_moves(moves):
+    """Raises ValueError unless `moves` are exactly two moves on opposite faces."""
+    if len(moves) != 2:
+        raise ValueError("Parallel command needs exactly two motors")
+    if moves[0][0] != OPPOSITE_MOTOR[moves[1][0]]:
+        raise ValueError(f"Motors {moves[0][0]} and {moves[1][0]} are not on opposite faces")
+
+async def run_moves(moves, profile_name=None):
+    """Executes a parsed command: one motor, or two opposite motors in parallel."""
+    if len(moves) == 1:
+        await rotate_motor(moves[0][0], moves[0][1], moves[0][2], profile_name)
+    else:
+        await rotate_motors_parallel(moves, profile_name)
+
+# --- Command Ring ---
+# The receive task parses commands into this bounded ring as they arrive, while the
+# stepping task drains it, so the next moves are received during the current one. When
+# the ring is full the receive task stops reading and TCP flow control holds the host back.
+# Each entry is [writer, kind, reply_id, moves, profile_name, error, frame_id]:
+#   kind 'D': plain command, replied with DONE / ERROR: <msg>
+#   kind 'S': tagged command S<seq>:..., replied with ACK<seq> / ERR<seq>:<msg>
+#   kind 'B': schedule entry <n>, replied with ACK<n> / ERR<n>:<msg> (n = 0: whole frame rejected)
+# `error` is set for commands that failed to parse; they are replied to in order.
+RING_SIZE = 32
+
+class CommandRing:
+    def __init__(self, size=RING_SIZE):
+        self.slots = [None] * size
+        self.head = 0
+        self.count = 0
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.not_full.set()
+
+    async def put(self, entry):
+        while self.count == len(self.slots):
+            self.not_full.clear()
+            await self.not_full.wait()
+        self.slots[(self.head + self.count) % len(self.slots)] = entry
+        self.count += 1
+        self.not_empty.set()
+
+    async def get(self):
+        while not self.count:
+            self.not_empty.clear()
+            await self.not_empty.wait()
+        entry = self.slots[self.head]
+        self.slots[self.head] = None
+        self.head = (self.head + 1) % len(self.slots)
+        self.count -= 1
+        self.not_full.set()
+        return entry
+
+    def remove(self, writer):
+        """Drops every queued entry of one client and returns them in order."""
+        kept = []
+        removed = []
+        while self.count:
+            entry = self.slots[self.head]
+            self.slots[self.head] = None
+            self.head = (self.head + 1) % len(self.slots)
+            self.count -= 1
+            (removed if entry[0] is writer else kept).append(entry)
+        for entry in kept:
+            self.slots[(self.head + self.count) % len(self.slots)] = entry
+            self.count += 1
+        self.not_full.set()
+        return removed
+
+ring = CommandRing()
+status = {'moving': None, 'done': 0, 'failed': 0, 'aborted_frame': 0}
+started_ms = 0  # Set when the server starts
+next_frame_id = 1
+aborted_after = {}  # writer -> seq of its failed S command; its later S commands are rejected
+control_lock = asyncio.Lock()  # Held by the client whose moves are queued; others wait for it
+
+# --- Status / Heartbeat ---
+# A client may send '?' at any time, also in the middle of a move. The receive task answers
+# it right away, ahead of any pending acks:
+#     STATUS moving=<command or -> queued=<n> done=<n> failed=<n> up_ms=<n>
+# Status queries never take the control lock, so a second connection can watch the robot.
+def format_status():
+    return (f"STATUS moving={status['moving'] or '-'} queued={ring.count} done={status['done']} "
+            f"failed={status['failed']} up_ms={time.ticks_diff(time.ticks_ms(), started_ms)}\n")
+
+def schedule_entry_moves(index):
+    """Decodes entry `index` of the frame in schedule_buffer into (moves, profile_name)."""
+    motor_mask, dir_mask, half_mask, profile_id = decode_entry(schedule_view, index)
+    moves = []
+    for motor_idx in range(len(motor_pins)):
+        bit = 1 << motor_idx
+        if motor_mask & bit:
+            direction_state = 1 - DIR_HIGH_IS_CW if dir_mask & bit else DIR_HIGH_IS_CW
+            moves.append((motor_idx, direction_state, 2 if half_mask & bit else 1))
+    if not moves:
+        raise ValueError("Entry moves no motor")
+    if len(moves) > 1:
+        check_parallel_moves(moves)
+    if profile_id > len(PROFILE_NAMES):
+        raise ValueError(f"Unknown profile id {profile_id}")
+    return moves, PROFILE_NAMES[profile_id - 1] if profile_id else None
+
+async def receive_schedule(reader, writer, header):
+    """Reads the frame announced by a 'B<length>' header and queues its entries."""
+    global next_frame_id
+    length = int(header[1:])
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Schedule of {length} bytes exceeds {MAX_FRAME_SIZE}")
+    schedule_view[:length] = await reader.readexactly(length)
+    frame_id = next_frame_id
+    next_frame_id += 1
     try:
-        # Create a socket object
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) # Allow address reuse
-        s.bind((HOST, PORT))
-        s.listen(1) # Listen for one incoming connection
+        count = check_frame(schedule_view, length)
+    except ValueError as e:
+        print(f"Rejected schedule: {e}")
+        await ring.put([writer, 'B', 0, None, None, str(e), frame_id])
+        return
+
+    print(f"Received schedule with {count} entries")
+    for index in range(count):
+        if status['aborted_frame'] == frame_id:
+            break  # An earlier entry failed; the rest of the frame is not run
+        try:
+            moves, profile_name = schedule_entry_moves(index)
+            await ring.put([writer, 'B', index + 1, moves, profile_name, None, frame_id])
+        except ValueError as e:
+            await ring.put([writer, 'B', index + 1, None, None, str(e), frame_id])
+            break
+
+async def queue_line(writer, line):
+    """Parses one command line into the ring."""
+    kind, reply_id, command = 'D', None, line
+    if line.startswith('S') and ':' in line:
+        kind = 'S'
+        reply_id, command = line[1:].split(':', 1)
+        # The host keeps its window full until it sees the ERR, so commands sent after a
+        # failed one are still arriving; they stay rejected until a new sequence starts at 1
+        if writer in aborted_after and reply_id.isdigit():
+            if int(reply_id) == 1:
+                del aborted_after[writer]
+            elif int(reply_id) > aborted_after[writer]:
+                await reply(writer, f"ERR{reply_id}:aborted\n")
+                return
+    try:
+        await ring.put([writer, kind, reply_id, parse_command(command), None, None, 0])
+    except ValueError as e:
+        await ring.put([writer, kind, reply_id, None, None, str(e), 0])
+
+async def reply(writer, text):
+    try:
+        writer.write(text.encode('utf-8'))
+        await writer.drain()
+    except OSError:
+        pass  # The client is gone; its remaining entries are dropped when its handler ends
+
+async def receive_task(reader, writer):
+    """
+    Receives commands from one client. '?' is answered immediately; moves wait for the
+    control lock, so commands of two clients never interleave.
+    """
+    addr = writer.get_extra_info('peername')
+    print(f"Connected by {addr}")
+    has_control = False
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                print(f"Client {addr} disconnected.")
+                break
+            line = line.decode('utf-8').strip()
+            if not line:
+                continue
+            if line == '?':
+                await reply(writer, format_status())
+                continue
+            if not has_control:
+                await control_lock.acquire()
+                has_control = True
+            if line.startswith('B'):
+                await receive_schedule(reader, writer, line)
+            else:
+                await queue_line(writer, line)
+    except (OSError, ValueError, EOFError) as e:  # EOFError: connection closed during a schedule
+        print(f"Closing connection to {addr}: {e}")
+    finally:
+        dropped = ring.remove(writer)
+        aborted_after.pop(writer, None)
+        if dropped:
+            print(f"Discarding {len(dropped)} queued command(s).")
+        if has_control:
+            control_lock.release()
+        writer.close()
+
+async def abort_queued(writer, kind, reply_id, frame_id):
+    """After a failed move the following moves assume it happened; do not run them."""
+    if kind == 'B':
+        status['aborted_frame'] = frame_id  # Stops the rest of the frame if it is still being received
+    elif reply_id.isdigit():
+        aborted_after[writer] = int(reply_id)
+    # One write, so no reply of a command received meanwhile can get in between
+    text = "".join(f"ERR{entry[2]}:aborted\n" for entry in ring.remove(writer) if entry[1] == 'S')
+    if text:
+        await reply(writer, text)
+
+async def stepper_task():
+    """Drains the ring: executes each entry and sends its reply."""
+    while True:
+        writer, kind, reply_id, moves, profile_name, error, frame_id = await ring.get()
+        if kind == 'B' and frame_id == status['aborted_frame']:
+            continue  # Was waiting for a free slot when an earlier entry of its frame failed
+        label = f"S{reply_id}" if kind == 'S' else (f"B{frame_id}.{reply_id}" if kind == 'B' else "M")
+        print(f"Executing {label}: {moves}")
+        try:
+            if error is not None:
+                raise ValueError(error)
+            status['moving'] = label
+            await run_moves(moves, profile_name)
+            status['done'] += 1
+            await reply(writer, "DONE\n" if kind == 'D' else f"ACK{reply_id}\n")
+        except Exception as e:
+            print(f"Error processing {label}: {e}")
+            status['failed'] += 1
+            await reply(writer, f"ERROR: {e}\n" if kind == 'D' else f"ERR{reply_id}:{e}\n")
+            if kind != 'D':
+                await abort_queued(writer, kind, reply_id, frame_id)
+        finally:
+            status['moving'] = None
+
+async def main_server_loop():
+    """Starts the TCP/IP server and runs the stepping task."""
+    global started_ms
+    started_ms = time.ticks_ms()
+    try:
+        await asyncio.start_server(receive_task, HOST, PORT)
         print(f"Listening for connections on {HOST}:{PORT}...")
-        
-        while True: # Keep server running to accept multiple connections/reconnections
-            conn, addr = s.accept() # Accepts a new connection
-            with conn:
-                print(f"Connected by {addr}")
-                while True:
-                    data = conn.recv(1024) # Receive data (up to 1024 bytes)
-                    if not data:
-                        print(f"Client {addr} disconnected.")
-                        break # Connection closed by client
-                    
-                    command = data.decode('utf-8').strip()
-                    print(f"Received command: {command}")
-
-                    # --- Parse and Execute Command ---
-                    # Expected format from desktop solve.py: M<motor_index>_<direction_code>_<turns>
-                    try:
-                        parts = command.split('_')
-                        if len(parts) == 3 and parts[0].startswith('M'):
-                            motor_idx = int(parts[0][1:])
-                            direction_str = parts[1] # e.g., 'CW' or 'CCW'
-                            turns = int(parts[2])
-
-                            # Translate direction string to GPIO state based on DIR_HIGH_IS_CW
-                            if direction_str == 'CW':
-                                direction_state = DIR_HIGH_IS_CW
-                            elif direction_str == 'CCW':
-                                direction_state = 1 - DIR_HIGH_IS_CW # Opposite of CW state
-                            else:
-                                raise ValueError("Invalid direction code")
-
-                            rotate_motor(motor_idx, direction_state, turns)
-                            conn.sendall(b"DONE\n") # Send confirmation back to client
-                        else:
-                            conn.sendall(b"ERROR: Invalid format\n")
-                            print("Invalid command format received.")
-
-                    except Exception as e:
-                        print(f"Error processing command: {e}")
-                        conn.sendall(f"ERROR: {e}\n".encode('utf-8'))
-                            
+        await stepper_task()
     except OSError as e: # Catch socket-specific errors
         print(f"Server socket error: {e}. Is port {PORT} in use? Check network configuration.")
         if e.args[0] == 98: # EADDRINUSE error code
@@ -170,7 +488,7 @@ if __name__ == "__main__":
     
     if connect_to_wifi(SSID, PASSWORD):
         try:
-            main_server_loop()
+            asyncio.run(main_server_loop())
         except KeyboardInterrupt:
             print("\nExecutor server stopped by user (Ctrl+C).")
         except Exception as e:
@@ -0,0 +1,162 @@
+# --- Move Sequence Optimizer ---
+# Rewrites a list of Kociemba moves into the cheapest equivalent sequence before it is
+# mapped to motor commands:
+#   * consecutive turns of the same face are merged (R R' -> nothing, U U -> U2, U U2 -> U')
+#   * moves on opposite faces (U/D, R/L, F/B) commute, so merges also happen across them
+#     (U D U -> U2 D) and each such run is written in a fixed canonical order
+#   * 180 degree turns are sent in the direction the motor last turned, because reversing
+#     a stepper first has to take up the gear backlash and settle. "U2'" is a 180 degree
+#     turn driven counter-clockwise; it is equivalent to "U2" on the cube.
+
+from cubecore import OPPOSITE_FACE
+
+FACE_ORDER = "URFDLB"  # Canonical order inside a run of commuting moves
+HALF_TURN_DIRECTION = "CW"  # Used when a half turn has no neighbouring move on its motor
+
+# Quarter turns clockwise for each move suffix
+SUFFIX_TO_QUARTER_TURNS = {"": 1, "'": 3, "2": 2, "2'": 2}
+
+
+def parse_move(move):
+    """Returns (face, quarter_turns, direction) for a move such as "R'", or None if it is not a face turn."""
+    face, suffix = move[:1], move[1:]
+    if face not in OPPOSITE_FACE or suffix not in SUFFIX_TO_QUARTER_TURNS:
+        return None
+    direction = "CCW" if suffix in ("'", "2'") else "CW"
+    return face, SUFFIX_TO_QUARTER_TURNS[suffix], direction
+
+
+def format_move(face, quarter_turns, direction="CW"):
+    """Builds the move string for a face turned by 1-3 clockwise quarter turns."""
+    if quarter_turns == 1:
+        return face
+    if quarter_turns == 3:
+        return face + "'"
+    return face + ("2'" if direction == "CCW" else "2")
+
+
+def same_axis(face_a, face_b):
+    """True if both faces turn about the same axis (the same or opposite faces)."""
+    return face_a == face_b or OPPOSITE_FACE[face_a] == face_b
+
+
+def merge_moves(moves):
+    """
+    Merges cancelling and combinable turns. Returns a list of [face, quarter_turns, direction]
+    entries (direction is that of the last move merged into the entry), or plain strings
+    for tokens that are not face turns (these are never merged across).
+    """
+    merged = []
+    for move in moves:
+        parsed = parse_move(move)
+        if parsed is None:
+            merged.append(move)
+            continue
+
+        face, quarter_turns, direction = parsed
+        # Walk back over the run of moves that commute with this one
+        index = len(merged) - 1
+        while index >= 0 and not isinstance(merged[index], str) and same_axis(merged[index][0], face):
+            if merged[index][0] == face:
+                break
+            index -= 1
+
+        if index >= 0 and not isinstance(merged[index], str) and merged[index][0] == face:
+            total = (merged[index][1] + quarter_turns) % 4
+            if total == 0:
+                del merged[index]  # Cancelled out (R R', U2 U2, ...)
+            else:
+                merged[index][1] = total
+                merged[index][2] = direction
+        else:
+            merged.append([face, quarter_turns, direction])
+
+    return merged
+
+
+def canonicalize(merged):
+    """Sorts every run of commuting opposite-face moves into FACE_ORDER."""
+    result = []
+    run = []
+    for item in merged + [None]:
+        if item is not None and not isinstance(item, str) and (not run or same_axis(run[0][0], item[0])):
+            run.append(item)
+            continue
+        result.extend(sorted(run, key=lambda entry: FACE_ORDER.index(entry[0])))
+        run = [] if item is None or isinstance(item, str) else [item]
+        if isinstance(item, str):
+            result.append(item)
+    return result
+
+
+def choose_half_turn_directions(canonical):
+    """Picks CW/CCW for each half turn so that its motor does not reverse if it can be avoided."""
+    directions = []
+    for position, item in enumerate(canonical):
+        if isinstance(item, str):
+            directions.append(None)
+            continue
+        face, quarter_turns, source_direction = item
+        if quarter_turns != 2:
+            directions.append("CW" if quarter_turns == 1 else "CCW")
+            continue
+
+        direction = None
+        for earlier in range(position - 1, -1, -1):  # Keep turning the way this motor last turned...
+            if not isinstance(canonical[earlier], str) and canonical[earlier][0] == face:
+                direction = directions[earlier]
+                break
+        if direction is None:  # ...or the way it will turn next
+            for later in canonical[position + 1:]:
+                if not isinstance(later, str) and later[0] == face and later[1] != 2:
+                    direction = "CW" if later[1] == 1 else "CCW"
+                    break
+        if direction is None and source_direction == "CCW":  # ...or the way it was written
+            direction = "CCW"
+        directions.append(direction or HALF_TURN_DIRECTION)
+    return directions
+
+
+def optimize_moves(moves):
+    """Returns the cheapest equivalent of a list of Kociemba moves (see module comment)."""
+    canonical = canonicalize(merge_moves(moves))
+    directions = choose_half_turn_directions(canonical)
+    return [
+        item if isinstance(item, str) else format_move(item[0], item[1], direction)
+        for item, direction in zip(canonical, directions)
+    ]
+
+
+def count_quarter_turns(moves):
+    """Counts quarter turns in a move list (half turns count twice), i.e. the motor work it costs."""
+    total = 0
+    for move in moves:
+        parsed = parse_move(move)
+        if parsed is not None:
+            total += 2 if parsed[1] == 2 else 1
+    return total
+
+
+def invert_moves(moves):
+    """The move sequence that undoes `moves` (half turns are undone in the opposite direction)."""
+    inverse = []
+    for move in reversed(moves):
+        parsed = parse_move(move)
+        if parsed is None:
+            raise ValueError(f"Unknown move '{move}'")
+        face, quarter_turns, direction = parsed
+        inverse.append(format_move(face, (4 - quarter_turns) % 4, "CW" if direction == "CCW" else "CCW"))
+    return inverse
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else "cube_scramble_log.json"
+    with open(filename, "r") as f:
+        data = json.load(f)
+    original = data.get("moves") or data.get("solution", "").split()
+    optimized = optimize_moves(original)
+    print("Original: ", " ".join(original), f"({len(original)} moves, {count_quarter_turns(original)} quarter turns)")
+    print("Optimized:", " ".join(optimized), f"({len(optimized)} moves, {count_quarter_turns(optimized)} quarter turns)")
@@ -0,0 +1,221 @@
+import socket
+import time
+
+from cubecore import OPPOSITE_MOTOR
+from stepschedule import MAX_SCHEDULE_ENTRIES, encode_schedule
+from tracing import span
+
+# --- Pipelined Move Streaming ---
+# Instead of sending one command and blocking on 'DONE', the host keeps a sliding
+# window of commands in flight. Every command is tagged with a sequence number:
+#     S<seq>:M<motor_index>_<direction_code>_<turns>\n
+# and the executor (motorun.py) answers each one as soon as it has been executed:
+#     ACK<seq>\n            on success
+#     ERR<seq>:<message>\n  on failure (the executor drops everything still queued and
+#                           rejects later commands until a new sequence starts at S1)
+# Untagged M... commands keep the old one-shot 'DONE' behaviour.
+PIPELINE_WINDOW = 8      # Maximum number of unacknowledged commands on the wire
+ACK_TIMEOUT_S = 5.0      # Deadline for each ack, measured from the previous ack
+
+
+class LineReader:
+    """Buffers socket reads so that replies are returned one complete line at a time."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b""
+
+    def readline(self, timeout):
+        """Returns the next line (without newline), or None if the deadline passes first."""
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self.buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.sock.settimeout(remaining)
+            try:
+                data = self.sock.recv(1024)
+            except socket.timeout:
+                return None
+            if not data:
+                raise ConnectionError("Connection closed by executor.")
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return line.decode('utf-8').strip()
+
+
+# --- Executor Status ---
+# The executor answers '?' immediately, even in the middle of a move, with one line:
+#     STATUS moving=<command or -> queued=<n> done=<n> failed=<n> up_ms=<n>
+# Replies to '?' are not ordered with acks, so only query while nothing is in flight on
+# the same connection (or from a second connection).
+STATUS_QUERY = "?\n"
+
+
+def parse_status(line):
+    """Turns a STATUS line into a dictionary (numbers as ints); raises ValueError for anything else."""
+    if not line.startswith("STATUS"):
+        raise ValueError(f"Not a status line: '{line}'")
+    fields = dict(field.split("=", 1) for field in line.split()[1:])
+    return {key: int(value) if value.isdigit() else value for key, value in fields.items()}
+
+
+# --- Parallel Opposite-Face Moves ---
+# Opposite faces (motors 0/3, 1/4, 2/5) commute, so two adjacent moves on them can be
+# fused into one P command that the executor runs with both motors stepping together:
+#     P<motor_index>_<direction_code>_<turns>+<motor_index>_<direction_code>_<turns>\n
+# (cubecore.OPPOSITE_MOTOR pairs them.)
+
+
+def group_motor_moves(moves, motor_map, parallel=True):
+    """
+    Translates Kociemba moves into groups of (motor_index, direction_code, turns) using
+    `motor_map` (KOCIEMBA_TO_MOTOR_MAP). Each group runs as one executor command; with
+    `parallel`, adjacent moves on opposite faces share a group. Unknown moves are reported
+    and skipped.
+    """
+    specs = []
+    for move in moves:
+        if move not in motor_map:
+            print(f"Warning: Unknown move '{move}'. Skipping.")
+            continue
+        specs.append(motor_map[move])
+
+    groups = []
+    index = 0
+    while index < len(specs):
+        if parallel and index + 1 < len(specs) and specs[index + 1][0] == OPPOSITE_MOTOR[specs[index][0]]:
+            groups.append([specs[index], specs[index + 1]])
+            index += 2
+        else:
+            groups.append([specs[index]])
+            index += 1
+    return groups
+
+
+def format_motor_command(group):
+    """Formats a move group as an M (single motor) or P (parallel) text command."""
+    specs = "+".join(f"{motor_idx}_{direction_code}_{turns}" for motor_idx, direction_code, turns in group)
+    return ("M" if len(group) == 1 else "P") + specs + "\n"
+
+
+def build_motor_commands(moves, motor_map, parallel=True):
+    """Translates Kociemba moves into executor text commands (see group_motor_moves)."""
+    return [format_motor_command(group) for group in group_motor_moves(moves, motor_map, parallel)]
+
+
+def format_tagged_command(seq, command):
+    """Tags a motor command with its sequence number for the pipelined protocol."""
+    return f"S{seq}:{command.strip()}\n"
+
+
+def stream_commands(sock, commands, window=PIPELINE_WINDOW, ack_timeout=ACK_TIMEOUT_S, on_ack=None):
+    """
+    Streams motor commands to the executor with up to `window` commands in flight.
+    Returns the number of commands that were acknowledged, so a short count means
+    the sequence was aborted. `on_ack(seq, command)` is called for every ack.
+    """
+    reader = LineReader(sock)
+    previous_timeout = sock.gettimeout()
+    next_to_send = 0
+    acked = 0
+
+    try:
+        while acked < len(commands):
+            # Top up the window before waiting for the next ack
+            batch = []
+            while next_to_send < len(commands) and next_to_send - acked < window:
+                batch.append(format_tagged_command(next_to_send + 1, commands[next_to_send]))
+                next_to_send += 1
+            if batch:
+                with span("send", "network", commands=len(batch)):
+                    sock.sendall("".join(batch).encode('utf-8'))
+
+            # An ack arrives once the command has run, so this covers network and motor time
+            with span("wait_ack", "network", seq=acked + 1):
+                response = reader.readline(ack_timeout)
+            if response is None:
+                print(f"Timed out after {ack_timeout}s waiting for ack of command {acked + 1}.")
+                break
+
+            expected = acked + 1
+            if response == f"ACK{expected}":
+                acked = expected
+                if on_ack is not None:
+                    on_ack(expected, commands[expected - 1])
+            elif response.startswith(f"ERR{expected}:"):
+                print(f"Executor rejected command {expected} ({commands[expected - 1].strip()}): {response.split(':', 1)[1]}")
+                break
+            else:
+                print(f"Unexpected response from executor: '{response}'")
+                break
+
+    except socket.error as e:  # Also covers ConnectionError and timeouts
+        print(f"Network communication error: {e}")
+    finally:
+        sock.settimeout(previous_timeout)
+
+    return acked
+
+
+# --- Binary Schedule Frames ---
+# The framing of move groups into B<len> messages and the reading of the per-entry replies,
+# shared by stream_schedule() below and robotd.py's asyncio connection.
+ACKED, REJECTED, OUT_OF_STEP = "acked", "rejected", "out of step"
+
+
+def schedule_frames(groups, profile_id=0):
+    """Yields (chunk, message) per frame: up to MAX_SCHEDULE_ENTRIES groups and their B<len> message."""
+    for start in range(0, len(groups), MAX_SCHEDULE_ENTRIES):
+        chunk = groups[start:start + MAX_SCHEDULE_ENTRIES]
+        frame = encode_schedule(chunk, profile_id)
+        yield chunk, f"B{len(frame)}\n".encode('utf-8') + frame
+
+
+def schedule_reply(response, entry, seq):
+    """
+    Classifies the reply to a frame's entry-th group (the run's seq-th): ACKED, REJECTED for
+    an ERR or OUT_OF_STEP for anything else, after which the connection cannot be trusted.
+    """
+    if response == f"ACK{entry}":
+        return ACKED
+    if response.startswith("ERR"):
+        print(f"Executor rejected schedule entry {seq}: {response.split(':', 1)[-1]}")
+        return REJECTED
+    print(f"Unexpected response from executor: '{response}'")
+    return OUT_OF_STEP
+
+
+def stream_schedule(sock, groups, ack_timeout=ACK_TIMEOUT_S, on_ack=None, profile_id=0):
+    """
+    Sends move groups as binary step schedules (see stepschedule.py), one frame per
+    MAX_SCHEDULE_ENTRIES groups, and waits for the per-entry acks. Returns the number of
+    groups that were acknowledged. `on_ack(seq, command)` is called for every ack.
+    """
+    reader = LineReader(sock)
+    previous_timeout = sock.gettimeout()
+    acked = 0
+
+    try:
+        for chunk, message in schedule_frames(groups, profile_id):
+            with span("send_schedule", "network", bytes=len(message)):
+                sock.sendall(message)
+
+            for entry in range(1, len(chunk) + 1):
+                with span("wait_ack", "network", seq=acked + 1):
+                    response = reader.readline(ack_timeout)
+                if response is None:
+                    print(f"Timed out after {ack_timeout}s waiting for ack of schedule entry {acked + 1}.")
+                    return acked
+                if schedule_reply(response, entry, acked + 1) != ACKED:
+                    return acked
+                acked += 1
+                if on_ack is not None:
+                    on_ack(acked, format_motor_command(chunk[entry - 1]))
+
+    except socket.error as e:  # Also covers ConnectionError and timeouts
+        print(f"Network communication error: {e}")
+    finally:
+        sock.settimeout(previous_timeout)
+
+    return acked
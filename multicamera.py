@@ -0,0 +1,232 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from cubecore import DEFAULT_CENTER_COLORS
+from facevoter import FaceVoter
+from tracing import span
+from videopipeline import open_camera
+from visualdetection import CAMERA_CONFIG
+
+# --- Multi-Camera Face Capture ---
+# With two or three cameras (or mirrors) seeing several faces at once, a full scan takes one
+# or two captures instead of six turns by hand. Each camera source is handled by its own
+# worker process: it reads frames, detects and votes on every face region configured for
+# it, and reports captured faces to the parent. The newest annotated frame of each worker
+# is published through a shared-memory buffer, so the parent can show it without pickling
+# frames through a queue. The parent merges the faces into one cube_detected.json.
+#
+# cube_cameras.json maps sources (camera indices or video files) to face regions:
+#     {"sources": [
+#         {"source": 2, "faces": {"Front": [0, 0, 320, 480], "Right": [320, 0, 640, 480]}},
+#         {"source": "scan_back.avi", "faces": {"Back": null}}
+#     ]}
+# A region is [x0, y0, x1, y1] in frame pixels; null means the whole frame (ROI tracking on).
+# Faces are still identified by their center colors; the configured name is only a hint.
+HEADER_BYTES = 8  # Frame counter in front of each shared frame buffer
+
+
+def load_camera_config(path=CAMERA_CONFIG):
+    with open(path, "r") as f:
+        config = json.load(f)
+    for entry in config["sources"]:
+        if not entry.get("faces"):
+            raise ValueError(f"Camera source {entry['source']} has no faces configured")
+    return config["sources"]
+
+
+def camera_worker(index, entry, results, frame_lock, stop, loop_video):
+    """Worker process for one source: capture, detect, vote, publish the annotated frame."""
+    from visualdetection import FaceScanner, sort_detected
+
+    cap = open_camera(entry["source"])
+    if not cap.isOpened():
+        results.put(("error", index, f"Could not open video source {entry['source']}", None))
+        results.put(("finished", index, 0, None))
+        return
+
+    regions = {face: region for face, region in entry["faces"].items()}
+    # Fixed regions are scanned as they are; whole-frame faces track their own ROI
+    scanners = {face: FaceScanner(track_roi=region is None) for face, region in regions.items()}
+    voters = {face: FaceVoter() for face in regions}
+    shared = None
+    frames = 0
+
+    try:
+        while not stop.is_set():
+            with span("camera.read", "vision", source=index):
+                ret, frame = cap.read()
+            if not ret:
+                if loop_video and not isinstance(entry["source"], int) and frames:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+
+            if shared is None:
+                shared = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + frame.nbytes)
+                results.put(("ready", index, shared.name, frame.shape))
+            annotated = frame.copy()
+
+            for face, region in regions.items():
+                x0, y0, x1, y1 = region or (0, 0, frame.shape[1], frame.shape[0])
+                with span("process_face", "vision", source=index, face=face):
+                    _, result, detected = scanners[face].process(frame[y0:y1, x0:x1])
+                annotated[y0:y1, x0:x1] = result
+                colors = None
+                if len(detected) == 9:
+                    colors = sort_detected([(x, y, color.lower()) for (x, y, color) in detected])
+                captured = voters[face].update(colors)
+                if captured is not None:
+                    results.put(("captured", index, face, captured))
+                cv2.rectangle(annotated, (x0, y0), (x1 - 1, y1 - 1), (0, 255, 255), 1)
+                cv2.putText(annotated, f"{face} {voters[face].progress():.0%}", (x0 + 5, y0 + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+            frames += 1
+            with frame_lock:
+                shared.buf[HEADER_BYTES:HEADER_BYTES + frame.nbytes] = annotated.tobytes()
+                shared.buf[:HEADER_BYTES] = frames.to_bytes(HEADER_BYTES, "little")
+    finally:
+        cap.release()
+        results.put(("finished", index, frames, None))
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+
+
+class SharedFrame:
+    """Parent-side view of one worker's shared annotated frame."""
+
+    def __init__(self, name, shape, lock):
+        self.memory = shared_memory.SharedMemory(name=name)
+        self.shape = shape
+        self.lock = lock
+        self.seen = 0
+
+    def read(self):
+        """Copy of the newest frame, or None if the worker has not published a new one."""
+        with self.lock:
+            counter = int.from_bytes(self.memory.buf[:HEADER_BYTES], "little")
+            if counter == self.seen:
+                return None
+            self.seen = counter
+            data = np.frombuffer(self.memory.buf, dtype=np.uint8, count=int(np.prod(self.shape)), offset=HEADER_BYTES)
+            return data.reshape(self.shape).copy()
+
+    def close(self):
+        self.memory.close()
+
+
+def scan(sources, headless=False, loop_video=False, timeout=None):
+    """
+    Runs one worker per source until all six faces are captured, ESC is pressed, every
+    source ran out of frames or the timeout passed. Returns {face name: [9 colors]}.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    stop = context.Event()
+    locks = [context.Lock() for _ in sources]
+    workers = [context.Process(target=camera_worker, args=(index, entry, results, locks[index], stop, loop_video))
+               for index, entry in enumerate(sources)]
+    for worker in workers:
+        worker.start()
+
+    faces_data = {}
+    shared = {}
+    running = len(workers)
+    started = time.time()
+    try:
+        while running and len(faces_data) < len(DEFAULT_CENTER_COLORS):
+            if timeout is not None and time.time() - started > timeout:
+                print("Timed out before all faces were captured.")
+                break
+            try:
+                event, index, value, extra = results.get(timeout=0.03)
+            except queue.Empty:
+                event = None
+
+            if event == "ready" and not headless:
+                try:
+                    shared[index] = SharedFrame(value, extra, locks[index])
+                except FileNotFoundError:  # The worker already finished (a short video file)
+                    pass
+            elif event == "captured":
+                face_name, colors = extra
+                if face_name != value:
+                    print(f"Note: region '{value}' of source {index} shows the {face_name} face (by its center color).")
+                faces_data[face_name] = colors
+                print(f"✅ Saved Face '{face_name}' from source {index}: {colors}")
+            elif event == "error":
+                print(value)
+            elif event == "finished":
+                running -= 1
+
+            if not headless:
+                for index, frame_view in shared.items():
+                    frame = frame_view.read()
+                    if frame is not None:
+                        cv2.imshow(f"Camera {index}", frame)
+                if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+                    break
+    finally:
+        stop.set()
+        # Drain the queue so the workers can flush it and exit
+        deadline = time.time() + 5
+        while any(worker.is_alive() for worker in workers) and time.time() < deadline:
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        for frame_view in shared.values():
+            frame_view.close()
+        if not headless:
+            cv2.destroyAllWindows()
+    return faces_data
+
+
+def run(config_path=CAMERA_CONFIG, headless=False, loop_video=False, timeout=None, output="cube_detected.json"):
+    """Scans with every configured camera and saves / solves once all six faces are known."""
+    from visualdetection import solve_from_json
+
+    sources = load_camera_config(config_path)
+    print(f"Scanning with {len(sources)} camera sources from {config_path}.")
+    faces_data = scan(sources, headless, loop_video, timeout)
+    missing = [face for face in DEFAULT_CENTER_COLORS if face not in faces_data]
+    if missing:
+        print(f"⚠️ Missing faces: {', '.join(missing)}. Turn the cube and scan again.")
+        return None
+
+    with open(output, "w") as f:
+        json.dump(faces_data, f, indent=4)
+    print(f"🎯 All faces saved to {output}!")
+    solution = solve_from_json(output)
+    print("🧩 Solution:", solution)
+    return solution
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan the cube with several cameras or video files at once.")
+    parser.add_argument("--config", default=CAMERA_CONFIG, help="Camera configuration (see multicamera.py)")
+    parser.add_argument("--headless", action="store_true", help="Do not open preview windows")
+    parser.add_argument("--loop", action="store_true", help="Restart video files when they end")
+    parser.add_argument("--timeout", type=float, default=None, help="Give up after this many seconds")
+    args = parser.parse_args()
+    if not os.path.exists(args.config):
+        print(f"No camera configuration at {args.config}.")
+        return
+    run(args.config, args.headless, args.loop, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
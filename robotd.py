@@ -0,0 +1,436 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import socket
+import sys
+import time
+
+from movestream import ACK_TIMEOUT_S, ACKED, OUT_OF_STEP, STATUS_QUERY, group_motor_moves, parse_status, schedule_frames, schedule_reply
+from cubecore import KOCIEMBA_TO_MOTOR_MAP
+from cubestate import CubeState
+from moveoptimizer import count_quarter_turns, optimize_moves, parse_move
+from tracing import span
+import shuffle
+import solve
+
+# --- Robot Job Daemon ---
+# shuffle.py and solve.py each open their own connection to the executor, and motorun.py
+# serves one client at a time, so back-to-back runs race on connect. robotd owns one
+# long-lived connection to the executor instead (TCP keep-alive on, a '?' status heartbeat
+# while idle, re-established with backoff when it drops) and runs jobs from a FIFO queue
+# over it, one at a time:
+#     python robotd.py serve                 start the daemon
+#     python robotd.py shuffle [--wait] [--presolve]
+#                                            queue a random scramble (logged like shuffle.py)
+#     python robotd.py solve [--wait]        queue cube_solution.json (checked like solve.py)
+#     python robotd.py moves "R U R' U'"     queue raw Kociemba moves
+#     python robotd.py status                queue depth, connection and recent job timings
+#     python robotd.py soak [--cycles N]     shuffle -> solve cycles until Ctrl+C or N cycles
+# Clients talk to the daemon on CONTROL_HOST:CONTROL_PORT with one JSON object per line.
+# A job that loses the connection half way fails (the cube is in an unknown state); it is
+# never retried, but the connection is re-established for the next job.
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = int(os.environ.get('CUBE_ROBOTD_PORT', 65433))
+CONNECT_TIMEOUT_S = 5.0
+RECONNECT_DELAYS_S = (0.5, 1, 2, 5, 10)  # Backoff between connection attempts, last one repeats
+KEEPALIVE_IDLE_S = 10      # TCP keep-alive: first probe after this much idle time,
+KEEPALIVE_INTERVAL_S = 5   # then one probe every interval,
+KEEPALIVE_PROBES = 3       # and the connection is dropped after this many unanswered probes
+HEARTBEAT_INTERVAL_S = 15  # Idle time after which the executor's status is queried to check the link
+HISTORY_SIZE = 20          # Finished jobs kept for status
+JOB_KINDS = ("shuffle", "solve", "moves")
+
+
+def enable_keepalive(sock):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE_S), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL_S),
+                          ("TCP_KEEPCNT", KEEPALIVE_PROBES)):
+        if hasattr(socket, option):  # Not every platform exposes the tuning options
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+class RobotLink:
+    """The daemon's single connection to the executor; reconnects on demand."""
+
+    def __init__(self, host=solve.PI_IP_ADDRESS, port=solve.PI_PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.connects = 0
+        self.connected_at = None
+        self.executor_status = None  # Last reply to a heartbeat (see movestream.parse_status)
+
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing() and not self.reader.at_eof()
+
+    async def ensure_connected(self):
+        """Returns once connected, retrying with backoff for as long as it takes."""
+        attempt = 0
+        while not self.connected():
+            self.close()
+            try:
+                with span("connect", "network", host=self.host):
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT_S)
+                enable_keepalive(self.writer.get_extra_info("socket"))
+                self.connects += 1
+                self.connected_at = time.time()
+                print(f"Connected to executor at {self.host}:{self.port}" +
+                      ("" if self.connects == 1 else f" (reconnect {self.connects - 1})"))
+            except (OSError, asyncio.TimeoutError) as e:
+                delay = RECONNECT_DELAYS_S[min(attempt, len(RECONNECT_DELAYS_S) - 1)]
+                print(f"Could not connect to executor at {self.host}:{self.port} ({e}); retrying in {delay}s.")
+                self.close()
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+        self.connected_at = None
+
+    async def heartbeat(self):
+        """Queries the executor's status while idle; a dead link is closed and reconnected."""
+        await self.ensure_connected()  # A failed job may have closed the link
+        try:
+            self.writer.write(STATUS_QUERY.encode('utf-8'))
+            await self.writer.drain()
+            line = await asyncio.wait_for(self.reader.readline(), ACK_TIMEOUT_S)
+            if not line:
+                raise ConnectionError("Connection closed by executor.")
+            self.executor_status = parse_status(line.decode('utf-8').strip())
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            print(f"Executor heartbeat failed ({e}); reconnecting.")
+            self.close()
+            await self.ensure_connected()
+
+    async def run_groups(self, groups, on_ack=None):
+        """
+        Sends move groups as binary schedules (see movestream.stream_schedule) and waits
+        for their acks. Returns the number of acknowledged groups.
+        """
+        acked = 0
+        try:
+            for chunk, message in schedule_frames(groups):
+                with span("send_schedule", "network", bytes=len(message)):
+                    self.writer.write(message)
+                    await self.writer.drain()
+
+                for entry in range(1, len(chunk) + 1):
+                    with span("wait_ack", "network", seq=acked + 1):
+                        line = await asyncio.wait_for(self.reader.readline(), ACK_TIMEOUT_S)
+                    if not line:
+                        raise ConnectionError("Connection closed by executor.")
+                    reply = schedule_reply(line.decode('utf-8').strip(), entry, acked + 1)
+                    if reply == OUT_OF_STEP:
+                        self.close()  # Start over on a fresh connection
+                    if reply != ACKED:
+                        return acked
+                    acked += 1
+                    if on_ack is not None:
+                        on_ack(acked)
+        except asyncio.TimeoutError:
+            print(f"Timed out after {ACK_TIMEOUT_S}s waiting for ack of entry {acked + 1}.")
+            self.close()
+        except (OSError, ConnectionError) as e:
+            print(f"Lost the executor connection: {e}")
+            self.close()
+        return acked
+
+
+class Job:
+    def __init__(self, job_id, kind, moves=None, presolve=False):
+        self.id = job_id
+        self.kind = kind
+        self.moves = moves        # Kociemba moves as given (raw jobs) or as prepared
+        self.presolve = presolve  # Shuffle jobs: solve the scrambled state while it runs (cube must start solved)
+        self.state = "queued"     # queued -> running -> done | failed
+        self.error = None
+        self.commands = 0
+        self.acked = 0
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.solution_wait_s = None  # Shuffle jobs: time the pre-solve still took after the last ack
+        self.done = asyncio.Event()
+
+    def prepare(self):
+        """Turns the job into the moves to execute, like shuffle.py / solve.py do. Raises ValueError."""
+        if self.kind == "shuffle":
+            scramble_log = {}
+            if shuffle.RANDOM_STATE_SCRAMBLE:
+                scramble_log["facelet_string"], scramble_string = shuffle.random_state_scramble()
+            else:
+                scramble_string = shuffle.generate_cube_scramble(length=20)
+            with open("cube_scramble_log.json", "w") as f:
+                json.dump({"scramble_string": scramble_string, "moves": scramble_string.split(), **scramble_log}, f, indent=4)
+            self.moves = scramble_string.split()
+        elif self.kind == "solve":
+            self.moves = solve.load_solution_from_file()
+            if not self.moves:
+                raise ValueError("No valid solution in cube_solution.json")
+            if solve.VERIFY_SOLUTION and not solve.verify_solution(optimize_moves(self.moves)):
+                raise ValueError("The solution does not solve the scanned cube state")
+        unknown = [move for move in self.moves if parse_move(move) is None]
+        if unknown:
+            raise ValueError(f"Unknown moves: {' '.join(unknown)}")
+        return optimize_moves(self.moves) if solve.OPTIMIZE_MOVES else self.moves
+
+    def to_dict(self):
+        def seconds(start, end):
+            return None if start is None or end is None else round(end - start, 3)
+        return {"id": self.id, "kind": self.kind, "state": self.state, "error": self.error,
+                "moves": " ".join(self.moves or []), "commands": self.commands, "acked": self.acked,
+                "solution_wait_s": self.solution_wait_s,
+                "wait_s": seconds(self.queued_at, self.started_at or (time.time() if self.state == "queued" else None)),
+                "run_s": seconds(self.started_at, self.finished_at or (time.time() if self.state == "running" else None))}
+
+
+class RobotDaemon:
+    """FIFO job queue in front of one RobotLink."""
+
+    def __init__(self, link):
+        self.link = link
+        self.queue = asyncio.Queue()
+        self.current = None
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.next_id = 1
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.time()
+
+    def submit(self, kind, moves=None, presolve=False):
+        job = Job(self.next_id, kind, moves, presolve)
+        self.next_id += 1
+        self.queue.put_nowait(job)
+        print(f"Queued job {job.id} ({kind}), queue depth {self.queue.qsize()}")
+        return job
+
+    def status(self):
+        return {"queue_depth": self.queue.qsize(), "running": self.current.to_dict() if self.current else None,
+                "connected": self.link.connected(), "connects": self.link.connects,
+                "executor": self.link.executor_status,
+                "completed": self.completed, "failed": self.failed,
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "recent": [job.to_dict() for job in self.history]}
+
+    async def worker(self):
+        await self.link.ensure_connected()
+        while True:
+            try:
+                job = await asyncio.wait_for(self.queue.get(), HEARTBEAT_INTERVAL_S)
+            except asyncio.TimeoutError:
+                try:
+                    await self.link.heartbeat()
+                except Exception as e:  # Keep serving jobs; the next job reconnects
+                    print(f"Executor heartbeat error: {e}")
+                    self.link.close()
+                continue
+            self.current = job
+            job.state = "running"
+            job.started_at = time.time()
+            try:
+                with span("job", "run", id=job.id, kind=job.kind):
+                    await self.run_job(job)
+            except Exception as e:
+                job.state, job.error = "failed", str(e)
+            job.finished_at = time.time()
+            if job.state == "failed":
+                self.failed += 1
+                print(f"Job {job.id} ({job.kind}) failed: {job.error}")
+            else:
+                self.completed += 1
+                print(f"Job {job.id} ({job.kind}) done: {job.commands} commands in "
+                      f"{job.finished_at - job.started_at:.2f}s after {job.started_at - job.queued_at:.2f}s queued; "
+                      f"queue depth {self.queue.qsize()}")
+            self.history.append(job)
+            self.current = None
+            job.done.set()
+
+    async def run_job(self, job):
+        try:
+            moves = await asyncio.to_thread(job.prepare)  # Solving and file checks must not stall the event loop
+        except (ValueError, OSError) as e:
+            job.state, job.error = "failed", str(e)
+            return
+        groups = group_motor_moves(moves, KOCIEMBA_TO_MOTOR_MAP, solve.PARALLEL_OPPOSITE_FACES)
+        job.commands = len(groups)
+        print(f"Running job {job.id} ({job.kind}): {len(moves)} moves, {count_quarter_turns(moves)} quarter turns, "
+              f"{len(groups)} commands")
+        presolved = None
+        if job.kind == "shuffle" and job.presolve:
+            # Solve the scrambled state while the motors turn (see solve.py, Scan-Free Solving)
+            presolved = asyncio.ensure_future(asyncio.to_thread(solve.solve_state, CubeState.from_moves(job.moves).to_string(),
+                                                            solve.presolve_budget_s(moves)))
+        if groups:
+            await self.link.ensure_connected()
+
+            def report_ack(seq):
+                job.acked = seq
+            job.acked = await self.link.run_groups(groups, report_ack)
+        if job.acked < job.commands:
+            job.state, job.error = "failed", f"Only {job.acked}/{job.commands} commands were confirmed"
+        else:
+            job.state = "done"
+        if presolved is not None:
+            waited = time.perf_counter()
+            try:
+                solution_data = await presolved
+            except Exception as e:
+                print(f"Could not solve the scrambled state: {e}")
+                return
+            if job.state == "done":  # Otherwise the cube is not in the scrambled state
+                solve.save_solution(solution_data)
+                job.solution_wait_s = round(time.perf_counter() - waited, 3)
+
+    async def handle_client(self, reader, writer):
+        """One JSON request per line: {"op": "submit", "kind": ..., "moves": ..., "wait": bool} or {"op": "status"}."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Expected a JSON object")
+                    reply = await self.handle_request(request)
+                except (ValueError, KeyError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request):
+        if request["op"] == "status":
+            return {"ok": True, "status": self.status()}
+        if request["op"] != "submit":
+            raise ValueError(f"Unknown op '{request['op']}'")
+        if request["kind"] not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{request['kind']}' (expected one of {', '.join(JOB_KINDS)})")
+        moves = request.get("moves", "").split() if request["kind"] == "moves" else None
+        job = self.submit(request["kind"], moves, bool(request.get("presolve", shuffle.PRESOLVE_SCRAMBLE)))
+        if request.get("wait"):
+            await job.done.wait()
+        return {"ok": True, "job": job.to_dict(), "queue_depth": self.queue.qsize()}
+
+
+async def serve(host=CONTROL_HOST, port=CONTROL_PORT):
+    daemon = RobotDaemon(RobotLink())
+    server = await asyncio.start_server(daemon.handle_client, host, port)
+    print(f"robotd accepting jobs on {host}:{port}, executor at {daemon.link.host}:{daemon.link.port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), daemon.worker())
+
+
+# --- Client ---
+
+def request(message, host=CONTROL_HOST, port=CONTROL_PORT):
+    """Sends one request to the daemon and returns its reply."""
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode('utf-8'))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            data = sock.recv(4096)
+            if not data:
+                raise ConnectionError("robotd closed the connection")
+            reply += data
+    return json.loads(reply)
+
+
+def print_job(job):
+    timing = f"waited {job['wait_s']}s" + ("" if job["run_s"] is None else f", ran {job['run_s']}s")
+    print(f"Job {job['id']} {job['kind']:<7} {job['state']:<7} {job['acked']}/{job['commands']} commands, {timing}"
+          + (f" - {job['error']}" if job["error"] else ""))
+
+
+def soak(cycles=None, port=CONTROL_PORT):
+    """
+    Shuffle -> solve cycles through the daemon; prints per-cycle timings. The solve jobs
+    execute the solution each shuffle job computed while it ran, so nothing is scanned.
+    """
+    cycle = 0
+    started = time.time()
+    try:
+        while cycles is None or cycle < cycles:
+            cycle += 1
+            scrambled = request({"op": "submit", "kind": "shuffle", "presolve": True, "wait": True}, port=port)["job"]
+            if scrambled["state"] != "done":
+                print_job(scrambled)
+                break
+            if scrambled["solution_wait_s"] is None:
+                print("The shuffle job did not save a solution. Stopping.")
+                break
+            solved = request({"op": "submit", "kind": "solve", "wait": True}, port=port)["job"]
+            print(f"Cycle {cycle}: shuffle {scrambled['run_s']}s (solution ready {scrambled['solution_wait_s']}s "
+                  f"after it), solve {solved['run_s']}s")
+            if solved["state"] != "done":
+                print_job(solved)
+                break
+    except KeyboardInterrupt:
+        pass
+    print(f"{cycle} cycles in {time.time() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run robot jobs over one persistent executor connection.")
+    parser.add_argument("--port", type=int, default=CONTROL_PORT, help="Daemon control port")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="Start the daemon")
+    for kind in ("shuffle", "solve"):
+        commands.add_parser(kind, help=f"Queue a {kind} job").add_argument("--wait", action="store_true")
+    commands.choices["shuffle"].add_argument("--presolve", action="store_true",
+                                             help="Solve the scrambled state while shuffling (cube must start solved)")
+    raw = commands.add_parser("moves", help="Queue raw Kociemba moves")
+    raw.add_argument("moves", help="Moves, e.g. \"R U R' U'\"")
+    raw.add_argument("--wait", action="store_true")
+    commands.add_parser("status", help="Show queue depth, connection and recent jobs")
+    soak_parser = commands.add_parser("soak", help="Shuffle and solve in a loop")
+    soak_parser.add_argument("--cycles", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "serve":
+            asyncio.run(serve(port=args.port))
+        elif args.command == "status":
+            status = request({"op": "status"}, port=args.port)["status"]
+            print(f"Queue depth {status['queue_depth']}, connected {status['connected']} "
+                  f"({status['connects']} connects), {status['completed']} done, {status['failed']} failed, "
+                  f"up {status['uptime_s']}s")
+            if status["executor"]:
+                executor = status["executor"]
+                print(f"Executor at last heartbeat: {executor['done']} moves done, {executor['failed']} failed, "
+                      f"up {executor['up_ms'] / 1000:.0f}s")
+            for job in ([status["running"]] if status["running"] else []) + status["recent"][::-1]:
+                print_job(job)
+        elif args.command == "soak":
+            soak(args.cycles, args.port)
+        else:
+            message = {"op": "submit", "kind": args.command, "wait": args.wait}
+            if args.command == "moves":
+                message["moves"] = args.moves
+            if args.command == "shuffle" and args.presolve:
+                message["presolve"] = True
+            reply = request(message, port=args.port)
+            if not reply["ok"]:
+                print(f"Error: {reply['error']}")
+                sys.exit(1)
+            print_job(reply["job"])
+            print(f"Queue depth {reply['queue_depth']}")
+    except ConnectionRefusedError:
+        print(f"robotd is not running on {CONTROL_HOST}:{args.port}. Start it with: python robotd.py serve")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batchsolve import solve_one, warm_up_worker
+from cubecore import CORNER_FACELETS, CORNER_NAMES, EDGE_FACELETS, EDGE_NAMES, FACE_LETTERS, OPPOSITE_FACE
+from cubestate import SOLVED_ARRAY, LETTER_CODES, decode_facelets
+from moveoptimizer import invert_moves
+
+# --- Scramble Generation ---
+# Two kinds of scrambles, both generated in batches with NumPy:
+#   * random-move: `length` random face turns, never the same or the opposite face twice
+#     in a row. Cheap, but not every cube state is equally likely.
+#   * random-state: a uniformly random reachable state (random corner/edge permutations
+#     of equal parity, random twists/flips summing to zero) is solved with Kociemba and
+#     the inverse of the solution is the scramble. Every state is equally likely.
+# Usage:  python scramble.py --count 1000 > scrambles.jsonl
+#         python scramble.py --count 1000 --random-state --workers 8 > scrambles.jsonl
+# Each output line has the keys of cube_scramble_log.json ("scramble_string", "moves"),
+# plus "facelet_string" (the scrambled state) for random-state scrambles.
+MODIFIERS = ["", "'", "2"]
+MOVE_NAMES = [face + modifier for face in FACE_LETTERS for modifier in MODIFIERS]  # Index = face * 3 + modifier
+# Faces allowed after each face (indices into FACE_LETTERS): not the same one and not the opposite one
+ALLOWED_NEXT_FACE = np.array([[face for face in range(6) if FACE_LETTERS[face] not in (last, OPPOSITE_FACE[last])]
+                              for last in FACE_LETTERS])
+
+CORNER_FACELET_INDEX = np.array(CORNER_FACELETS)                                   # (8, 3)
+CORNER_FACE_CODES = LETTER_CODES[np.array([[ord(c) for c in name] for name in CORNER_NAMES])]
+EDGE_FACELET_INDEX = np.array(EDGE_FACELETS)                                       # (12, 2)
+EDGE_FACE_CODES = LETTER_CODES[np.array([[ord(c) for c in name] for name in EDGE_NAMES])]
+
+
+# --- Random-Move Scrambles ---
+
+def random_move_batch(count, length=20, rng=None):
+    """(count, length) array of move indices into MOVE_NAMES."""
+    rng = np.random.default_rng() if rng is None else rng
+    faces = np.empty((count, length), dtype=np.intp)
+    faces[:, 0] = rng.integers(0, 6, count)
+    choices = rng.integers(0, ALLOWED_NEXT_FACE.shape[1], (count, length))
+    for step in range(1, length):
+        faces[:, step] = ALLOWED_NEXT_FACE[faces[:, step - 1], choices[:, step]]
+    return faces * len(MODIFIERS) + rng.integers(0, len(MODIFIERS), (count, length))
+
+
+def random_move_scrambles(count, length=20, rng=None):
+    """List of `count` random-move scramble strings."""
+    names = np.array(MOVE_NAMES)
+    return [" ".join(row) for row in names[random_move_batch(count, length, rng)].tolist()]
+
+
+# --- Random-State Scrambles ---
+
+def parities(perms):
+    """Parity (0 even, 1 odd) of every row of an (N, n) permutation array."""
+    i, j = np.triu_indices(perms.shape[1], 1)
+    return (perms[:, i] > perms[:, j]).sum(axis=1) % 2
+
+
+def random_cubies(count, rng=None):
+    """(corner_perm, corner_orient, edge_perm, edge_orient) arrays of `count` uniformly random solvable states."""
+    rng = np.random.default_rng() if rng is None else rng
+    corner_perm = np.argsort(rng.random((count, 8)), axis=1)
+    edge_perm = np.argsort(rng.random((count, 12)), axis=1)
+    # Corner and edge permutations must have the same parity; swapping two edges fixes it
+    odd = parities(corner_perm) != parities(edge_perm)
+    edge_perm[odd, 10:12] = edge_perm[odd, 11:9:-1]
+
+    corner_orient = rng.integers(0, 3, (count, 8))
+    corner_orient[:, 7] = -corner_orient[:, :7].sum(axis=1) % 3  # Total twist is a multiple of 3
+    edge_orient = rng.integers(0, 2, (count, 12))
+    edge_orient[:, 11] = edge_orient[:, :11].sum(axis=1) % 2     # Total flip is even
+    return corner_perm, corner_orient, edge_perm, edge_orient
+
+
+def cubies_to_states(corner_perm, corner_orient, edge_perm, edge_orient):
+    """Vectorized cubecore.cubies_to_facelets: (N, 54) array of face codes."""
+    count = len(corner_perm)
+    states = np.tile(SOLVED_ARRAY, (count, 1))
+    rows = np.arange(count)[:, None]
+    for n in range(3):
+        states[rows, CORNER_FACELET_INDEX[np.arange(8), (n + corner_orient) % 3]] = CORNER_FACE_CODES[corner_perm, n]
+    for n in range(2):
+        states[rows, EDGE_FACELET_INDEX[np.arange(12), (n + edge_orient) % 2]] = EDGE_FACE_CODES[edge_perm, n]
+    return states
+
+
+def random_states(count, rng=None):
+    """Facelet strings of `count` uniformly random solvable cube states."""
+    return decode_facelets(cubies_to_states(*random_cubies(count, rng)))
+
+
+def inverse_scramble(result):
+    """Scramble string undoing a solve_one() result; half turns are written plainly (R2, not R2')."""
+    if "error" in result:
+        raise ValueError(f"Could not solve generated state {result['facelet_string']}: {result['error']}")
+    return " ".join(invert_moves(result["solution"].split())).replace("2'", "2")
+
+
+def random_state_scrambles(count, rng=None, workers=None, chunksize=8):
+    """
+    Yields (facelet_string, scramble_string) for `count` random states. The states are
+    solved across a process pool; a scramble is the inverse of its state's solution.
+    """
+    states = random_states(count, rng)
+    if count == 1:  # Not worth starting a pool
+        yield states[0], inverse_scramble(solve_one((0, states[0])))
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up_worker) as pool:
+        for result in pool.map(solve_one, enumerate(states), chunksize=chunksize):
+            yield result["facelet_string"], inverse_scramble(result)
+
+
+def random_state_scramble(rng=None):
+    """(facelet_string, scramble_string) of one random-state scramble."""
+    return next(random_state_scrambles(1, rng))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate scrambles in bulk as JSONL.")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--length", type=int, default=20, help="Moves per random-move scramble")
+    parser.add_argument("--random-state", action="store_true", help="Uniformly random states, solved and inverted")
+    parser.add_argument("--workers", type=int, default=None, help="Solver processes for --random-state (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", "-o", default="-", help="Output file ('-' for stdout)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    started = time.perf_counter()
+    if args.random_state:
+        records = ({"scramble_string": scramble, "moves": scramble.split(), "facelet_string": state}
+                   for state, scramble in random_state_scrambles(args.count, rng, args.workers))
+    else:
+        records = ({"scramble_string": scramble, "moves": scramble.split()}
+                   for scramble in random_move_scrambles(args.count, args.length, rng))
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+    elapsed = time.perf_counter() - started
+    if output is not sys.stdout:
+        output.close()
+    print(f"Generated {args.count} {'random-state' if args.random_state else 'random-move'} scrambles in "
+          f"{elapsed:.2f} s ({args.count / elapsed if elapsed else 0:.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
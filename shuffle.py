@@ -1,69 +1,35 @@
-import random
+import argparse
 import json
+import os
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 # Removed: from tkinter import messagebox, Tk
 
-# --- Pi Connection Details (MUST MATCH motor_executor_pico.py) ---
-PI_IP_ADDRESS = '192.168.131.192' # !!! REPLACE WITH YOUR RASPBERRY PI PICO W'S IP ADDRESS !!!
-PI_PORT = 65432                 # Must match the port on Pico W
-
-# --- Kociemba Move to Motor Command Mapping (MUST BE IDENTICAL to solve.py and motor_executor_pico.py) ---
-# This mapping dictates how your robot executes Kociemba moves.
-KOCIEMBA_TO_MOTOR_MAP = {
-    "U":   (0, 'CW',  1),  # Up face (2x 45deg turns for 90deg)
-    "U'":  (0, 'CCW', 1),
-    "U2":  (0, 'CW',  2),  # 4x 45deg turns for 180deg
-
-    "R":   (1, 'CW',  1),  # Right face
-    "R'":  (1, 'CCW', 1),
-    "R2":  (1, 'CW',  2),
-
-    "F":   (2, 'CW',  1),  # Front face
-    "F'":  (2, 'CCW', 1),
-    "F2":  (2, 'CW',  2),
+from movestream import group_motor_moves, format_motor_command, stream_commands, stream_schedule, PIPELINE_WINDOW, ACK_TIMEOUT_S
+from moveoptimizer import optimize_moves, count_quarter_turns
+import tracing
+from cubecore import KOCIEMBA_TO_MOTOR_MAP
+from cubestate import CubeState
+from scramble import random_move_scrambles, random_state_scramble
+from solve import presolve_budget_s, save_solution, solve_state
 
-    "D":   (3, 'CW',  1),  # Down face
-    "D'":  (3, 'CCW', 1),
-    "D2":  (3, 'CW',  2),
-
-    "L":   (4, 'CW',  1),  # Left face
-    "L'":  (4, 'CCW', 1),
-    "L2":  (4, 'CW',  2),
-
-    "B":   (5, 'CW',  1),  # Back face
-    "B'":  (5, 'CCW', 1),
-    "B2":  (5, 'CW',  2),
-}
+# --- Pi Connection Details (MUST MATCH motor_executor_pico.py) ---
+PI_IP_ADDRESS = os.environ.get('CUBE_ROBOT_HOST', '192.168.131.192') # !!! REPLACE WITH YOUR RASPBERRY PI PICO W'S IP ADDRESS !!!
+PI_PORT = int(os.environ.get('CUBE_ROBOT_PORT', 65432)) # Must match the port on Pico W
+# Set CUBE_ROBOT_HOST=127.0.0.1 to run against simulator.py instead of the robot
+PIPELINED_STREAMING = True      # Stream moves with sequence-numbered acks instead of one blocking DONE per move
+OPTIMIZE_MOVES = True           # Merge/cancel redundant turns before sending (see moveoptimizer.py)
+PARALLEL_OPPOSITE_FACES = True  # Turn adjacent opposite-face moves (U/D, R/L, F/B) together
+BINARY_SCHEDULE = True          # Send all moves as one compiled binary frame (see stepschedule.py)
+RANDOM_STATE_SCRAMBLE = False   # Scramble to a uniformly random state (solved and inverted) instead of 20 random moves
+PRESOLVE_SCRAMBLE = False       # Solve the scrambled state while the robot shuffles (--presolve; assumes the cube starts solved, see solve.py)
 
 def generate_cube_scramble(length=15):
-    """Generates a random Rubik's Cube scramble string."""
-    faces = ["U", "R", "F", "D", "L", "B"]
-    modifiers = ["", "'", "2"] # No modifier, prime, double turn
-    
-    scramble = []
-    last_face = ""
-    
-    for _ in range(length):
-        while True:
-            face = random.choice(faces)
-            # Avoid consecutive moves on the same face (e.g., U U')
-            # And avoid moves on opposite faces consecutively (e.g., U D)
-            if face != last_face and \
-               not ((face == "U" and last_face == "D") or \
-                    (face == "D" and last_face == "U") or \
-                    (face == "R" and last_face == "L") or \
-                    (face == "L" and last_face == "R") or \
-                    (face == "F" and last_face == "B") or \
-                    (face == "B" and last_face == "F")):
-                break
-        
-        modifier = random.choice(modifiers)
-        scramble.append(face + modifier)
-        last_face = face
-        
-    return " ".join(scramble)
+    """Generates a random Rubik's Cube scramble string (no same or opposite face twice in a row)."""
+    return random_move_scrambles(1, length)[0]
 
+@tracing.traced("network", "round_trip")
 def send_command_to_pico(sock, command):
     """Sends a command to the Pico W and waits for 'DONE' confirmation."""
     try:
@@ -77,23 +43,41 @@ def send_command_to_pico(sock, command):
         print(f"Error during shuffle command send/receive: {e}")
         return False
 
-def main():
+def main(presolve=PRESOLVE_SCRAMBLE):
     # Removed: root = Tk()
     # Removed: root.withdraw()
 
     # Step 1: Generate the scramble string
-    scramble_string = generate_cube_scramble(length=20) # You can adjust scramble length
+    scramble_log = {}
+    if RANDOM_STATE_SCRAMBLE:
+        scramble_log["facelet_string"], scramble_string = random_state_scramble()
+    else:
+        scramble_string = generate_cube_scramble(length=20) # You can adjust scramble length
     scramble_moves = scramble_string.split()
     
     # Optional: Save scramble to a local file for logging/history
     with open("cube_scramble_log.json", "w") as f:
-        json.dump({"scramble_string": scramble_string, "moves": scramble_moves}, f, indent=4)
+        json.dump({"scramble_string": scramble_string, "moves": scramble_moves, **scramble_log}, f, indent=4)
     print("Cube Scramble Generated and logged to cube_scramble_log.json.")
 
     # Step 2: Display scramble data and confirm physical shuffle will start (now printed to console)
     print("\nStarting physical shuffle sequence on robot:")
     print(scramble_string)
 
+    # The resulting state is known already, so it is solved while the motors turn
+    presolver = ThreadPoolExecutor(max_workers=1) if presolve else None
+    if presolver is not None:
+        presolved = presolver.submit(solve_state, CubeState.from_moves(scramble_moves).to_string(),
+                                      presolve_budget_s(scramble_moves))
+    shuffle_complete = False
+
+    if OPTIMIZE_MOVES:
+        optimized_moves = optimize_moves(scramble_moves)
+        if len(optimized_moves) != len(scramble_moves):
+            print(f"Optimized scramble: {len(scramble_moves)} -> {len(optimized_moves)} moves, "
+                  f"{count_quarter_turns(scramble_moves)} -> {count_quarter_turns(optimized_moves)} quarter turns.")
+        scramble_moves = optimized_moves
+
     # Step 3: Establish network connection to Pico W and send shuffle commands
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
@@ -102,23 +86,34 @@ def main():
             print("Successfully connected to Pico W for shuffle.")
 
             print("Executing shuffle moves on robot...")
-            for i, move in enumerate(scramble_moves):
-                if move not in KOCIEMBA_TO_MOTOR_MAP:
-                    print(f"Warning: Unknown scramble move '{move}'. Skipping.")
-                    continue
-
-                # Translate Kociemba move to motor command
-                motor_idx, direction_code, turns_45_deg = KOCIEMBA_TO_MOTOR_MAP[move]
-                
-                # Format command for Pico W: M<motor_index>_<direction_code>_<turns_45_deg>\n
-                command_to_send = f"M{motor_idx}_{direction_code}_{turns_45_deg}\n"
-
-                print(f"[{i+1}/{len(scramble_moves)}] Sending shuffle command: {command_to_send.strip()}")
-                if not send_command_to_pico(s, command_to_send):
-                    print("Failed to get 'DONE' from Pico W during shuffle. Aborting shuffle.")
-                    # Removed: messagebox.showerror
-                    break
-                time.sleep(0.1) # Small delay after receiving confirmation
+            # Translate Kociemba moves to motor commands (M<motor_index>_<direction_code>_<turns_45_deg>
+            # or P...+... for two opposite faces turning together)
+            groups = group_motor_moves(scramble_moves, KOCIEMBA_TO_MOTOR_MAP, PARALLEL_OPPOSITE_FACES)
+            commands = [format_motor_command(group) for group in groups]
+
+            if BINARY_SCHEDULE or PIPELINED_STREAMING:
+                def report_ack(seq, command):
+                    print(f"[{seq}/{len(commands)}] Shuffle command done: {command.strip()}")
+
+                if BINARY_SCHEDULE:
+                    print(f"Sending {len(commands)} shuffle commands as a binary schedule...")
+                    completed = stream_schedule(s, groups, ACK_TIMEOUT_S, on_ack=report_ack)
+                else:
+                    print(f"Streaming {len(commands)} shuffle commands (window {PIPELINE_WINDOW})...")
+                    completed = stream_commands(s, commands, PIPELINE_WINDOW, ACK_TIMEOUT_S, on_ack=report_ack)
+                if completed < len(commands):
+                    print(f"Only {completed}/{len(commands)} shuffle commands were confirmed by the Pico W. Aborting shuffle.")
+                shuffle_complete = completed == len(commands)
+            else:
+                shuffle_complete = True
+                for i, command_to_send in enumerate(commands):
+                    print(f"[{i+1}/{len(commands)}] Sending shuffle command: {command_to_send.strip()}")
+                    if not send_command_to_pico(s, command_to_send):
+                        print("Failed to get 'DONE' from Pico W during shuffle. Aborting shuffle.")
+                        # Removed: messagebox.showerror
+                        shuffle_complete = False
+                        break
+                    tracing.sleep(0.1) # Small delay after receiving confirmation
 
             print("Robot shuffle sequence complete.")
             # Removed: messagebox.showinfo
@@ -131,5 +126,28 @@ def main():
         # Removed: messagebox.showerror
         print(f"An unexpected error occurred during shuffle: {e}")
 
+    if presolver is not None:
+        finish_presolve(presolved, shuffle_complete)
+        presolver.shutdown()
+
+def finish_presolve(presolved, shuffle_complete):
+    """Saves the solution computed during the shuffle, unless the cube may not be in the scrambled state."""
+    waited = time.perf_counter()
+    try:
+        solution_data = presolved.result()
+    except Exception as e:
+        print(f"Could not solve the scrambled state: {e}")
+        return
+    if not shuffle_complete:
+        print("The shuffle did not finish, so the cube's state is unknown. Scan it before solving.")
+        return
+    save_solution(solution_data)
+    print(f"Solution saved to cube_solution.json ({(time.perf_counter() - waited) * 1000:.0f} ms after the shuffle): "
+          f"{solution_data['solution']}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scramble the cube on the robot.")
+    parser.add_argument("--presolve", action="store_true", default=PRESOLVE_SCRAMBLE,
+                        help="Solve the scrambled state during the shuffle and save cube_solution.json "
+                             "(only correct if the cube is solved when the shuffle starts)")
+    main(parser.parse_args().presolve)
\ No newline at end of file
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import types
+
+from tracing import span
+
+# --- Local Robot Simulator ---
+# Runs the real motorun.py executor on the desktop (CPython) by standing in for the
+# MicroPython-only pieces: machine.Pin, network.WLAN, time.sleep_us/sleep_ms and
+# uasyncio.sleep_ms.
+# Pin writes are recorded as a per-motor pulse timeline on a simulated clock, so motor
+# time follows the delay tables built from STEPS_PER_BASE_TURN and the step delays.
+#
+# Point solve.py / shuffle.py at it with:
+#     python simulator.py
+#     CUBE_ROBOT_HOST=127.0.0.1 python solve.py
+
+SIM_HOST = '127.0.0.1'
+SIM_PORT = 65432
+
+
+class SimulatedClock:
+    """
+    Replacement for the MicroPython `time` module used by motorun.py. Sleeping advances the
+    simulated clock; with speed > 0 the simulator also waits in real time (speed 1.0 = real
+    robot speed) so that end-to-end timings over the network are realistic.
+    """
+
+    def __init__(self, speed=0.0):
+        self.speed = speed
+        self.now_us = 0.0
+        self.anchor_sim_us = 0.0
+        self.anchor_real = time.perf_counter()
+
+    def sleep_us(self, us):
+        self.now_us += us
+        if self.speed > 0:
+            self.pace()
+
+    def sleep_ms(self, ms):
+        self.sleep_us(ms * 1000)
+
+    def sleep(self, seconds):
+        self.sleep_us(seconds * 1000000)
+
+    def ticks_us(self):
+        return int(self.now_us)
+
+    def ticks_ms(self):
+        return int(self.now_us // 1000)
+
+    def ticks_diff(self, end, start):
+        return end - start
+
+    def lag(self):
+        """Seconds real time is behind simulated time (0 when it is not)."""
+        real = time.perf_counter()
+        target = self.anchor_real + (self.now_us - self.anchor_sim_us) / 1000000 / self.speed
+        if real > target + 0.05:
+            # We were idle (waiting for a command); restart pacing from here
+            self.anchor_real = real
+            self.anchor_sim_us = self.now_us
+            return 0.0
+        return max(target - real, 0.0)
+
+    def pace(self):
+        """Waits until real time has caught up with simulated time (in batches, not per step)."""
+        lag = self.lag()
+        if lag > 0.002:
+            time.sleep(lag)
+
+
+class PulseRecorder:
+    """Collects the rising edges of every STEP pin on the simulated clock."""
+
+    def __init__(self, clock, motor_pins):
+        self.clock = clock
+        self.step_pin_to_motor = {pins[0]: motor for motor, pins in enumerate(motor_pins)}
+        self.dir_pin_to_motor = {pins[1]: motor for motor, pins in enumerate(motor_pins)}
+        self.pulses = [[] for _ in motor_pins]     # Rising-edge times (us) per motor
+        self.directions = [0 for _ in motor_pins]  # Current DIR pin level per motor
+        self.net_steps = [0 for _ in motor_pins]   # Signed step count per motor (DIR high = +1)
+
+    def pin_changed(self, pin_number, old_value, new_value):
+        if pin_number in self.dir_pin_to_motor:
+            self.directions[self.dir_pin_to_motor[pin_number]] = new_value
+        elif pin_number in self.step_pin_to_motor and new_value and not old_value:
+            motor = self.step_pin_to_motor[pin_number]
+            self.pulses[motor].append(self.clock.now_us)
+            self.net_steps[motor] += 1 if self.directions[motor] else -1
+
+
+def make_machine_module(recorder_holder):
+    """Builds a fake `machine` module whose Pin objects report writes to the recorder."""
+    machine = types.ModuleType('machine')
+
+    class Pin:
+        OUT = 1
+        IN = 0
+
+        def __init__(self, number, mode=None):
+            self.number = number
+            self.level = 0
+
+        def value(self, level=None):
+            if level is None:
+                return self.level
+            recorder = recorder_holder[0]
+            if recorder is not None:
+                recorder.pin_changed(self.number, self.level, level)
+            self.level = level
+
+    machine.Pin = Pin
+    machine.reset = lambda: None
+    return machine
+
+
+def make_network_module():
+    """Builds a fake `network` module whose WLAN connects immediately to localhost."""
+    network = types.ModuleType('network')
+
+    class WLAN:
+        def __init__(self, interface):
+            self.connected = False
+
+        def active(self, state=None):
+            return True
+
+        def connect(self, ssid, password):
+            self.connected = True
+
+        def isconnected(self):
+            return self.connected
+
+        def ifconfig(self):
+            return (SIM_HOST, '255.0.0.0', SIM_HOST, SIM_HOST)
+
+    network.STA_IF = 0
+    network.WLAN = WLAN
+    return network
+
+
+def make_uasyncio_module(clock):
+    """
+    Builds a `uasyncio` module from CPython's asyncio plus MicroPython's sleep_ms(), which
+    advances the simulated clock and gives the event loop the real time that takes.
+    """
+    uasyncio = types.ModuleType('uasyncio')
+    for name in ('Event', 'Lock', 'run', 'sleep', 'start_server', 'create_task', 'gather'):
+        setattr(uasyncio, name, getattr(asyncio, name))
+
+    async def sleep_ms(ms):
+        clock.now_us += ms * 1000
+        await asyncio.sleep(clock.lag() if clock.speed > 0 else 0)
+
+    uasyncio.sleep_ms = sleep_ms
+    return uasyncio
+
+
+def load_executor(clock, quiet=False):
+    """Imports the real motorun.py against the fakes. Returns (motorun_module, recorder)."""
+    recorder_holder = [None]
+    sys.modules['machine'] = make_machine_module(recorder_holder)
+    sys.modules['network'] = make_network_module()
+    sys.modules['uasyncio'] = make_uasyncio_module(clock)
+
+    import motorun
+
+    motorun.time = clock
+    recorder = PulseRecorder(clock, motorun.motor_pins)
+    recorder_holder[0] = recorder
+    if quiet:
+        motorun.print = lambda *args, **kwargs: None
+    return motorun, recorder
+
+
+class MoveStats:
+    """Counts executed moves and simulated motor time against wall-clock time."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.moves = 0
+        self.motor_us = 0.0
+        self.first_move = None
+        self.last_move = None
+
+    def wrap(self, run_moves):
+        async def counted_run_moves(moves, profile_name=None):
+            started_us = self.clock.now_us
+            if self.first_move is None:
+                self.first_move = time.perf_counter()
+            with span("run_moves", "motor", moves=str(moves)):
+                await run_moves(moves, profile_name)
+            self.moves += 1
+            self.motor_us += self.clock.now_us - started_us
+            self.last_move = time.perf_counter()
+        return counted_run_moves
+
+    def report(self):
+        if not self.moves:
+            return "No moves executed."
+        wall = self.last_move - self.first_move
+        lines = [
+            f"Moves executed:        {self.moves}",
+            f"Simulated motor time:  {self.motor_us / 1000:.1f} ms",
+            f"Wall time first->last: {wall * 1000:.1f} ms",
+        ]
+        if wall > 0:
+            lines.append(f"Moves per second:      {self.moves / wall:.1f}")
+        if self.clock.speed > 0:
+            overhead = wall - self.motor_us / 1000000 / self.clock.speed
+            lines.append(f"Protocol overhead:     {max(overhead, 0) * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+def save_timeline(recorder, filename):
+    """Writes the pulse timeline as {"motors": [{"motor": n, "pulses_us": [...], "net_steps": n}, ...]}."""
+    with open(filename, "w") as f:
+        json.dump({
+            "motors": [
+                {"motor": motor, "pulses_us": pulses, "net_steps": recorder.net_steps[motor]}
+                for motor, pulses in enumerate(recorder.pulses)
+            ]
+        }, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run motorun.py against simulated hardware on localhost.")
+    parser.add_argument("--host", default=SIM_HOST)
+    parser.add_argument("--port", type=int, default=SIM_PORT)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Real-time factor for motor moves (1.0 = robot speed, 0 = as fast as possible)")
+    parser.add_argument("--timeline", help="Write the per-motor pulse timeline to this JSON file on exit")
+    parser.add_argument("--quiet", action="store_true", help="Silence the executor's per-command output")
+    args = parser.parse_args()
+
+    clock = SimulatedClock(args.speed)
+    motorun, recorder = load_executor(clock, args.quiet)
+    stats = MoveStats(clock)
+    motorun.run_moves = stats.wrap(motorun.run_moves)
+    motorun.HOST = args.host
+    motorun.PORT = args.port
+
+    motorun.setup_gpio()
+    motorun.connect_to_wifi(motorun.SSID, motorun.PASSWORD)
+    print(f"Simulated executor on {args.host}:{args.port} (speed {args.speed}). Ctrl+C to stop.")
+    try:
+        asyncio.run(motorun.main_server_loop())
+    except KeyboardInterrupt:
+        print("\nSimulator stopped.")
+    finally:
+        print(stats.report())
+        if args.timeline:
+            save_timeline(recorder, args.timeline)
+            print(f"Pulse timeline saved to {args.timeline}")
+
+
+if __name__ == "__main__":
+    main()
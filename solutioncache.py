@@ -0,0 +1,139 @@
+import functools
+import sqlite3
+import sys
+import time
+
+import kociemba
+
+from cubecore import check_facelets
+from tracing import span
+
+# --- Persistent Solution Cache ---
+# Solutions are stored in SQLite, keyed by the solver and the normalized facelet string,
+# so rescans of the same state, repeated test states and retries after an aborted run skip
+# the two-phase search, while a solution from one solver is never returned for another
+# (e.g. a plain kociemba.solve() answer when the cost-aware search was asked for). The
+# least recently used entries are evicted beyond CACHE_MAX_ENTRIES.
+CACHE_FILE = "cube_solution_cache.sqlite3"
+CACHE_MAX_ENTRIES = 10000
+
+
+def normalize_facelets(facelet_string):
+    """Cache key for a facelet string: surrounding whitespace removed, upper case."""
+    return facelet_string.strip().upper()
+
+
+def solver_name(solver):
+    """Cache identity of a solver: its module and name, ignoring functools.partial arguments."""
+    while isinstance(solver, functools.partial):
+        solver = solver.func
+    return f"{solver.__module__}.{solver.__qualname__}"
+
+
+DEFAULT_SOLVER = solver_name(kociemba.solve)
+
+
+class SolutionCache:
+    """Size-bounded LRU cache of Kociemba solutions with hit/miss counters."""
+
+    def __init__(self, filename=CACHE_FILE, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(filename, timeout=10)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(solutions)")]
+        if columns and "solver" not in columns:
+            with self.conn:  # Written before solvers were recorded, so no entry can be trusted
+                self.conn.execute("DROP TABLE solutions")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS solutions (
+                solver    TEXT NOT NULL,
+                facelets  TEXT NOT NULL,
+                solution  TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (solver, facelets)
+            );
+            CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used);
+            CREATE TABLE IF NOT EXISTS counters (
+                name  TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+
+    def _count(self, name):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, facelet_string, solver=DEFAULT_SOLVER):
+        """Returns the solution cached for the solver or None, and records a hit or a miss."""
+        key = (solver, normalize_facelets(facelet_string))
+        with self.conn:
+            row = self.conn.execute("SELECT solution FROM solutions WHERE solver = ? AND facelets = ?", key).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            self.conn.execute("UPDATE solutions SET last_used = ? WHERE solver = ? AND facelets = ?", (time.time(), *key))
+            self._count("hits")
+            return row[0]
+
+    def put(self, facelet_string, solution, solver=DEFAULT_SOLVER):
+        """Stores a solver's solution and evicts the least recently used entries beyond max_entries."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO solutions (solver, facelets, solution, last_used) VALUES (?, ?, ?, ?)",
+                (solver, normalize_facelets(facelet_string), solution, time.time()))
+            self.conn.execute(
+                "DELETE FROM solutions WHERE rowid IN ("
+                "SELECT rowid FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+
+    def stats(self):
+        """Returns {'entries': n, 'hits': n, 'misses': n}."""
+        stats = {"entries": self.conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0], "hits": 0, "misses": 0}
+        stats.update(dict(self.conn.execute("SELECT name, value FROM counters")))
+        return stats
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM solutions")
+            self.conn.execute("DELETE FROM counters")
+
+    def close(self):
+        self.conn.close()
+
+
+def cached_solve(facelet_string, cache_file=CACHE_FILE, solver=kociemba.solve):
+    """
+    Drop-in replacement for kociemba.solve() that consults the on-disk cache first.
+    `solver` computes missing solutions (e.g. costsolve.cheapest_solution); only solutions
+    cached for the same solver are returned.
+    """
+    check_facelets(normalize_facelets(facelet_string))  # Raises ValueError naming the bad stickers
+    name = solver_name(solver)
+    cache = SolutionCache(cache_file)
+    try:
+        with span("cache.get", "solve"):
+            solution = cache.get(facelet_string, name)
+        if solution is None:
+            with span("solve", "solve", solver=name):
+                solution = solver(normalize_facelets(facelet_string))
+            cache.put(facelet_string, solution, name)
+        return solution
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = SolutionCache()
+    if command == "stats":
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = 100 * stats["hits"] / lookups if lookups else 0
+        print(f"Entries: {stats['entries']}/{cache.max_entries}")
+        print(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.1f}%")
+    elif command == "clear":
+        cache.clear()
+        print("Solution cache cleared.")
+    else:
+        print("Usage: python solutioncache.py [stats|clear]")
+    cache.close()
@@ -1,41 +1,24 @@
+import argparse
+import functools
 import json
+import os
 import socket
-import time
 
-# --- Pi Connection Details ---
-PI_IP_ADDRESS = '192.168.131.192' # !!! REPLACE WITH YOUR RASPBERRY PI'S IP ADDRESS !!!
-PI_PORT = 65432                 # Choose an unused port number (must match Pi's motor_executor.py)
-
-# --- Kociemba Move to Motor Command Mapping ---
-# This mapping dictates how your robot executes Kociemba moves.
-# It MUST be IDENTICAL to the mapping in your motor_executor.py on the Pi.
-# (The motor_executor.py code below has been confirmed to match this mapping)
-KOCIEMBA_TO_MOTOR_MAP = {
-    "U":   (0, 'CW',  1),  # Up face
-    "U'":  (0, 'CCW', 1),
-    "U2":  (0, 'CW',  2),
-
-    "R":   (1, 'CW',  1),  # Right face
-    "R'":  (1, 'CCW', 1),
-    "R2":  (1, 'CW',  2),
-
-    "F":   (2, 'CW',  1),  # Front face
-    "F'":  (2, 'CCW', 1),
-    "F2":  (2, 'CW',  2),
-
-    "D":   (3, 'CW',  1),  # Down face
-    "D'":  (3, 'CCW', 1),
-    "D2":  (3, 'CW',  2),
-
-    "L":   (4, 'CW',  1),  # Left face
-    "L'":  (4, 'CCW', 1),
-    "L2":  (4, 'CW',  2),
-
-    "B":   (5, 'CW',  1),  # Back face
-    "B'":  (5, 'CCW', 1),
-    "B2":  (5, 'CW',  2),
-}
+from movestream import group_motor_moves, format_motor_command, stream_commands, stream_schedule, PIPELINE_WINDOW, ACK_TIMEOUT_S
+from moveoptimizer import optimize_moves, count_quarter_turns
+import tracing
+from cubecore import KOCIEMBA_TO_MOTOR_MAP, check_faces, faces_to_facelets
+from cubestate import CubeState
 
+# --- Pi Connection Details ---
+PI_IP_ADDRESS = os.environ.get('CUBE_ROBOT_HOST', '192.168.131.192') # !!! REPLACE WITH YOUR RASPBERRY PI'S IP ADDRESS !!!
+PI_PORT = int(os.environ.get('CUBE_ROBOT_PORT', 65432)) # Choose an unused port number (must match Pi's motor_executor.py)
+# Set CUBE_ROBOT_HOST=127.0.0.1 to run against simulator.py instead of the robot
+PIPELINED_STREAMING = True      # Stream moves with sequence-numbered acks instead of one blocking DONE per move
+OPTIMIZE_MOVES = True           # Merge/cancel redundant turns before sending (see moveoptimizer.py)
+PARALLEL_OPPOSITE_FACES = True  # Turn adjacent opposite-face moves (U/D, R/L, F/B) together
+BINARY_SCHEDULE = True          # Send all moves as one compiled binary frame (see stepschedule.py)
+VERIFY_SOLUTION = True          # Check on the cube model that the moves solve the scanned state before moving
 
 def load_solution_from_file(filename="cube_solution.json"):
     """Loads the solution string directly from the cube_solution.json file."""
@@ -54,6 +37,78 @@ def load_solution_from_file(filename="cube_solution.json"):
         print(f"An unexpected error occurred loading solution from file: {e}")
         return []
 
+def verify_solution(moves, filename="cube_solution.json"):
+    """Checks on the in-process cube model that `moves` solve the facelet string stored with the solution."""
+    try:
+        with open(filename, 'r') as f:
+            facelet_string = json.load(f).get("facelet_string")
+        if not facelet_string:
+            print(f"Warning: No facelet string in '{filename}'. Cannot verify the solution.")
+            return True
+        return CubeState.from_string(facelet_string).apply(moves).is_solved()
+    except Exception as e:
+        print(f"Error while verifying solution: {e}")
+        return False
+
+# --- Scan-Free Solving ---
+# After a shuffle the cube's state is known without a scan: it is the logged scramble
+# applied to a solved cube (so this assumes the cube was solved when the shuffle began).
+# With --presolve, shuffle.py solves that state on a background thread while the robot is
+# still turning, so cube_solution.json is ready as soon as the last shuffle command is
+# acknowledged. It is off by default: a shuffle of an unsolved cube would save a wrong solution.
+SCRAMBLE_LOG = "cube_scramble_log.json"
+PRESOLVE_BUDGET_FRACTION = 0.5  # Share of the shuffle's estimated run time the cost-aware search may use
+
+
+def scrambled_state(filename=SCRAMBLE_LOG):
+    """Facelet string of a solved cube after the moves logged by shuffle.py."""
+    with open(filename, 'r') as f:
+        return CubeState.from_moves(json.load(f)["moves"]).to_string()
+
+
+def presolve_budget_s(scramble_moves):
+    """Search budget that lets the solution finish before the shuffle does."""
+    from costsolve import TIME_BUDGET_S, estimate_execution_ms
+
+    return min(TIME_BUDGET_S, PRESOLVE_BUDGET_FRACTION * estimate_execution_ms(scramble_moves) / 1000)
+
+
+def solve_state(facelet_string, time_budget_s=None):
+    """
+    Solves a state like the scanners do (cost-aware, cached); returns the cube_solution.json
+    document. time_budget_s overrides costsolve.TIME_BUDGET_S.
+    """
+    from costsolve import cheapest_solution, estimate_execution_ms
+    from solutioncache import cached_solve
+
+    solver = cheapest_solution
+    if time_budget_s is not None:
+        solver = functools.partial(cheapest_solution, time_budget_s=time_budget_s)
+    solution = cached_solve(facelet_string, solver=solver)
+    return {
+        "facelet_string": facelet_string,
+        "solution": solution,
+        "estimated_execution_ms": round(estimate_execution_ms(solution), 1)
+    }
+
+
+def save_solution(solution_data, filename="cube_solution.json"):
+    with open(filename, 'w') as f:
+        json.dump(solution_data, f, indent=4)
+
+
+def solve_faces(cube_data):
+    """
+    Solves a scan ({face name: [9 colors]}, as saved by visualdetection.py / manualinput.py)
+    and saves cube_solution.json. Raises ValueError naming the stickers of an invalid scan.
+    """
+    check_faces(cube_data)
+    # Build the full facelet string in URFDLB order, identifying faces by their center color
+    solution_data = solve_state(faces_to_facelets(cube_data))
+    save_solution(solution_data)
+    return solution_data
+
+@tracing.traced("network", "round_trip")
 def send_command_to_pi(sock, command):
     """Sends a command to the Pi and waits for 'DONE' confirmation."""
     try:
@@ -68,12 +123,38 @@ def send_command_to_pi(sock, command):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Execute cube_solution.json on the robot.")
+    parser.add_argument("--from-scramble", action="store_true",
+                        help=f"Solve the state left by the last shuffle ({SCRAMBLE_LOG}) instead of a scanned one")
+    args = parser.parse_args()
+    if args.from_scramble:
+        try:
+            save_solution(solve_state(scrambled_state()))
+            print(f"Solved the state left by the scramble in {SCRAMBLE_LOG}.")
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error: Could not solve the state from '{SCRAMBLE_LOG}': {e}")
+            return
+
     # Load the pre-calculated solution from the JSON file
     solution_moves = load_solution_from_file() 
     if not solution_moves:
         print("Exiting: No valid solution loaded from cube_solution.json.")
         return
 
+    if OPTIMIZE_MOVES:
+        optimized_moves = optimize_moves(solution_moves)
+        if len(optimized_moves) != len(solution_moves):
+            print(f"Optimized solution: {len(solution_moves)} -> {len(optimized_moves)} moves, "
+                  f"{count_quarter_turns(solution_moves)} -> {count_quarter_turns(optimized_moves)} quarter turns.")
+        solution_moves = optimized_moves
+        if not solution_moves:
+            print("Solution cancels out completely. Nothing to execute.")
+            return
+
+    if VERIFY_SOLUTION and not verify_solution(solution_moves):
+        print("Exiting: The solution does not solve the scanned cube state. Rescan or re-enter the cube.")
+        return
+
     try:
         print(f"Loaded solution with {len(solution_moves)} moves. Connecting to Raspberry Pi...")
 
@@ -83,20 +164,29 @@ def main():
             print(f"Successfully connected to Raspberry Pi at {PI_IP_ADDRESS}:{PI_PORT}")
 
             print("Executing moves on robot...")
-            for i, move in enumerate(solution_moves):
-                if move not in KOCIEMBA_TO_MOTOR_MAP:
-                    print(f"Warning: Unknown Kociemba move '{move}'. Skipping.")
-                    continue
-
-                # Translate Kociemba move to motor command
-                motor_idx, direction_code, turns = KOCIEMBA_TO_MOTOR_MAP[move]
-                command_to_send = f"M{motor_idx}_{direction_code}_{turns}\n" # Format command for Pi
-
-                print(f"[{i+1}/{len(solution_moves)}] Sending: {command_to_send.strip()}")
-                if not send_command_to_pi(s, command_to_send):
-                    print("Failed to get 'DONE' from Pi or communication error. Aborting solution.")
-                    break # Stop execution if communication fails
-                time.sleep(0.1) # Small delay after receiving confirmation
+            # Translate Kociemba moves to motor commands
+            groups = group_motor_moves(solution_moves, KOCIEMBA_TO_MOTOR_MAP, PARALLEL_OPPOSITE_FACES)
+            commands = [format_motor_command(group) for group in groups]
+
+            if BINARY_SCHEDULE or PIPELINED_STREAMING:
+                def report_ack(seq, command):
+                    print(f"[{seq}/{len(commands)}] Done: {command.strip()}")
+
+                if BINARY_SCHEDULE:
+                    print(f"Sending {len(commands)} commands as a binary schedule...")
+                    completed = stream_schedule(s, groups, ACK_TIMEOUT_S, on_ack=report_ack)
+                else:
+                    print(f"Streaming {len(commands)} commands (window {PIPELINE_WINDOW})...")
+                    completed = stream_commands(s, commands, PIPELINE_WINDOW, ACK_TIMEOUT_S, on_ack=report_ack)
+                if completed < len(commands):
+                    print(f"Only {completed}/{len(commands)} commands were confirmed by the Pi. Aborting solution.")
+            else:
+                for i, command_to_send in enumerate(commands):
+                    print(f"[{i+1}/{len(commands)}] Sending: {command_to_send.strip()}")
+                    if not send_command_to_pi(s, command_to_send):
+                        print("Failed to get 'DONE' from Pi or communication error. Aborting solution.")
+                        break # Stop execution if communication fails
+                    tracing.sleep(0.1) # Small delay after receiving confirmation
 
             print("Robot execution sequence complete.")
 
@@ -0,0 +1,117 @@
+import struct
+
+# This module is shared by the desktop tools and the Pico W (copy it next to motorun.py),
+# so it must stay MicroPython-compatible (standard library only).
+
+# --- Binary Step Schedule ---
+# A whole solution is compiled on the host into one frame, sent in a single transfer and
+# decoded on the Pico W straight out of a preallocated buffer, without building a string
+# per move. Frame layout (little-endian):
+#   magic       2s  b'CS'
+#   version     B   SCHEDULE_VERSION
+#   count       H   number of entries
+#   entries     count * 4 bytes, one per (possibly parallel) move:
+#                 motor_mask  B  bit n set: motor n turns
+#                 dir_mask    B  bit n set: motor n turns CCW (clear: CW)
+#                 half_mask   B  bit n set: motor n turns 2 base turns (clear: 1)
+#                 profile_id  B  0: each motor's own profile, n: PROFILE_NAMES[n - 1]
+#   crc         H   CRC-16/CCITT-FALSE of everything before it
+# On the wire the frame is announced by the text line "B<frame_length>\n". The executor
+# answers ACK<n>\n as entry n (1-based) finishes, ERR<n>:<message>\n if it fails, and
+# ERR0:<message>\n if the frame is rejected as a whole.
+SCHEDULE_MAGIC = b'CS'
+SCHEDULE_VERSION = 1
+HEADER_FORMAT = '<2sBH'
+ENTRY_FORMAT = '<BBBB'
+HEADER_SIZE = 5
+ENTRY_SIZE = 4
+CRC_SIZE = 2
+MAX_SCHEDULE_ENTRIES = 128
+MAX_FRAME_SIZE = HEADER_SIZE + ENTRY_SIZE * MAX_SCHEDULE_ENTRIES + CRC_SIZE
+
+
+def crc16(data, length):
+    """CRC-16/CCITT-FALSE of the first `length` bytes of `data` (bytes, bytearray or memoryview)."""
+    crc = 0xFFFF
+    for i in range(length):
+        crc ^= data[i] << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def frame_length(entry_count):
+    """Size in bytes of a frame holding `entry_count` entries."""
+    return HEADER_SIZE + ENTRY_SIZE * entry_count + CRC_SIZE
+
+
+def encode_schedule(groups, profile_id=0):
+    """
+    Encodes a list of move groups into a frame. Each group is a list of
+    (motor_index, direction_code, turns) tuples that run together, e.g. the output of
+    movestream.group_motor_moves().
+    """
+    if len(groups) > MAX_SCHEDULE_ENTRIES:
+        raise ValueError(f"Schedule has {len(groups)} entries, the limit is {MAX_SCHEDULE_ENTRIES}")
+
+    frame = bytearray(frame_length(len(groups)))
+    struct.pack_into(HEADER_FORMAT, frame, 0, SCHEDULE_MAGIC, SCHEDULE_VERSION, len(groups))
+    for index, group in enumerate(groups):
+        motor_mask = dir_mask = half_mask = 0
+        for motor_idx, direction_code, turns in group:
+            bit = 1 << motor_idx
+            if motor_mask & bit:
+                raise ValueError(f"Motor {motor_idx} appears twice in entry {index + 1}")
+            if turns not in (1, 2):
+                raise ValueError(f"Unsupported turn count {turns} in entry {index + 1}")
+            motor_mask |= bit
+            if direction_code == 'CCW':
+                dir_mask |= bit
+            if turns == 2:
+                half_mask |= bit
+        struct.pack_into(ENTRY_FORMAT, frame, HEADER_SIZE + ENTRY_SIZE * index, motor_mask, dir_mask, half_mask, profile_id)
+
+    body_length = len(frame) - CRC_SIZE
+    struct.pack_into('<H', frame, body_length, crc16(frame, body_length))
+    return bytes(frame)
+
+
+def check_frame(view, length):
+    """Validates the frame in the first `length` bytes of `view` and returns its entry count."""
+    if length < HEADER_SIZE + CRC_SIZE:
+        raise ValueError("Frame too short")
+    magic, version, count = struct.unpack_from(HEADER_FORMAT, view, 0)
+    if magic != SCHEDULE_MAGIC:
+        raise ValueError("Bad magic")
+    if version != SCHEDULE_VERSION:
+        raise ValueError(f"Unsupported version {version}")
+    if frame_length(count) != length:
+        raise ValueError("Length does not match entry count")
+    if struct.unpack_from('<H', view, length - CRC_SIZE)[0] != crc16(view, length - CRC_SIZE):
+        raise ValueError("CRC mismatch")
+    return count
+
+
+def decode_entry(view, index):
+    """Returns (motor_mask, dir_mask, half_mask, profile_id) of entry `index`."""
+    return struct.unpack_from(ENTRY_FORMAT, view, HEADER_SIZE + ENTRY_SIZE * index)
+
+
+def decode_schedule(frame):
+    """Decodes a whole frame back into (groups, profile_ids), the inverse of encode_schedule()."""
+    count = check_frame(frame, len(frame))
+    groups = []
+    profile_ids = []
+    for index in range(count):
+        motor_mask, dir_mask, half_mask, profile_id = decode_entry(frame, index)
+        group = []
+        for motor_idx in range(8):
+            bit = 1 << motor_idx
+            if motor_mask & bit:
+                group.append((motor_idx, 'CCW' if dir_mask & bit else 'CW', 2 if half_mask & bit else 1))
+        groups.append(group)
+        profile_ids.append(profile_id)
+    return groups, profile_ids
@@ -0,0 +1,107 @@
+import numpy as np
+
+from colorlut import MIN_STICKER_AREA, find_stickers
+
+# --- Sticker Grid Fast Path ---
+# Finding stickers with connected components touches every pixel of every frame. While
+# the cube sits still in front of the camera its 3x3 grid does not move, so once the
+# full path has found nine stickers we remember their cells and afterwards only sample a
+# small patch at each cell centre: its pixels are classified with the lookup table and the
+# patch takes its majority color (a per-channel HSV median would break for red, whose hue
+# wraps around 0/179). As soon as too few pixels share the majority color (cube moved, hand
+# in front of the camera, glare) the grid is dropped and the full path runs again.
+# --- Face ROI Tracking ---
+# The cube fills only a small part of the camera view. The face is first located on a
+# downscaled frame; afterwards only its bounding box (plus a margin that lets the cube
+# drift between frames) is converted and classified, at full resolution. The box follows
+# the grid every time the full path relocates it, and is dropped after ROI_MAX_MISSES
+# frames without a complete grid, which triggers a new downscaled search.
+LOCATE_SCALE_PERCENT = 25
+LOCATE_MIN_STICKERS = 5    # Stickers' worth of color needed on the downscaled frame to accept a location
+LOCATE_MARGIN = 0.25       # Margin around the located blobs, in blob sizes (blobs may be merged stickers)
+ROI_MARGIN = 1.0           # Margin around the face, in sticker sizes
+ROI_MAX_MISSES = 3
+
+PATCH_FRACTION = 0.25      # Patch side as a fraction of the smaller sticker side
+MIN_PATCH_SIZE = 3
+GRID_MIN_AGREEMENT = 0.6   # Fraction of a patch's pixels that must share its majority color
+
+
+class StickerGrid:
+    """The nine sticker boxes of a located face, in reading order, plus their sampling patches."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes  # [(x, y, w, h)] row by row, left to right
+        size = max(MIN_PATCH_SIZE, int(min(min(w, h) for _, _, w, h in boxes) * PATCH_FRACTION))
+        centres = np.array([(y + h // 2, x + w // 2) for x, y, w, h in boxes])
+        offsets = np.arange(size) - size // 2
+        # (9, size, size) row and column indices of every patch pixel
+        self.rows = centres[:, 0, None, None] + offsets[None, :, None]
+        self.cols = centres[:, 1, None, None] + offsets[None, None, :]
+
+    def shifted(self, dx, dy):
+        """The same grid with every box moved by (dx, dy), e.g. into another ROI's coordinates."""
+        return StickerGrid([(x + dx, y + dy, w, h) for x, y, w, h in self.boxes])
+
+    def fits(self, frame_shape):
+        """False when a patch would reach outside a frame of this shape."""
+        return (self.rows.min() >= 0 and self.cols.min() >= 0 and
+                self.rows.max() < frame_shape[0] and self.cols.max() < frame_shape[1])
+
+
+def locate_grid(stickers):
+    """
+    Builds a StickerGrid from exactly nine (x, y, w, h, label) stickers, or returns None.
+    Rows are formed by sorting on y and taking three at a time, then sorting each row on x.
+    """
+    if len(stickers) != 9:
+        return None
+    by_y = sorted(stickers, key=lambda sticker: sticker[1])
+    boxes = []
+    for row in range(3):
+        boxes.extend((x, y, w, h) for x, y, w, h, _ in sorted(by_y[3 * row:3 * row + 3], key=lambda sticker: sticker[0]))
+    return StickerGrid(boxes)
+
+
+def sample_grid(hsv_frame, grid, classifier, min_agreement=GRID_MIN_AGREEMENT):
+    """
+    Classifies the nine patches of a grid. Returns nine labels in reading order, or None
+    when the classification is inconsistent and the full path has to run again.
+    """
+    if not grid.fits(hsv_frame.shape):
+        return None
+    patches = hsv_frame[grid.rows, grid.cols]                # (9, size, size, 3)
+    pixel_labels = classifier.lookup(patches).reshape(9, -1).astype(np.intp)
+    # Per-patch label counts in one bincount: patch i counts into bins i * n .. i * n + n - 1
+    n = pixel_labels.max() + 1
+    counts = np.bincount((pixel_labels + np.arange(9)[:, None] * n).ravel(), minlength=9 * n).reshape(9, n)
+    labels = counts.argmax(axis=1).astype(np.uint8)
+    agreement = counts.max(axis=1) / pixel_labels.shape[1]
+    if not labels.all() or (agreement < min_agreement).any():
+        return None
+    return labels
+
+
+def expand_box(boxes, margin, frame_shape):
+    """Bounding box (x0, y0, x1, y1) of boxes, grown by margin times the largest box side and clipped to the frame."""
+    pad = int(margin * max(max(w, h) for _, _, w, h in boxes))
+    x0 = max(min(x for x, _, _, _ in boxes) - pad, 0)
+    y0 = max(min(y for _, y, _, _ in boxes) - pad, 0)
+    x1 = min(max(x + w for x, _, w, _ in boxes) + pad, frame_shape[1])
+    y1 = min(max(y + h for _, y, _, h in boxes) + pad, frame_shape[0])
+    return x0, y0, x1, y1
+
+
+def locate_face(small_hsv, classifier, scale_percent=LOCATE_SCALE_PERCENT, frame_shape=None):
+    """
+    Searches a downscaled HSV frame for colored blobs and returns the face ROI (x0, y0, x1, y1)
+    in full-resolution coordinates, or None when less than LOCATE_MIN_STICKERS stickers' worth
+    of color is visible. Neighbouring stickers may merge at this scale; only their extent matters.
+    """
+    scale = scale_percent / 100
+    min_area = MIN_STICKER_AREA * scale * scale
+    blobs = find_stickers(classifier.classify(small_hsv), min_area=min_area)
+    if sum(w * h for _, _, w, h, _ in blobs) < LOCATE_MIN_STICKERS * min_area:
+        return None
+    boxes = [(int(x / scale), int(y / scale), int(w / scale), int(h / scale)) for x, y, w, h, _ in blobs]
+    return expand_box(boxes, LOCATE_MARGIN, frame_shape)
@@ -0,0 +1,50 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batchsolve import parse_line, percentile, solve_stream
+from cubecore import facelets_to_faces
+from cubestate import CubeState
+
+STATE = CubeState.from_moves("R U F' D2").to_string()
+
+
+@pytest.mark.parametrize("line", [
+    STATE + "\n",
+    json.dumps(STATE),
+    json.dumps({"facelet_string": STATE, "solution": "R"}),
+    json.dumps(facelets_to_faces(STATE)),
+])
+def test_parse_line_formats(line):
+    assert parse_line(line) == STATE
+
+
+@pytest.mark.parametrize("line", ["hello", "[1, 2]", "{\"Top\": []}"])
+def test_parse_line_rejects(line):
+    with pytest.raises((ValueError, KeyError, IndexError)):
+        parse_line(line)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert [percentile(values, p) for p in (1, 50, 95, 100)] == [1, 50, 95, 100]
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def test_stream_reads_input_while_writing_results():
+    consumed = []
+
+    def items():
+        for index in range(200):
+            consumed.append(index)
+            yield index, STATE
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = solve_stream(pool, items(), workers=2, chunksize=3)
+        first = next(results)
+        assert len(consumed) <= 2 * 2 * 3 + 3  # One window of chunks (plus the one being filled), not all 200
+        rest = list(results)
+    assert [result["index"] for result in [first] + rest] == list(range(200))
+    assert all(result["solution"] for result in [first] + rest)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from calibration import HUE_MARGIN, HUE_RANGE, circular_mean_hue, fit_hsv_range, hue_mask, separate_hues
+
+
+def samples(hues, saturation=(150, 230), value=(120, 220), count=2000, seed=0):
+    """Synthetic HSV pixels: hues drawn from `hues`, S and V uniform in their ranges."""
+    rng = np.random.default_rng(seed)
+    return np.stack([
+        rng.choice(np.asarray(hues), count),
+        rng.integers(saturation[0], saturation[1] + 1, count),
+        rng.integers(value[0], value[1] + 1, count),
+    ], axis=1).astype(np.uint8)
+
+
+RED = samples(list(range(172, 180)) + list(range(0, 7)))
+ORANGE = samples(range(8, 19), seed=1)
+
+
+def test_red_range_wraps_around_zero():
+    fitted = fit_hsv_range(RED)
+    low, high = fitted["lower"][0], fitted["upper"][0]
+    assert low > high  # Wraps: H >= low or H <= high
+    assert 172 - 2 * HUE_MARGIN <= low <= 172 and 6 <= high <= 6 + 2 * HUE_MARGIN
+    assert hue_mask(fitted)[RED[:, 0]].all()
+    assert not hue_mask(fitted)[90]
+
+
+def test_saturation_and_value_get_a_margin():
+    fitted = fit_hsv_range(samples(range(50, 60), saturation=(200, 250), value=(30, 60)))
+    assert fitted["lower"][1] < 200 and fitted["upper"][1] == 255  # Clipped to the byte range
+    assert fitted["lower"][2] < 30 and fitted["upper"][2] > 60
+    assert fitted["lower"][0] < 50 and fitted["upper"][0] > 59
+
+
+def test_white_accepts_any_hue():
+    fitted = fit_hsv_range(samples(range(HUE_RANGE), saturation=(0, 40), value=(200, 255)))
+    assert (fitted["lower"][0], fitted["upper"][0]) == (0, HUE_RANGE - 1)
+
+
+def test_overlapping_red_and_orange_are_split():
+    ranges = {"Red": fit_hsv_range(RED), "Orange": fit_hsv_range(ORANGE), "White": fit_hsv_range(samples([0], (0, 40)))}
+    assert (hue_mask(ranges["Red"]) & hue_mask(ranges["Orange"])).any()  # The margins overlap
+    means = {"Red": circular_mean_hue(RED[:, 0]), "Orange": circular_mean_hue(ORANGE[:, 0])}
+    separate_hues(ranges, means)
+    assert not (hue_mask(ranges["Red"]) & hue_mask(ranges["Orange"])).any()
+    assert ranges["Orange"]["lower"][0] == ranges["Red"]["upper"][0] + 1
+    assert 0 < ranges["Red"]["upper"][0] < 13  # Between the two mean hues
+    assert hue_mask(ranges["Red"])[[172, 0, 6]].all() and hue_mask(ranges["Orange"])[[8, 18]].all()
+    assert (ranges["White"]["lower"][0], ranges["White"]["upper"][0]) == (0, HUE_RANGE - 1)  # Not chromatic
+
+
+def test_separated_colors_are_left_alone():
+    ranges = {"Red": fit_hsv_range(RED), "Green": fit_hsv_range(samples(range(50, 70)))}
+    before = {color: dict(lower=list(r["lower"]), upper=list(r["upper"])) for color, r in ranges.items()}
+    separate_hues(ranges, {"Red": circular_mean_hue(RED[:, 0]), "Green": 60.0})
+    assert ranges == before
@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+
+from colorlut import ColorClassifier, compile_lut, find_stickers
+
+COLOR_RANGES = {
+    "Red": {"lower": [170, 120, 80], "upper": [8, 255, 255]},  # Hue wraps around 0/179
+    "White": {"lower": [0, 0, 150], "upper": [179, 60, 255]},
+    "Yellow": {"lower": [22, 100, 100], "upper": [40, 255, 255]},
+    "Lemon": {"lower": [28, 150, 150], "upper": [32, 255, 255]},  # Inside Yellow's box
+}
+RED, WHITE, YELLOW, LEMON = range(1, 5)
+
+
+def labels(lut, pixels):
+    return [int(lut[v, s, h]) for h, s, v in pixels]
+
+
+def test_red_hue_wraps_around():
+    lut = compile_lut(COLOR_RANGES)
+    assert labels(lut, [(170, 200, 200), (179, 200, 200), (0, 200, 200), (8, 200, 200)]) == [RED] * 4
+    assert labels(lut, [(9, 200, 200), (169, 200, 200), (90, 200, 200)]) == [0, 0, 0]
+    assert labels(lut, [(0, 100, 200), (0, 200, 70)]) == [0, 0]  # Saturation and value still apply
+
+
+def test_smallest_overlapping_range_wins():
+    lut = compile_lut(COLOR_RANGES)
+    assert labels(lut, [(30, 200, 200), (24, 200, 200), (30, 120, 200)]) == [LEMON, YELLOW, YELLOW]
+    # White spans every hue; the narrower Red box wins where they overlap
+    overlap = {"Red": {"lower": [170, 0, 150], "upper": [8, 255, 255]}, "White": COLOR_RANGES["White"]}
+    assert labels(compile_lut(overlap), [(0, 30, 200), (90, 30, 200)]) == [1, 2]
+
+
+def test_compile_reuses_and_clears_the_output_table():
+    out = np.full((256, 256, 256), 9, dtype=np.uint8)
+    assert compile_lut({"Red": COLOR_RANGES["Red"]}, out=out) is out
+    assert labels(out, [(0, 200, 200), (90, 200, 200)]) == [1, 0]
+
+
+def test_classifier_labels_a_frame(tmp_path):
+    config = tmp_path / "cube_config.json"
+    config.write_text(json.dumps(COLOR_RANGES))
+    frame = np.zeros((20, 20, 3), dtype=np.uint8)
+    frame[:, :10] = (175, 200, 200)
+    frame[:, 10:] = (30, 200, 200)
+    label_image = ColorClassifier(str(config)).classify(frame)
+    assert (label_image[:, :8] == RED).all() and (label_image[:, 12:] == LEMON).all()
+
+
+def test_touching_stickers_of_different_colors_stay_apart():
+    label_image = np.zeros((60, 100), dtype=np.uint8)
+    label_image[10:50, 10:50] = RED
+    label_image[10:50, 50:90] = YELLOW  # Shares an edge with the red sticker
+    label_image[0:5, 0:5] = WHITE       # Noise below min_area
+    # The yellow column along the shared edge is cut as the seam
+    assert sorted(find_stickers(label_image, min_area=100)) == [(10, 10, 40, 40, RED), (51, 10, 39, 40, YELLOW)]
+
+
+def test_diagonally_touching_stickers_stay_apart():
+    label_image = np.zeros((40, 40), dtype=np.uint8)
+    label_image[0:20, 0:20] = RED
+    label_image[20:40, 20:40] = YELLOW  # Touches only at a corner
+    assert sorted(find_stickers(label_image, min_area=100)) == [(0, 0, 20, 20, RED), (20, 20, 20, 20, YELLOW)]
+
+
+def test_same_color_stickers_that_touch_join():
+    label_image = np.zeros((40, 80), dtype=np.uint8)
+    label_image[0:40, 0:80] = RED
+    assert find_stickers(label_image, min_area=100) == [(0, 0, 80, 40, RED)]
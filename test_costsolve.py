@@ -0,0 +1,75 @@
+import kociemba
+import pytest
+
+import costsolve
+from costsolve import ORIENTATIONS, cheapest_solution, estimate_execution_ms, reorient
+from cubecore import SOLVED_FACELETS
+from cubestate import CubeState
+
+STATE = "DRLUUBFBRBLURRLRUBLRDDFDLFUFUFFDBRDUBRUFLLFDDBFLUBLRBD" # From test.py
+
+
+def test_orientations_are_the_24_rotations():
+    assert len(ORIENTATIONS) == 24 and ORIENTATIONS[0] == ""
+
+
+def test_reorient_without_rotation_is_the_identity():
+    view, view_to_physical = reorient(STATE, "")
+    assert view == STATE
+    assert all(view_face == physical_face for view_face, physical_face in view_to_physical.items())
+
+
+@pytest.mark.parametrize("rotation", ["y", "x z", ORIENTATIONS[-1]])
+def test_solution_of_a_view_solves_the_physical_cube(rotation):
+    view, view_to_physical = reorient(STATE, rotation)
+    assert view != STATE
+    assert reorient(SOLVED_FACELETS, rotation)[0] == SOLVED_FACELETS
+    moves = [view_to_physical[move[0]] + move[1:] for move in kociemba.solve(view).split()]
+    assert CubeState.from_string(STATE).apply(" ".join(moves)).is_solved()
+
+
+def test_estimate_accepts_strings_and_lists():
+    assert estimate_execution_ms("R U2 F'") == estimate_execution_ms(["R", "U2", "F'"])
+    assert estimate_execution_ms("") == 0.0
+
+
+def test_estimate_counts_half_turns_and_overhead():
+    quarter = estimate_execution_ms("R", overhead_ms=0.0)
+    assert estimate_execution_ms("R2", overhead_ms=0.0) > quarter
+    assert estimate_execution_ms("R", overhead_ms=10.0) == pytest.approx(quarter + 10.0)
+
+
+def test_estimate_runs_opposite_faces_in_parallel():
+    assert estimate_execution_ms("R L", parallel=True) == pytest.approx(estimate_execution_ms("R"))
+    assert estimate_execution_ms("R L", parallel=False) == pytest.approx(2 * estimate_execution_ms("R"))
+
+
+def test_estimate_scores_the_optimized_moves():
+    assert estimate_execution_ms("R R", optimize=True) == estimate_execution_ms("R2")
+    assert estimate_execution_ms("R R'", optimize=True) == 0.0
+    assert estimate_execution_ms("R R", optimize=False) == pytest.approx(2 * estimate_execution_ms("R"))
+
+
+def test_cheapest_solution_is_no_dearer_than_kociemba():
+    solution = cheapest_solution(STATE, time_budget_s=costsolve.pool_delay_s() + 1.0)
+    assert CubeState.from_string(STATE).apply(solution).is_solved()
+    assert estimate_execution_ms(solution) <= estimate_execution_ms(kociemba.solve(STATE))
+
+
+def test_pool_is_kept_between_calls(monkeypatch):
+    monkeypatch.setattr(costsolve, "MAX_DEPTHS", (24,))  # Searches that all finish within the budget
+    pool = costsolve.solver_pool()
+    costsolve.gather_candidates(STATE, time_budget_s=60)
+    assert costsolve.solver_pool() is pool
+    assert costsolve.pool_delay_s() == 0.0
+
+
+def test_short_budget_falls_back_to_kociemba(monkeypatch):
+    monkeypatch.setattr(costsolve, "pool_delay_s", lambda: 1.0)
+    monkeypatch.setattr(costsolve, "gather_candidates", lambda *args: pytest.fail("Searched despite the budget"))
+    assert cheapest_solution(STATE, time_budget_s=0.5) == kociemba.solve(STATE)
+
+
+def test_invalid_state_raises_value_error():
+    with pytest.raises(ValueError):
+        cheapest_solution(STATE[:-1] + "U", time_budget_s=5.0)
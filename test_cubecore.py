@@ -0,0 +1,57 @@
+import pytest
+
+from cubecore import (CORNER_FACELETS, EDGE_FACELETS, SOLVED_FACELETS, check_faces, check_facelets,
+                      facelets_to_faces, find_state_errors)
+from cubestate import CubeState
+
+SCRAMBLED = CubeState.from_moves("R U2 F' L D B2 R' U").to_string()
+
+
+def swapped(facelets, *pairs):
+    stickers = list(facelets)
+    for first, second in pairs:
+        stickers[first], stickers[second] = stickers[second], stickers[first]
+    return "".join(stickers)
+
+
+def twisted(facelets, corner):
+    a, b, c = CORNER_FACELETS[corner]
+    stickers = list(facelets)
+    stickers[a], stickers[b], stickers[c] = facelets[c], facelets[a], facelets[b]
+    return "".join(stickers)
+
+
+def test_valid_states():
+    assert find_state_errors(SOLVED_FACELETS) == []
+    assert find_state_errors(SCRAMBLED) == []
+
+
+@pytest.mark.parametrize("facelets, message", [
+    (SOLVED_FACELETS[:53], "54 stickers, got 53"),
+    ("X" + SOLVED_FACELETS[1:], "Top 1 (U1) is 'X'"),
+    (swapped(SOLVED_FACELETS, (4, 13)), "The center Top 5 (U5) is 'R'"),
+    ("R" + SOLVED_FACELETS[1:], "10 stickers of the Right color"),
+    # The U sticker of the URF corner traded with the R sticker of the UR edge: no such pieces exist
+    (swapped(SOLVED_FACELETS, (CORNER_FACELETS[0][0], EDGE_FACELETS[0][1])), "The corner at Top 9 (U9)"),
+    (twisted(SCRAMBLED, 0), "corner twists add up to"),
+    (swapped(SCRAMBLED, EDGE_FACELETS[0]), "odd number of edges is flipped"),
+    (swapped(SOLVED_FACELETS, *zip(EDGE_FACELETS[0], EDGE_FACELETS[1])), "Two pieces are swapped"),
+])
+def test_each_stage_names_the_problem(facelets, message):
+    with pytest.raises(ValueError, match="Invalid cube state") as error:
+        check_facelets(facelets)
+    assert message in str(error.value)
+
+
+def test_scan_checks():
+    scan = facelets_to_faces(SCRAMBLED)
+    check_faces(scan)
+    missing = {face: colors for face, colors in scan.items() if face != "Back"}
+    with pytest.raises(ValueError, match="The Back face is missing"):
+        check_faces(missing)
+    doubled = dict(scan, Front=scan["Front"][:4] + [scan["Top"][4]] + scan["Front"][5:])
+    with pytest.raises(ValueError, match="both have a"):
+        check_faces(doubled)
+    stray = dict(scan, Left=["purple"] + scan["Left"][1:])
+    with pytest.raises(ValueError, match="Left 1 is purple"):
+        check_faces(stray)
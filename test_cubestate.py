@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from cubecore import SOLVED_FACELETS
+from cubestate import CubeState, apply_batch, decode_facelets, encode_facelets, solves
+
+# Example from the kociemba package documentation
+KNOWN_STATE = "BBURUDBFUFFFRRFUUFLULUFUDLRRDBBDBDBLUDDFLLRRBRLLLBRDDF"
+KNOWN_SOLUTION = "B U' L' D' R' D' L2 D' L F' L' D F2 R2 U R2 B2 U2 L2 F2 D'"
+STATES = [SOLVED_FACELETS, KNOWN_STATE, CubeState.from_moves("R U2 F' L D B2").to_string()]
+
+
+def test_encode_decode_round_trip():
+    states = encode_facelets(STATES)
+    assert states.shape == (3, 54) and states.dtype == np.uint8
+    assert decode_facelets(states) == STATES
+    assert decode_facelets(states[1]) == [KNOWN_STATE]
+    assert CubeState.from_string(KNOWN_STATE).to_string() == KNOWN_STATE
+
+
+def test_apply_batch_matches_apply_row_by_row():
+    moves = "R U R' U' F2 D' L B2"
+    batch = decode_facelets(apply_batch(encode_facelets(STATES), moves))
+    assert batch == [CubeState.from_string(state).apply(moves).to_string() for state in STATES]
+
+
+def test_moves_and_their_inverse_cancel():
+    state = CubeState.from_string(KNOWN_STATE)
+    assert state.apply("R U2 F'").apply("F U2 R'") == state
+    assert state.apply("R R R R") == state
+
+
+def test_known_solution_solves_its_state():
+    assert CubeState.from_string(KNOWN_STATE).apply(KNOWN_SOLUTION).is_solved()
+    assert solves([KNOWN_STATE, KNOWN_STATE, SOLVED_FACELETS], [KNOWN_SOLUTION, "R", ""]).tolist() == [True, False, True]
+
+
+@pytest.mark.parametrize("bad", [KNOWN_STATE[:-1] + "X", KNOWN_STATE.lower()])
+def test_bad_letters_are_rejected(bad):
+    with pytest.raises(ValueError, match="URFDLB"):
+        encode_facelets([bad])
+
+
+def test_unknown_move_is_rejected():
+    with pytest.raises(ValueError, match="Unknown move 'Q'"):
+        CubeState().apply("R Q")
@@ -0,0 +1,71 @@
+from facevoter import STABLE_FRAMES, VOTE_FRAMES, FaceVoter
+
+FRONT = ["white"] * 9
+FRONT_WITH_RED = ["red"] + ["white"] * 8
+BACK = ["yellow"] * 5 + ["blue"] * 4
+
+MAJORITY = VOTE_FRAMES // 2 + 1  # Frames of one face before its vote is complete
+CAPTURE_FRAME = MAJORITY + STABLE_FRAMES - 1
+
+
+def feed(voter, colors, frames):
+    """Feeds the same colors for `frames` frames; returns the 1-based frame numbers that captured."""
+    return [frame for frame in range(1, frames + 1) if voter.update(colors) is not None]
+
+
+def test_majority_outvotes_noisy_frames():
+    voter = FaceVoter()
+    for colors in [FRONT, FRONT_WITH_RED, FRONT, None, FRONT, FRONT_WITH_RED, FRONT]:
+        voter.update(colors)
+    assert voter.vote() == (0,) * 9  # white everywhere: 5 of 7 frames agree on the corner
+
+
+def test_vote_needs_a_strict_majority():
+    voter = FaceVoter()
+    for colors in [FRONT, FRONT, FRONT, FRONT_WITH_RED, FRONT_WITH_RED, FRONT_WITH_RED, None]:
+        voter.update(colors)
+    assert voter.vote() is None  # The corner is 3 white / 3 red / 1 missing
+
+
+def test_face_is_captured_once_stable():
+    voter = FaceVoter()
+    for _ in range(CAPTURE_FRAME - 1):
+        assert voter.update(FRONT) is None
+        assert voter.progress() < 1.0
+    assert voter.update(FRONT) == ("Front", FRONT)
+
+
+def test_noisy_frame_does_not_interrupt_a_stable_face():
+    voter = FaceVoter()
+    feed(voter, FRONT, CAPTURE_FRAME - 1)
+    assert voter.update(["green"] * 9) == ("Front", FRONT)  # Outvoted, so the vote stays the same
+
+
+def test_lost_face_restarts_the_count():
+    voter = FaceVoter()
+    feed(voter, FRONT, MAJORITY)
+    assert feed(voter, None, VOTE_FRAMES) == []
+    assert voter.vote() is None and voter.progress() == 0.0
+    assert feed(voter, FRONT, CAPTURE_FRAME) == [CAPTURE_FRAME]
+
+
+def test_captured_face_is_not_captured_again():
+    voter = FaceVoter()
+    assert feed(voter, FRONT, CAPTURE_FRAME) == [CAPTURE_FRAME]
+    assert feed(voter, FRONT, 3 * VOTE_FRAMES) == []
+    assert voter.progress() == 0.0
+    # A different face is captured once it has taken over the ring and been stable
+    assert feed(voter, BACK, 3 * VOTE_FRAMES) == [CAPTURE_FRAME]
+
+
+def test_reset_clears_the_votes():
+    voter = FaceVoter()
+    feed(voter, BACK, CAPTURE_FRAME - 1)
+    voter.reset()
+    assert voter.vote() is None and voter.progress() == 0.0
+    assert feed(voter, BACK, CAPTURE_FRAME) == [CAPTURE_FRAME]  # Counted from scratch
+
+
+def test_unknown_center_is_never_captured():
+    voter = FaceVoter()
+    assert feed(voter, ["white"] * 4 + ["purple"] + ["white"] * 4, 3 * VOTE_FRAMES) == []
@@ -0,0 +1,36 @@
+import pytest
+
+from motionprofile import MOTION_PROFILES, MOTOR_PROFILES, STEPS_PER_BASE_TURN, build_delay_table
+
+
+@pytest.mark.parametrize("name", list(MOTION_PROFILES))
+@pytest.mark.parametrize("steps", [0, 1, 7, 100, 101, STEPS_PER_BASE_TURN, 2 * STEPS_PER_BASE_TURN])
+def test_one_symmetric_delay_per_step(name, steps):
+    table = build_delay_table(MOTION_PROFILES[name], steps)
+    assert len(table) == steps
+    assert list(table) == list(reversed(table))
+
+
+def test_full_ramp_reaches_cruise():
+    profile = MOTION_PROFILES['trapezoid']
+    table = build_delay_table(profile, 2 * STEPS_PER_BASE_TURN)
+    ramp = list(table[:profile['ramp_steps']])
+    assert ramp[0] == profile['start_delay_us']
+    assert ramp == sorted(ramp, reverse=True)
+    assert set(table[profile['ramp_steps']:-profile['ramp_steps']]) == {profile['cruise_delay_us']}
+
+
+@pytest.mark.parametrize("steps", [100, 101])
+def test_short_move_gets_a_triangular_profile(steps):
+    profile = MOTION_PROFILES['trapezoid']  # 120 ramp steps do not fit twice into 100
+    table = list(build_delay_table(profile, steps))
+    long_move = list(build_delay_table(profile, 2 * STEPS_PER_BASE_TURN))
+    half = (steps + 1) // 2
+    assert table[:steps // 2] == long_move[:steps // 2]  # Same acceleration as a full ramp
+    assert table[:half] == sorted(table[:half], reverse=True)
+    assert min(table) > profile['cruise_delay_us']  # Turns back before cruise speed
+
+
+def test_motors_default_to_the_constant_profile():
+    assert set(MOTOR_PROFILES) == {'constant'}
+    assert set(build_delay_table(MOTION_PROFILES['constant'], 50)) == {MOTION_PROFILES['constant']['cruise_delay_us']}
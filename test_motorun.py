@@ -0,0 +1,78 @@
+from movestream import STATUS_QUERY, parse_status, stream_commands
+from stepschedule import encode_schedule
+
+
+def remaining_lines(reader, timeout=0.3):
+    lines = []
+    while (line := reader.readline(timeout)) is not None:
+        lines.append(line)
+    return lines
+
+
+def executed_moves(sock, reader):
+    sock.sendall(STATUS_QUERY.encode())
+    return parse_status(reader.readline(5))["done"]
+
+
+def test_streamed_commands_after_a_failure_are_rejected(client):
+    sock, reader = client
+    done = executed_moves(sock, reader)
+    commands = ["M0_CW_1"] * 2 + ["M9_CW_1"] + ["M1_CW_1"] * 7  # #3 names a motor that does not exist
+    assert stream_commands(sock, commands) == 2
+    # The host topped up its window after ACK1 and ACK2; those commands must not run.
+    # (stream_commands may already have read some of the replies.)
+    late = remaining_lines(reader)
+    assert late and all(line.endswith(":aborted") for line in late)
+    assert executed_moves(sock, reader) == done + 2
+
+
+def test_abort_is_sticky_until_a_new_sequence(client):
+    sock, reader = client
+    sock.sendall(b"S1:M0_CW_1\nS2:M9_CW_1\n")
+    assert reader.readline(5) == "ACK1"
+    assert reader.readline(5).startswith("ERR2:")
+    sock.sendall(b"S3:M1_CW_1\nS4:M1_CW_1\n")
+    assert [reader.readline(5), reader.readline(5)] == ["ERR3:aborted", "ERR4:aborted"]
+    sock.sendall(b"S1:M1_CW_1\nS2:M1_CW_1\n")
+    assert [reader.readline(5), reader.readline(5)] == ["ACK1", "ACK2"]
+
+
+def test_abort_ends_with_the_connection(executor, client):
+    sock, reader = client
+    sock.sendall(b"S1:M9_CW_1\n")
+    assert reader.readline(5).startswith("ERR1:")
+    sock.close()
+    other, other_reader = executor.connect()
+    try:
+        other.sendall(b"S5:M0_CW_1\n")
+        assert other_reader.readline(5) == "ACK5"
+    finally:
+        other.close()
+
+
+def test_failed_entry_stops_the_rest_of_its_frame(executor, client, monkeypatch):
+    sock, reader = client
+    run_moves = executor.motorun.run_moves
+    calls = []
+
+    async def failing_run_moves(moves, profile_name=None):
+        calls.append(moves)
+        if len(calls) == 3:
+            raise OSError("Motor stalled")
+        await run_moves(moves, profile_name)
+
+    monkeypatch.setattr(executor.motorun, "run_moves", failing_run_moves)
+    # More entries than the ring holds, so the frame is still being received when #3 fails
+    frame = encode_schedule([[(0, "CW", 1)]] * 60)
+    sock.sendall(f"B{len(frame)}\n".encode() + frame)
+    assert [reader.readline(5), reader.readline(5)] == ["ACK1", "ACK2"]
+    assert reader.readline(5).startswith("ERR3:")
+    assert remaining_lines(reader) == []
+    assert len(calls) == 3
+
+
+def test_status_query(client):
+    sock, reader = client
+    sock.sendall(STATUS_QUERY.encode())
+    status = parse_status(reader.readline(5))
+    assert status["moving"] == "-" and status["queued"] == 0
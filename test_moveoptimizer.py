@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from cubestate import CubeState
+from moveoptimizer import count_quarter_turns, invert_moves, optimize_moves
+
+MOVES = [face + suffix for face in "URFDLB" for suffix in ("", "'", "2", "2'")]
+
+
+@pytest.mark.parametrize("moves, expected", [
+    ("R R'", ""),
+    ("U U", "U2"),
+    ("U U2", "U'"),
+    ("U D U", "U2 D"),
+    ("D U", "U D"),
+    ("R U R2", "R U R2"),
+    ("R' U R2", "R' U R2'"),  # The half turn keeps turning the way R last turned
+])
+def test_examples(moves, expected):
+    assert optimize_moves(moves.split()) == expected.split()
+
+
+def test_optimized_moves_reach_the_same_state():
+    rng = random.Random(1)
+    for _ in range(300):
+        # Few faces, so merges and opposite-face runs are common
+        moves = [rng.choice(MOVES[:8] + MOVES[12:16]) for _ in range(rng.randint(0, 30))]
+        optimized = optimize_moves(moves)
+        assert CubeState.from_moves(optimized) == CubeState.from_moves(moves), moves
+        assert count_quarter_turns(optimized) <= count_quarter_turns(moves)
+
+
+def test_inverse_undoes_the_moves():
+    rng = random.Random(2)
+    moves = [rng.choice(MOVES) for _ in range(25)]
+    assert CubeState.from_moves(moves + invert_moves(moves)).is_solved()
+
+
+@pytest.mark.parametrize("token", ["x", "", "R3"])
+def test_inverse_rejects_unknown_moves(token):
+    with pytest.raises(ValueError, match=f"Unknown move '{token}'"):
+        invert_moves(["R", token])
@@ -0,0 +1,46 @@
+import pytest
+
+from cubecore import KOCIEMBA_TO_MOTOR_MAP
+from movestream import (ACKED, OUT_OF_STEP, REJECTED, group_motor_moves, parse_status, schedule_frames,
+                        schedule_reply, stream_schedule)
+from stepschedule import MAX_SCHEDULE_ENTRIES, decode_schedule
+
+
+def test_parse_status():
+    status = parse_status("STATUS moving=S12 queued=3 done=140 failed=0 up_ms=61234")
+    assert status == {"moving": "S12", "queued": 3, "done": 140, "failed": 0, "up_ms": 61234}
+
+
+@pytest.mark.parametrize("line", ["ACK3", "ERR3:aborted", ""])
+def test_parse_status_rejects_other_lines(line):
+    with pytest.raises(ValueError):
+        parse_status(line)
+
+
+def test_opposite_faces_are_grouped():
+    # U and D' run together; R and R2 share a motor and stay separate
+    groups = group_motor_moves(["U", "D'", "R", "R2"], KOCIEMBA_TO_MOTOR_MAP)
+    assert groups == [[(0, "CW", 1), (3, "CCW", 1)], [(1, "CW", 1)], [(1, "CW", 2)]]
+
+
+def test_schedule_frames_split_long_runs():
+    groups = [[(motor_idx % 6, "CW", 1)] for motor_idx in range(MAX_SCHEDULE_ENTRIES + 3)]
+    frames = list(schedule_frames(groups))
+    assert [len(chunk) for chunk, _ in frames] == [MAX_SCHEDULE_ENTRIES, 3]
+    for chunk, message in frames:
+        header, frame = message.split(b"\n", 1)
+        assert header == f"B{len(frame)}".encode() and decode_schedule(frame)[0] == chunk
+
+
+@pytest.mark.parametrize("response, reply", [("ACK2", ACKED), ("ERR2:Motor stalled", REJECTED),
+                                             ("ERR3:aborted", REJECTED), ("ACK3", OUT_OF_STEP), ("DONE", OUT_OF_STEP)])
+def test_schedule_reply(response, reply):
+    assert schedule_reply(response, 2, 10) == reply
+
+
+def test_stream_schedule_runs_every_group(client):
+    sock, _ = client
+    groups = group_motor_moves("U D' R R2 F B L2".split() * 10, KOCIEMBA_TO_MOTOR_MAP)
+    acks = []
+    assert stream_schedule(sock, groups, on_ack=lambda seq, command: acks.append(seq)) == len(groups)
+    assert acks == list(range(1, len(groups) + 1))
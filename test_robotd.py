@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+
+import robotd
+
+
+def test_heartbeat_reconnects_a_closed_link(executor):
+    async def scenario():
+        link = robotd.RobotLink(*executor.address())
+        await link.ensure_connected()
+        link.close()  # As run_groups does when a job loses the connection
+        await link.heartbeat()
+        link.close()
+        return link
+
+    link = asyncio.run(scenario())
+    assert link.connects == 2
+    assert link.executor_status["queued"] == 0
+
+
+def test_worker_survives_a_failed_heartbeat(executor, monkeypatch):
+    monkeypatch.setattr(robotd, "HEARTBEAT_INTERVAL_S", 0.01)
+    monkeypatch.setattr(robotd.solve, "OPTIMIZE_MOVES", False)
+
+    async def broken_heartbeat():
+        raise RuntimeError("Heartbeat failed")
+
+    async def scenario():
+        daemon = robotd.RobotDaemon(robotd.RobotLink(*executor.address()))
+        daemon.link.heartbeat = broken_heartbeat
+        worker = asyncio.ensure_future(daemon.worker())
+        await asyncio.sleep(0.1)
+        assert not worker.done()
+        job = daemon.submit("moves", ["R", "U"])
+        await asyncio.wait_for(job.done.wait(), 10)
+        worker.cancel()
+        daemon.link.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.state == "done" and job.acked == job.commands == 2
+
+
+def test_client_gets_an_error_for_bad_requests(executor):
+    async def scenario():
+        daemon = robotd.RobotDaemon(robotd.RobotLink(*executor.address()))
+        server = await asyncio.start_server(daemon.handle_client, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        replies = []
+        for line in (b'[]\n', b'"x"\n', b'{not json\n', b'{"op": "launch"}\n', b'{"op": "status"}\n'):
+            writer.write(line)
+            replies.append(json.loads(await asyncio.wait_for(reader.readline(), 5)))
+        writer.close()
+        server.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert [reply["ok"] for reply in replies] == [False, False, False, False, True]
+    assert replies[0]["error"] == "Expected a JSON object"
+
+
+def test_status_is_answered_while_a_job_prepares(executor, monkeypatch):
+    def slow_prepare(job):
+        time.sleep(0.5)  # Like a Kociemba solve
+        return job.moves
+
+    monkeypatch.setattr(robotd.Job, "prepare", slow_prepare)
+
+    async def scenario():
+        daemon = robotd.RobotDaemon(robotd.RobotLink(*executor.address()))
+        worker = asyncio.ensure_future(daemon.worker())
+        job = daemon.submit("moves", ["R"])
+        started = time.perf_counter()
+        await asyncio.sleep(0.05)  # Overruns if prepare() blocks the event loop
+        reply = await daemon.handle_request({"op": "status"})
+        responsive_s = time.perf_counter() - started
+        await asyncio.wait_for(job.done.wait(), 10)
+        worker.cancel()
+        daemon.link.close()
+        return reply, responsive_s, job
+
+    reply, responsive_s, job = asyncio.run(scenario())
+    assert reply["status"]["running"]["id"] == job.id
+    assert responsive_s < 0.2
+    assert job.state == "done"
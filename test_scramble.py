@@ -0,0 +1,30 @@
+import numpy as np
+
+from cubecore import check_facelets
+from cubestate import CubeState
+from scramble import random_move_scrambles, random_state_scramble, random_states
+
+OPPOSITE = {"U": "D", "D": "U", "R": "L", "L": "R", "F": "B", "B": "F"}
+
+
+def test_seeded_scrambles_repeat():
+    assert random_move_scrambles(50, 20, np.random.default_rng(7)) == random_move_scrambles(50, 20, np.random.default_rng(7))
+    assert random_states(50, np.random.default_rng(7)) == random_states(50, np.random.default_rng(7))
+    assert random_states(50, np.random.default_rng(7)) != random_states(50, np.random.default_rng(8))
+
+
+def test_random_moves_never_repeat_an_axis():
+    for scramble in random_move_scrambles(200, 20, np.random.default_rng(1)):
+        faces = [move[0] for move in scramble.split()]
+        assert len(faces) == 20
+        assert all(b != a and b != OPPOSITE[a] for a, b in zip(faces, faces[1:])), scramble
+
+
+def test_random_states_are_solvable():
+    for facelets in random_states(500, np.random.default_rng(2)):
+        check_facelets(facelets)  # Raises ValueError for a twist, flip or parity error
+
+
+def test_random_state_scramble_reaches_its_state():
+    facelets, scramble = random_state_scramble(np.random.default_rng(3))
+    assert CubeState.from_moves(scramble.split()).to_string() == facelets
@@ -0,0 +1,80 @@
+import functools
+import itertools
+import sqlite3
+import types
+
+import pytest
+
+import solutioncache
+from cubecore import EDGE_FACELETS
+from cubestate import CubeState
+from solutioncache import SolutionCache, cached_solve
+
+
+@pytest.fixture
+def ticking_clock(monkeypatch):
+    """Every time.time() call is one second later, so last_used never ties."""
+    ticks = itertools.count()
+    monkeypatch.setattr(solutioncache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, ticking_clock):
+    cache = SolutionCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.get("a") == "A"  # a is now more recent than b and c
+    cache.put("d", "D")
+    assert [cache.get(key) for key in "abcd"] == ["A", None, "C", "D"]
+    assert cache.stats() == {"entries": 3, "hits": 4, "misses": 1}
+    cache.close()
+
+
+def test_cached_solve_calls_the_solver_once(tmp_path):
+    facelets = CubeState.from_moves("R U F'").to_string()
+    calls = []
+
+    def solver(facelet_string):
+        calls.append(facelet_string)
+        return "F U' R'"
+
+    path = str(tmp_path / "cache.sqlite3")
+    assert cached_solve(facelets, path, solver) == "F U' R'"
+    assert cached_solve(f" {facelets.lower()}\n", path, solver) == "F U' R'"  # Same normalized key
+    assert calls == [facelets]
+
+
+def test_solutions_are_kept_per_solver(tmp_path):
+    facelets = CubeState.from_moves("R U F'").to_string()
+    path = str(tmp_path / "cache.sqlite3")
+
+    def other_solver(facelet_string, time_budget_s=1.0):
+        return "F U' R'"
+
+    assert cached_solve(facelets, path, lambda facelet_string: "R R'  F U' R'") == "R R'  F U' R'"
+    assert cached_solve(facelets, path, other_solver) == "F U' R'"  # Not the lambda's entry
+    assert cached_solve(facelets, path, functools.partial(other_solver, time_budget_s=0.1)) == "F U' R'"
+    cache = SolutionCache(path)
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2}
+    cache.close()
+
+
+def test_entries_without_a_solver_are_dropped(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE solutions (facelets TEXT PRIMARY KEY, solution TEXT NOT NULL, last_used REAL NOT NULL)")
+    conn.execute("INSERT INTO solutions VALUES ('a', 'A', 0)")
+    conn.commit()
+    conn.close()
+    cache = SolutionCache(path)
+    assert cache.get("a") is None
+    cache.put("a", "B")
+    assert cache.get("a") == "B"
+    cache.close()
+
+
+def test_invalid_state_never_reaches_the_solver(tmp_path):
+    facelets = list(CubeState.from_moves("R U").to_string())
+    first, second = EDGE_FACELETS[0]
+    facelets[first], facelets[second] = facelets[second], facelets[first]  # One flipped edge
+    with pytest.raises(ValueError):
+        cached_solve("".join(facelets), str(tmp_path / "cache.sqlite3"), solver=lambda facelet_string: pytest.fail("solver called"))
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+import solve
+from costsolve import TIME_BUDGET_S, estimate_execution_ms
+from cubestate import CubeState
+
+
+def test_presolved_scramble_is_solved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Keeps the solution cache out of the repository
+    moves = "R U2 F' L D B2 R' U F2 D'".split()
+    (tmp_path / "cube_scramble_log.json").write_text(json.dumps({"scramble_string": " ".join(moves), "moves": moves}))
+
+    state = solve.scrambled_state(str(tmp_path / "cube_scramble_log.json"))
+    assert state == CubeState.from_moves(moves).to_string()
+    solution_data = solve.solve_state(state, time_budget_s=0.2)
+    assert solution_data["facelet_string"] == state
+    assert CubeState.from_moves(moves + solution_data["solution"].split()).is_solved()
+
+
+def test_presolve_budget_is_a_share_of_the_shuffle():
+    moves = "R U F".split()
+    assert solve.presolve_budget_s(moves) == pytest.approx(
+        solve.PRESOLVE_BUDGET_FRACTION * estimate_execution_ms(moves) / 1000)
+    assert solve.presolve_budget_s("R U F D L B".split() * 20) == TIME_BUDGET_S  # Capped for long shuffles
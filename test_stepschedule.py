@@ -0,0 +1,40 @@
+import pytest
+
+from stepschedule import MAX_SCHEDULE_ENTRIES, check_frame, crc16, decode_schedule, encode_schedule
+
+GROUPS = [[(0, 'CW', 1)], [(1, 'CCW', 2)], [(2, 'CW', 1), (5, 'CCW', 1)], [(3, 'CCW', 1), (0, 'CW', 2)]]
+
+
+def test_crc16_check_value():
+    assert crc16(b"123456789", 9) == 0x29B1  # CRC-16/CCITT-FALSE
+
+
+def test_round_trip():
+    groups, profile_ids = decode_schedule(encode_schedule(GROUPS, profile_id=2))
+    assert [sorted(group) for group in groups] == [sorted(group) for group in GROUPS]
+    assert profile_ids == [2] * len(GROUPS)
+
+
+def test_every_flipped_byte_is_detected():
+    frame = encode_schedule(GROUPS)
+    for index in range(len(frame)):
+        corrupt = bytearray(frame)
+        corrupt[index] ^= 0x10
+        with pytest.raises(ValueError):
+            check_frame(corrupt, len(corrupt))
+
+
+def test_truncated_frame():
+    frame = encode_schedule(GROUPS)
+    with pytest.raises(ValueError):
+        check_frame(frame[:-4], len(frame) - 4)
+
+
+@pytest.mark.parametrize("groups", [
+    [[(0, 'CW', 1), (0, 'CCW', 1)]],      # Same motor twice
+    [[(0, 'CW', 3)]],                     # Three quarter turns are sent as one CCW turn
+    [[(0, 'CW', 1)]] * (MAX_SCHEDULE_ENTRIES + 1),
+])
+def test_unencodable_schedules(groups):
+    with pytest.raises(ValueError):
+        encode_schedule(groups)
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from colorlut import ColorClassifier
+from stickergrid import locate_grid, sample_grid
+
+COLOR_RANGES = {
+    "Red": {"lower": [170, 120, 80], "upper": [8, 255, 255]},  # Hue wraps around 0/179
+    "Orange": {"lower": [9, 120, 80], "upper": [20, 255, 255]},
+    "Green": {"lower": [45, 120, 80], "upper": [85, 255, 255]},
+}
+STICKER = 30
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    config = tmp_path / "cube_config.json"
+    config.write_text(json.dumps(COLOR_RANGES))
+    return ColorClassifier(str(config))
+
+
+def face_frame(hues):
+    """HSV frame of a 3x3 face; each sticker is filled with the given hue(s), cycled per pixel."""
+    frame = np.zeros((3 * STICKER, 3 * STICKER, 3), dtype=np.uint8)
+    for index, sticker_hues in enumerate(hues):
+        row, col = divmod(index, 3)
+        cells = frame[row * STICKER:(row + 1) * STICKER, col * STICKER:(col + 1) * STICKER]
+        cells[..., 0] = np.resize(np.array(sticker_hues, dtype=np.uint8), (STICKER, STICKER))
+        cells[..., 1:] = 200
+    return frame
+
+
+def grid():
+    return locate_grid([(col * STICKER, row * STICKER, STICKER, STICKER, 0) for row in range(3) for col in range(3)])
+
+
+def test_red_patches_that_straddle_hue_zero(classifier):
+    # Red pixels on both sides of hue 0 plus a fifth of glare: the per-channel median hue was 90 (not red)
+    red = [2, 177, 2, 177, 90]
+    hues = [red] * 4 + [[60]] + [red] * 4
+    labels = sample_grid(face_frame(hues), grid(), classifier)
+    assert labels is not None
+    assert [classifier.color_name(label) for label in labels] == ["Red"] * 4 + ["Green"] + ["Red"] * 4
+
+
+def test_mixed_patch_drops_the_grid(classifier):
+    hues = [[60]] * 8 + [[60, 14, 100]]  # A third green, a third orange, a third nothing
+    assert sample_grid(face_frame(hues), grid(), classifier) is None
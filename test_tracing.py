@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from tracing import critical_thread, load_events, merge_intervals, overlap, self_times, summarize
+
+
+def event(name, category, ts_ms, dur_ms, pid=1, tid=1):
+    return {"name": name, "cat": category, "ph": "X", "ts": ts_ms * 1000, "dur": dur_ms * 1000, "pid": pid, "tid": tid}
+
+
+# Main thread: a run that solves, then waits on the network while the simulator's motor turns
+SPANS = [
+    event("run", "run", 0, 1000),
+    event("solve", "solve", 100, 300),
+    event("cache.get", "solve", 100, 50),
+    event("send", "network", 500, 400),
+    event("kociemba.solve", "solve", 150, 200, pid=2),
+    event("M0_CW_1", "motor", 600, 500, pid=3),
+]
+
+
+def by_name(events, values):
+    return {event["name"]: values[id(event)] / 1000 for event in events}
+
+
+def test_self_time_excludes_nested_spans():
+    assert by_name(SPANS, self_times(SPANS)) == {
+        "run": 300, "solve": 250, "cache.get": 50, "send": 400, "kociemba.solve": 200, "M0_CW_1": 500}
+
+
+def test_critical_thread_covers_the_most_time():
+    assert critical_thread(SPANS, self_times(SPANS)) == (1, 1)
+
+
+def test_motor_overlap():
+    motor = merge_intervals([event("a", "motor", 0, 10), event("b", "motor", 5, 10), event("c", "motor", 30, 5)])
+    assert motor == [[0, 15000], [30000, 35000]]
+    assert overlap(10000, 32000, motor) == 7000
+    assert overlap(15000, 30000, motor) == 0
+
+
+@pytest.mark.parametrize("suffix", [".jsonl", ".json"])
+def test_both_trace_formats_load(tmp_path, suffix):
+    path = tmp_path / f"run{suffix}"
+    if suffix == ".json":
+        path.write_text("[\n" + "".join(json.dumps(span) + ",\n" for span in SPANS))
+    else:
+        path.write_text("".join(json.dumps(span) + "\n" for span in SPANS))
+    assert load_events(str(path)) == SPANS
+
+
+def test_summary_splits_the_critical_path(tmp_path, capsys):
+    path = tmp_path / "run.jsonl"
+    path.write_text("".join(json.dumps(span) + "\n" for span in SPANS))
+    summarize(str(path))
+    output = capsys.readouterr().out
+    assert "6 spans from 3 processes, wall time 1100.0 ms" in output
+    critical_path = output.split("Critical path")[1].split("\n\n")[0].splitlines()[1:]
+    # The main thread's 1000 ms by category; 300 ms of the 400 ms network wait overlaps the motor
+    assert {line[:26].strip(): float(line[26:].split()[0]) for line in critical_path} == {
+        "run": 300.0, "solve": 300.0, "network (motor turning)": 300.0, "network": 100.0, "untraced": 100.0}
@@ -0,0 +1,30 @@
+import numpy as np
+
+import visionbench
+
+
+class FakeCapture:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+    def release(self):
+        pass
+
+
+def test_recorded_frames_are_raw(tmp_path, monkeypatch):
+    frames = [np.full((48, 64, 3), value, dtype=np.uint8) for value in (40, 80, 120)]
+    monkeypatch.setattr(visionbench, "open_camera", lambda: FakeCapture(frame.copy() for frame in frames))
+    monkeypatch.setattr(visionbench.cv2, "imshow", lambda name, image: None)
+    monkeypatch.setattr(visionbench.cv2, "waitKey", lambda delay: 255)
+    monkeypatch.setattr(visionbench.cv2, "destroyAllWindows", lambda: None)
+
+    visionbench.record(str(tmp_path))
+    replayed = list(visionbench.iter_frames(str(tmp_path)))
+    assert len(replayed) == len(frames)
+    for recorded, original in zip(replayed, frames):
+        assert np.array_equal(recorded, original)
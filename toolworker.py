@@ -0,0 +1,89 @@
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+
+# --- Persistent Tool Worker ---
+# gui.py used to start a fresh python3 for every click, paying interpreter startup plus
+# cold imports of cv2/numpy/kociemba each time, and froze while the tool ran. Instead, one
+# long-lived worker process imports the heavy modules in the background as soon as it
+# starts, and runs each tool's main() in-process when asked. The launcher only exchanges
+# small messages with it, so its Tk main loop never blocks.
+TOOL_MODULES = ["calibration", "visualdetection", "manualinput", "shuffle", "solve"]
+PRELOAD_MODULES = ["numpy", "cv2", "kociemba", "solutioncache", "cubestate", "costsolve"]
+
+
+def preload_modules(results):
+    """Imports the heavy modules ahead of the first click and reports how long each took."""
+    for name in PRELOAD_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            results.put(("preloaded", name, time.perf_counter() - started, None))
+        except Exception as e:
+            results.put(("preloaded", name, time.perf_counter() - started, repr(e)))
+
+
+def worker_main(jobs, results):
+    """Worker process: runs tools one after another, in the order they were requested."""
+    threading.Thread(target=preload_modules, args=(results,), daemon=True).start()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        tool, requested_at = job
+        started = time.time()
+        results.put(("started", tool, started - requested_at, None))
+        try:
+            module = importlib.import_module(tool)
+            module.main()
+            results.put(("finished", tool, time.time() - started, None))
+        except BaseException as e:  # A tool calling sys.exit() must not take the worker down
+            traceback.print_exc()
+            results.put(("failed", tool, time.time() - started, repr(e)))
+
+
+class ToolWorker:
+    """Owns the worker process and its job/result queues; used from the launcher's main thread."""
+
+    def __init__(self):
+        # 'spawn' gives the worker a clean interpreter, never a copy of the launcher's Tk state
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.jobs = None
+        self.results = None
+
+    def start(self):
+        self.jobs = self.context.Queue()
+        self.results = self.context.Queue()
+        # Not a daemon: tools may start processes of their own (e.g. costsolve's solver pool)
+        self.process = self.context.Process(target=worker_main, args=(self.jobs, self.results))
+        self.process.start()
+
+    def submit(self, tool):
+        """Queues a tool to run; restarts the worker first if a tool crashed it."""
+        if tool not in TOOL_MODULES:
+            raise ValueError(f"Unknown tool '{tool}'")
+        if self.process is None or not self.process.is_alive():
+            self.start()
+        self.jobs.put((tool, time.time()))
+
+    def poll(self):
+        """Returns all (event, name, seconds, error) messages received so far, without blocking."""
+        messages = []
+        while self.results is not None:
+            try:
+                messages.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.jobs.put(None)
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.terminate()
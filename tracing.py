@@ -0,0 +1,226 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# --- Stage Tracing ---
+# Spans around the expensive stages of a run (camera capture, pixel classification, sticker
+# detection, solving, network round trips, motor execution, sleeps), so we can see where
+# a run's time goes. Enable by pointing CUBE_TRACE at a file before starting a tool:
+#     CUBE_TRACE=run.jsonl python solve.py     one JSON event per line
+#     CUBE_TRACE=run.json  python solve.py     Chrome trace events (open in chrome://tracing or Perfetto)
+# Both formats hold the same complete ("ph": "X") events with wall-clock microsecond
+# timestamps, and are appended to as events happen, so pool workers and the simulator can
+# write into the same file. Summarize a run with:
+#     python tracing.py summary run.jsonl
+# When CUBE_TRACE is unset, span() hands out one shared no-op context manager and
+# @traced returns the function unchanged, so tracing costs nothing.
+TRACE_ENV = "CUBE_TRACE"
+
+_lock = threading.Lock()
+_file = None
+_chrome = False
+
+
+def enabled():
+    return _file is not None
+
+
+def enable(path):
+    """Starts appending trace events to path (.json = Chrome trace format, anything else = JSONL)."""
+    global _file, _chrome
+    _chrome = path.endswith(".json")
+    _file = open(path, "a", buffering=1)
+    if _chrome and _file.tell() == 0:
+        _file.write("[\n")  # Chrome's JSON array format allows the closing bracket to be missing
+    atexit.register(_file.close)
+
+
+def _write(event):
+    line = json.dumps(event, separators=(",", ":"))
+    with _lock:
+        _file.write(line + (",\n" if _chrome else "\n"))
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """Times a with-block and writes it as one complete trace event."""
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.wall_us = time.time() * 1000000
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        event = {"name": self.name, "cat": self.category, "ph": "X", "ts": round(self.wall_us, 1),
+                 "dur": round((time.perf_counter() - self.started) * 1000000, 1),
+                 "pid": os.getpid(), "tid": threading.get_ident()}
+        if self.args:
+            event["args"] = self.args
+        _write(event)
+        return False
+
+
+def span(name, category="run", **args):
+    """Context manager timing a stage; a shared no-op when tracing is disabled."""
+    if _file is None:
+        return _NO_SPAN
+    return Span(name, category, args)
+
+
+def traced(category, name=None):
+    """Decorator version of span(); leaves the function untouched when tracing is disabled at import."""
+    def decorate(function):
+        if _file is None:
+            return function
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(span_name, category, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def sleep(seconds, name="sleep"):
+    """time.sleep() recorded as a span."""
+    with span(name, "sleep"):
+        time.sleep(seconds)
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
+
+
+# --- Summary ---
+
+def load_events(path):
+    """Reads either trace format back into a list of complete events."""
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if line in ("", "[", "]"):
+                continue
+            event = json.loads(line)
+            if event.get("ph") == "X":
+                events.append(event)
+    return events
+
+
+def self_times(events):
+    """
+    Time of every event not covered by its nested child events (same process and thread).
+    Summed over a thread this is the thread's wall time split by stage with no double counting.
+    """
+    result = {}
+    by_thread = {}
+    for event in events:
+        by_thread.setdefault((event["pid"], event["tid"]), []).append(event)
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        stack = []
+        for event in thread_events:
+            while stack and event["ts"] >= stack[-1]["ts"] + stack[-1]["dur"]:
+                stack.pop()
+            result[id(event)] = event["dur"]
+            if stack:
+                result[id(stack[-1])] -= min(event["dur"], stack[-1]["ts"] + stack[-1]["dur"] - event["ts"])
+            stack.append(event)
+    return result
+
+
+def merge_intervals(events):
+    """Sorted, non-overlapping (start, end) intervals covered by the events."""
+    merged = []
+    for start, end in sorted((event["ts"], event["ts"] + event["dur"]) for event in events):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def overlap(start, end, intervals):
+    """Length of [start, end) covered by the merged intervals."""
+    return sum(max(0, min(end, stop) - max(start, begin)) for begin, stop in intervals)
+
+
+def critical_thread(events, self_us):
+    """The (pid, tid) whose spans cover the most time: the run's main line of work."""
+    coverage = {}
+    for event in events:
+        key = (event["pid"], event["tid"])
+        coverage[key] = coverage.get(key, 0) + self_us[id(event)]
+    return max(coverage, key=coverage.get)
+
+
+def summarize(path, top=15):
+    events = load_events(path)
+    if not events:
+        print(f"No trace events in {path}.")
+        return
+    start = min(event["ts"] for event in events)
+    end = max(event["ts"] + event["dur"] for event in events)
+    wall_ms = (end - start) / 1000
+    self_us = self_times(events)
+
+    print(f"{len(events)} spans from {len({event['pid'] for event in events})} processes, "
+          f"wall time {wall_ms:.1f} ms")
+
+    # Critical path: the main thread's time split into stages (self time) plus untraced gaps
+    main = critical_thread(events, self_us)
+    main_events = [event for event in events if (event["pid"], event["tid"]) == main]
+    # Waiting on the robot while its motors turn (motor spans come from simulator.py) is motor
+    # time; the rest of a network wait is transfer, parsing and protocol overhead
+    motor = merge_intervals([event for event in events if event["cat"] == "motor"])
+    by_category = {}
+    for event in main_events:
+        category, us = event["cat"], self_us[id(event)]
+        if category == "network" and motor:
+            motor_us = min(overlap(event["ts"], event["ts"] + event["dur"], motor), us)
+            by_category["network (motor turning)"] = by_category.get("network (motor turning)", 0) + motor_us
+            us -= motor_us
+        by_category[category] = by_category.get(category, 0) + us
+    traced_ms = sum(by_category.values()) / 1000
+    print(f"\nCritical path (pid {main[0]}, main line of work):")
+    for category, us in sorted(by_category.items(), key=lambda item: -item[1]):
+        print(f"  {category:<24} {us / 1000:10.1f} ms  {100 * us / 1000 / wall_ms:5.1f}%")
+    print(f"  {'untraced':<24} {max(wall_ms - traced_ms, 0):10.1f} ms  {100 * max(wall_ms - traced_ms, 0) / wall_ms:5.1f}%")
+
+    # Busiest spans over all processes and threads
+    by_name = {}
+    for event in events:
+        total, self_total, count, longest = by_name.get((event["cat"], event["name"]), (0, 0, 0, 0))
+        by_name[(event["cat"], event["name"])] = (total + event["dur"], self_total + self_us[id(event)],
+                                                  count + 1, max(longest, event["dur"]))
+    print(f"\n{'category':<10} {'span':<32} {'count':>6} {'total ms':>10} {'self ms':>10} {'mean ms':>9} {'max ms':>9}")
+    for (category, name), (total, self_total, count, longest) in sorted(by_name.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"{category:<10} {name[:32]:<32} {count:6d} {total / 1000:10.1f} {self_total / 1000:10.1f} "
+              f"{total / count / 1000:9.2f} {longest / 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "summary":
+        print("Usage: python tracing.py summary <trace.jsonl|trace.json>")
+        sys.exit(1)
+    summarize(sys.argv[2])
@@ -0,0 +1,175 @@
+import collections
+import threading
+import time
+
+import cv2
+
+from tracing import span
+
+# --- Threaded Video Pipeline ---
+# capture thread -> [latest frame] -> processing thread -> [results] -> UI (main thread)
+# Reading, processing and displaying used to run one after another on one thread, so a
+# slow frame let the camera's own buffer fill up and everything shown afterwards was old.
+# Now the capture thread keeps reading at camera speed and only the newest frame waits
+# for the processing thread; the UI shows the newest result. Both hand-overs are bounded
+# queues that drop their oldest entry instead of blocking. OpenCV windows and trackbars
+# stay on the main thread, where HighGUI expects them.
+CAMERA_INDEX = 2
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+CAMERA_FPS = 30
+CAMERA_BUFFER_SIZE = 1  # Frames the driver may queue; 1 keeps capture latency minimal
+RESULT_QUEUE_SIZE = 2
+STATS_WINDOW = 60       # Events used for the rolling FPS / latency figures
+
+Processed = collections.namedtuple("Processed", ["frame_id", "captured_at", "processed_at", "frame", "result"])
+
+
+def open_camera(source=CAMERA_INDEX):
+    """Opens a camera index (or a video file path) with low-latency capture settings."""
+    cap = cv2.VideoCapture(source)
+    if isinstance(source, int):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, CAMERA_BUFFER_SIZE)
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))  # Compressed frames keep USB 2 cameras at full FPS
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
+    return cap
+
+
+class DropOldestQueue:
+    """Bounded thread-safe queue; put() never blocks and discards the oldest item when full."""
+
+    def __init__(self, maxsize):
+        self.items = collections.deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, or None if nothing arrived within the timeout."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items, timeout):
+                return None
+            return self.items.popleft()
+
+    def get_latest(self, timeout=None):
+        """Newest item (older ones are dropped), or None if nothing arrived within the timeout."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items, timeout):
+                return None
+            self.dropped += len(self.items) - 1
+            item = self.items.pop()
+            self.items.clear()
+            return item
+
+
+class RateMeter:
+    """Rolling events per second plus, optionally, a rolling mean/max of latencies."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.times = collections.deque(maxlen=window)
+        self.latencies = collections.deque(maxlen=window)
+        self.count = 0
+
+    def tick(self, latency=None):
+        self.times.append(time.perf_counter())
+        self.count += 1
+        if latency is not None:
+            self.latencies.append(latency)
+
+    def fps(self):
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+    def latency_ms(self):
+        """(mean, max) of the recent latencies in milliseconds."""
+        if not self.latencies:
+            return 0.0, 0.0
+        return 1000 * sum(self.latencies) / len(self.latencies), 1000 * max(self.latencies)
+
+
+class VideoPipeline:
+    """
+    Runs capture and process(frame) -> result on background threads. The caller's UI loop
+    fetches the newest Processed tuple with latest() and reports it with displayed().
+    """
+
+    def __init__(self, process, source=CAMERA_INDEX, result_queue_size=RESULT_QUEUE_SIZE):
+        self.process = process
+        self.source = source
+        self.frames = DropOldestQueue(1)  # Only the latest captured frame waits for processing
+        self.results = DropOldestQueue(result_queue_size)
+        self.meters = {"capture": RateMeter(), "process": RateMeter(), "display": RateMeter()}
+        self.running = False
+        self.finished = threading.Event()  # Set when the source runs out of frames
+        self.threads = []
+        self.cap = None
+
+    def start(self):
+        self.cap = open_camera(self.source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video source {self.source}")
+        self.running = True
+        self.threads = [threading.Thread(target=self._capture_loop, daemon=True),
+                        threading.Thread(target=self._process_loop, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=2)
+        if self.cap is not None:
+            self.cap.release()
+
+    def _capture_loop(self):
+        frame_id = 0
+        while self.running:
+            with span("camera.read", "vision"):
+                ret, frame = self.cap.read()
+            if not ret:
+                print("Failed to grab frame")
+                break
+            self.frames.put((frame_id, time.perf_counter(), frame))
+            self.meters["capture"].tick()
+            frame_id += 1
+        self.finished.set()
+
+    def _process_loop(self):
+        while self.running:
+            item = self.frames.get(timeout=0.1)
+            if item is None:
+                if self.finished.is_set():
+                    break
+                continue
+            frame_id, captured_at, frame = item
+            with span("process_frame", "vision", frame_id=frame_id):
+                result = self.process(frame)
+            processed_at = time.perf_counter()
+            self.meters["process"].tick(processed_at - captured_at)  # Capture-to-label latency
+            self.results.put(Processed(frame_id, captured_at, processed_at, frame, result))
+
+    def latest(self, timeout=0.05):
+        """Newest processed frame, or None if none arrived within the timeout."""
+        return self.results.get_latest(timeout)
+
+    def displayed(self, processed):
+        """Records that a processed frame reached the screen (capture-to-display latency)."""
+        self.meters["display"].tick(time.perf_counter() - processed.captured_at)
+
+    def report(self):
+        """One line of per-stage FPS, latencies and dropped frames, for overlays and logs."""
+        label_mean, label_max = self.meters["process"].latency_ms()
+        display_mean, _ = self.meters["display"].latency_ms()
+        return (f"cap {self.meters['capture'].fps():.0f} / proc {self.meters['process'].fps():.0f} / "
+                f"ui {self.meters['display'].fps():.0f} fps | label {label_mean:.0f} ms (max {label_max:.0f}), "
+                f"display {display_mean:.0f} ms | dropped {self.frames.dropped + self.results.dropped}")
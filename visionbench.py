@@ -0,0 +1,246 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from colorlut import find_stickers, get_classifier
+from facevoter import FaceVoter
+from videopipeline import open_camera
+from visualdetection import FaceScanner, detect_and_label_colors, preprocess_frame, sort_detected
+
+# --- Vision Replay Benchmark ---
+# Records raw camera sessions and replays them headlessly, as fast as possible, through the
+# detection stages. The replay reports time per stage, throughput, and how well the
+# detections agree with a ground truth (a cube_detected.json of the scanned cube). No camera
+# or display is needed, so the benchmark is reproducible and can gate vision changes on CI.
+#
+# A session is a directory holding either chunked frames (frames_0000.npz, ...) or one
+# compressed video (frames.avi), plus keys.json: [[frame index, key code], ...].
+# Usage:  python visionbench.py record sessions/scan1 [--video] [--seconds 60]
+#         python visionbench.py replay sessions/scan1 --truth cube_detected.json [--scanner] [--min-agreement 0.95]
+CHUNK_FRAMES = 100  # Frames per .npz chunk
+KEYS_FILE = "keys.json"
+VIDEO_FILE = "frames.avi"
+
+
+# --- Recording ---
+
+def record(session_dir, use_video=False, seconds=None):
+    """Shows the camera and stores every frame plus keypresses until ESC (or the time limit)."""
+    os.makedirs(session_dir, exist_ok=True)
+    cap = open_camera()
+    keys = []
+    chunk = []
+    chunk_index = 0
+    writer = None
+    frame_index = 0
+    started = time.time()
+
+    def flush():
+        nonlocal chunk, chunk_index
+        if chunk:
+            np.savez_compressed(os.path.join(session_dir, f"frames_{chunk_index:04d}.npz"), frames=np.stack(chunk))
+            chunk = []
+            chunk_index += 1
+
+    while seconds is None or time.time() - started < seconds:
+        ret, frame = cap.read()
+        if not ret:
+            print("Failed to grab frame")
+            break
+        if use_video:
+            if writer is None:
+                writer = cv2.VideoWriter(os.path.join(session_dir, VIDEO_FILE), cv2.VideoWriter_fourcc(*"MJPG"),
+                                         30, (frame.shape[1], frame.shape[0]))
+            writer.write(frame)
+        else:
+            chunk.append(frame)
+            if len(chunk) == CHUNK_FRAMES:
+                flush()
+
+        preview = frame.copy()  # The stored frame stays raw; the overlay is only shown
+        cv2.putText(preview, f"REC {frame_index}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv2.imshow("Recording", preview)
+        key = cv2.waitKey(1) & 0xFF
+        if key != 255:
+            keys.append([frame_index, key])
+        frame_index += 1
+        if key == 27:  # ESC key
+            break
+
+    flush()
+    if writer is not None:
+        writer.release()
+    cap.release()
+    cv2.destroyAllWindows()
+    with open(os.path.join(session_dir, KEYS_FILE), "w") as f:
+        json.dump(keys, f)
+    print(f"Recorded {frame_index} frames and {len(keys)} keypresses to {session_dir}")
+
+
+def iter_frames(session):
+    """Yields the frames of a session directory (npz chunks or frames.avi) or of a video file."""
+    video = session if os.path.isfile(session) else os.path.join(session, VIDEO_FILE)
+    if os.path.isfile(video):
+        cap = cv2.VideoCapture(video)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+        cap.release()
+        return
+    for path in sorted(glob.glob(os.path.join(session, "frames_*.npz"))):
+        with np.load(path) as chunk:
+            yield from chunk["frames"]
+
+
+def load_keys(session):
+    path = os.path.join(session, KEYS_FILE) if os.path.isdir(session) else None
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return {frame_index: key for frame_index, key in json.load(f)}
+
+
+# --- Replay ---
+
+class StageTimer:
+    """Accumulates wall time per named stage."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    def run(self, stage, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - started
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        return result
+
+
+def detect_full(timer, frame):
+    """The full per-frame path, timed stage by stage."""
+    resized, hsv = timer.run("preprocess", preprocess_frame, frame)
+    classifier = get_classifier()
+    label_image = timer.run("classify", classifier.classify, hsv)
+    stickers = timer.run("stickers", find_stickers, label_image)
+    _, detected = timer.run("label", detect_and_label_colors, resized, stickers, classifier)
+    return detected
+
+
+def face_agreement(colors, truth):
+    """(face name, matching stickers out of 9) against the ground truth, by center color."""
+    for face, truth_colors in truth.items():
+        if truth_colors[4] == colors[4]:
+            return face, sum(a == b for a, b in zip(colors, truth_colors))
+    return None, 0
+
+
+def replay(session, truth=None, use_scanner=False):
+    """Runs every recorded frame through detection; returns a report dictionary."""
+    timer = StageTimer()
+    scanner = FaceScanner() if use_scanner else None
+    voter = FaceVoter()
+    keys = load_keys(session)
+    frames = full_faces = exact = matched = compared = 0
+    captures = {}
+    key_captures = []
+
+    started = time.perf_counter()
+    for frame_index, frame in enumerate(iter_frames(session)):
+        frames += 1
+        if scanner is not None:
+            _, _, detected = timer.run("scan", scanner.process, frame)
+        else:
+            detected = detect_full(timer, frame)
+
+        colors = None
+        if len(detected) == 9:
+            colors = timer.run("sort", sort_detected, [(x, y, color.lower()) for x, y, color in detected])
+            full_faces += 1
+            if truth:
+                face, agree = face_agreement(colors, truth)
+                compared += 9
+                matched += agree
+                exact += agree == 9
+        captured = timer.run("vote", voter.update, colors)
+        if captured is not None:
+            captures[captured[0]] = captured[1]
+        if keys.get(frame_index) == 32:  # SPACE during recording: what a manual capture would have stored
+            key_captures.append((frame_index, colors))
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "stage_ms": {stage: 1000 * total / max(timer.counts[stage], 1) for stage, total in timer.totals.items()},
+        "full_face_frames": full_faces,
+        "auto_captured_faces": sorted(captures),
+    }
+    if truth:
+        report["sticker_agreement"] = matched / compared if compared else 0.0
+        report["exact_face_frames"] = exact
+        report["auto_capture_correct"] = sum(truth.get(face) == colors for face, colors in captures.items())
+        report["space_presses_correct"] = sum(colors is not None and face_agreement(colors, truth)[1] == 9
+                                              for _, colors in key_captures)
+        report["space_presses"] = len(key_captures)
+    return report
+
+
+def print_report(report):
+    print(f"Frames: {report['frames']} in {report['seconds']:.2f} s ({report['fps']:.1f} frames/s)")
+    for stage, ms in report["stage_ms"].items():
+        print(f"  {stage:<10} {ms:8.3f} ms/frame")
+    print(f"Full faces detected in {report['full_face_frames']} frames; auto-captured: {', '.join(report['auto_captured_faces']) or '-'}")
+    if "sticker_agreement" in report:
+        print(f"Sticker agreement with ground truth: {100 * report['sticker_agreement']:.1f}% "
+              f"({report['exact_face_frames']} exact frames)")
+        print(f"Auto-captures correct: {report['auto_capture_correct']}/{len(report['auto_captured_faces'])}, "
+              f"SPACE presses correct: {report['space_presses_correct']}/{report['space_presses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record camera sessions and replay them through the vision pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rec = commands.add_parser("record", help="Record a session from the camera")
+    rec.add_argument("session", help="Session directory")
+    rec.add_argument("--video", action="store_true", help="Store a compressed video instead of .npz chunks")
+    rec.add_argument("--seconds", type=float, default=None, help="Stop after this many seconds")
+    rep = commands.add_parser("replay", help="Replay a session headlessly and report timings")
+    rep.add_argument("session", help="Session directory or video file")
+    rep.add_argument("--truth", default=None, help="Ground truth cube_detected.json")
+    rep.add_argument("--scanner", action="store_true", help="Replay through FaceScanner (ROI tracking + grid fast path)")
+    rep.add_argument("--json", action="store_true", help="Print the report as JSON")
+    rep.add_argument("--min-agreement", type=float, default=None, help="Exit with 1 below this sticker agreement (0-1)")
+    rep.add_argument("--min-fps", type=float, default=None, help="Exit with 1 below this replay throughput")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.session, args.video, args.seconds)
+        return
+
+    truth = None
+    if args.truth:
+        with open(args.truth, "r") as f:
+            truth = json.load(f)
+    report = replay(args.session, truth, args.scanner)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
+
+    failed = (args.min_agreement is not None and report.get("sticker_agreement", 0.0) < args.min_agreement) or \
+             (args.min_fps is not None and report["fps"] < args.min_fps)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
 import cv2
 import numpy as np
 import json
-import kociemba
-
+import os
+from cubecore import DEFAULT_CENTER_COLORS
+from colorlut import COLORS_BGR, find_stickers, get_classifier
+from stickergrid import LOCATE_SCALE_PERCENT, ROI_MARGIN, ROI_MAX_MISSES, expand_box, locate_face, locate_grid, sample_grid
+from videopipeline import VideoPipeline
+from facevoter import FaceVoter
+from tracing import span, traced
+from solve import solve_faces
+
+CAMERA_CONFIG = "cube_cameras.json" # If present, scan with the cameras listed in it instead of camera 2
+TRACK_ROI = True # Locate the face on a downscaled frame, then process only its region (see stickergrid.py)
+
+@traced("vision")
 def preprocess_frame(frame, scale_percent=100):
     width = int(frame.shape[1] * scale_percent / 100)
     height = int(frame.shape[0] * scale_percent / 100)
@@ -11,49 +22,45 @@ def preprocess_frame(frame, scale_percent=100):
     hsv = cv2.cvtColor(resized, cv2.COLOR_BGR2HSV)
     return resized, hsv
 
-def get_color_masks(hsv_frame):
-    with open("cube_config.json", "r") as f:
-        color_ranges = json.load(f)
-
-    masks = {}
-    kernel = np.ones((5, 5), np.uint8)
-
-    for color, ranges in color_ranges.items():
-        lower = np.array(ranges["lower"], dtype=np.uint8)
-        upper = np.array(ranges["upper"], dtype=np.uint8)
-
-        mask = cv2.inRange(hsv_frame, lower, upper)
-        mask = cv2.dilate(mask, kernel, iterations=1)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+def draw_sticker(frame, x, y, w, h, color_name):
+    color_bgr = COLORS_BGR.get(color_name, (255, 255, 255))
+    cv2.rectangle(frame, (x, y), (x + w, y + h), color_bgr, 2)
+    cv2.putText(frame, color_name.lower(), (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color_bgr, 2)
 
-        masks[color] = mask
-
-    return masks
-
-def detect_and_label_colors(frame, masks):
+def detect_and_label_colors(frame, stickers, classifier):
     detected = []
-    colors_bgr = {
-        "Red": (0, 0, 255),
-        "Blue": (255, 0, 0),
-        "Yellow": (0, 255, 255),
-        "Green": (0, 255, 0),
-        "Orange": (0, 128, 255),
-        "White": (255, 255, 255)
-    }
-
-    for color_name, mask in masks.items():
-        contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 2000:
-                x, y, w, h = cv2.boundingRect(contour)
-                detected.append((x, y, color_name))
-                cv2.rectangle(frame, (x, y), (x + w, y + h), colors_bgr[color_name], 2)
-                cv2.putText(frame, color_name.lower(), (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, colors_bgr[color_name], 2)
+
+    for x, y, w, h, label in stickers:
+        color_name = classifier.color_name(label)
+        detected.append((x, y, color_name))
+        draw_sticker(frame, x, y, w, h, color_name)
 
     return frame, detected
 
+def detect_face(frame, hsv_frame, grid=None):
+    """
+    Detects the stickers of one frame. While a located grid still classifies consistently
+    only its nine patches are sampled (see stickergrid.py); otherwise every pixel is
+    labelled with the lookup table (see colorlut.py) and the grid is located again.
+    Returns (frame, detected, grid).
+    """
+    classifier = get_classifier() # Only re-read when cube_config.json changes
+    if grid is not None:
+        with span("sample_grid", "vision"):
+            labels = sample_grid(hsv_frame, grid, classifier)
+        if labels is not None:
+            stickers = [(x, y, w, h, label) for (x, y, w, h), label in zip(grid.boxes, labels)]
+            frame, detected = detect_and_label_colors(frame, stickers, classifier)
+            return frame, detected, grid
+
+    # Full path: one connected-components pass over the label image
+    with span("classify", "vision"):
+        label_image = classifier.classify(hsv_frame)
+    with span("find_stickers", "vision"):
+        stickers = find_stickers(label_image)
+    frame, detected = detect_and_label_colors(frame, stickers, classifier)
+    return frame, detected, locate_grid(stickers)
+
 def sort_detected(detected):
     # Sort top-to-bottom first
     detected = sorted(detected, key=lambda item: item[1])
@@ -86,107 +93,135 @@ def solve_from_json(json_path="cube_detected.json"):
         with open(json_path, "r") as file:
             cube_data = json.load(file)
 
-        # Map file face names to Kociemba face letters
-        face_order = {
-            'Top': 'U',
-            'Right': 'R',
-            'Front': 'F',
-            'Bottom': 'D',
-            'Left': 'L',
-            'Back': 'B'
-        }
-
-        # Use center colors to map actual face colors
-        center_colors = {}
-        for face, squares in cube_data.items():
-            center_color = squares[4]  # center piece is always at index 4
-            center_colors[center_color] = face_order[face]
-
-        # Build the full facelet string in URFDLB order
-        facelet_string = ""
-        kociemba_order = ['Top', 'Right', 'Front', 'Bottom', 'Left', 'Back']
-
-        for face in kociemba_order:
-            for color in cube_data[face]:
-                face_label = center_colors.get(color, 'X')
-                facelet_string += face_label
-
-        if 'X' in facelet_string or len(facelet_string) != 54:
-            raise ValueError("Color mapping incomplete or cube data invalid.")
-
-        # Solve and show result
-        solution = kociemba.solve(facelet_string)
-        solution_data = {
-            "facelet_string": facelet_string,
-            "solution": solution
-        }
-        with open("cube_solution.json", "w") as f:
-            json.dump(solution_data, f, indent=4)
-
-        return solution
+        # Checks the scan, then picks the solution our robot executes fastest (see solve.py)
+        return solve_faces(cube_data)["solution"]
 
     except Exception as e:
         print("Error:", f"Could not solve the cube:\n{e}")
         return None
 
+class FaceScanner:
+    """
+    Processing stage of the video pipeline. Keeps the located grid between frames and,
+    with track_roi, the face's region of interest so background pixels are never processed.
+    """
+
+    def __init__(self, track_roi=TRACK_ROI):
+        self.track_roi = track_roi
+        self.grid = None # Located 3x3 sticker grid; lets most frames skip the full detection
+        self.roi = None  # (x0, y0, x1, y1) of the tracked face; the grid is relative to it
+        self.misses = 0
+
+    def process(self, frame):
+        if not self.track_roi:
+            resized, hsv = preprocess_frame(frame)
+            result_frame, detected, self.grid = detect_face(resized.copy(), hsv, self.grid)
+            return resized, result_frame, detected
+
+        if self.roi is None:
+            _, small_hsv = preprocess_frame(frame, LOCATE_SCALE_PERCENT)
+            with span("locate_face", "vision"):
+                self.roi = locate_face(small_hsv, get_classifier(), LOCATE_SCALE_PERCENT, frame.shape)
+            self.grid = None
+            self.misses = 0
+            if self.roi is None:
+                return frame, frame.copy(), []
+
+        x0, y0, x1, y1 = self.roi
+        result_frame = frame.copy()
+        hsv = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2HSV)
+        # Draws straight into result_frame, since the slice is a view
+        _, detected, grid = detect_face(result_frame[y0:y1, x0:x1], hsv, self.grid)
+        cv2.rectangle(result_frame, (x0, y0), (x1 - 1, y1 - 1), (128, 128, 128), 1)
+        detected = [(x + x0, y + y0, color_name) for x, y, color_name in detected]
+
+        if grid is None:
+            self.misses += 1
+            if self.misses >= ROI_MAX_MISSES:
+                self.roi = None # Lost the face: search the downscaled frame again
+            self.grid = None
+        elif grid is not self.grid:
+            # Freshly located grid: re-centre the ROI on it
+            in_frame = grid.shifted(x0, y0)
+            self.roi = expand_box(in_frame.boxes, ROI_MARGIN, frame.shape)
+            self.grid = in_frame.shifted(-self.roi[0], -self.roi[1])
+            self.misses = 0
+        return frame, result_frame, detected
+
 def main():
-    cap = cv2.VideoCapture(2)
+    if os.path.exists(CAMERA_CONFIG):
+        # Several cameras configured: scan them all at once (see multicamera.py)
+        import multicamera
+        multicamera.run(CAMERA_CONFIG)
+        return
+
+    # Capture and detection run on their own threads (see videopipeline.py); this loop only
+    # shows the newest result, votes on it and handles keys
+    scanner = FaceScanner()
+    pipeline = VideoPipeline(scanner.process).start()
+    voter = FaceVoter() # Captures a face once its colors are stable (see facevoter.py)
     faces_data = {}
-    face_order = ["Front", "Back", "Left", "Right", "Top", "Bottom"]
-    face_index = 0
+    detected = []
 
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame")
+        processed = pipeline.latest()
+        if processed is None and pipeline.finished.is_set():
             break
 
-        resized, hsv = preprocess_frame(frame)
-        masks = get_color_masks(hsv)
-        result_frame, detected = detect_and_label_colors(resized, masks)
+        captured = None
+        if processed is not None:
+            resized, result_frame, detected = processed.result
+            colors = None
+            if len(detected) == 9:
+                colors = sort_detected([(x, y, color.lower()) for (x, y, color) in detected])
+            captured = voter.update(colors)
+
+            # Show which faces are still missing and how close the current one is to being captured
+            missing = [face for face in DEFAULT_CENTER_COLORS if face not in faces_data]
+            if missing:
+                text = f"Show any face: {len(missing)} left, hold still ({voter.progress():.0%})"
+            else:
+                text = "All faces scanned. Press ESC."
 
-        # Show which face you are scanning
-        if face_index < len(face_order):
-            text = f"Scanning: {face_order[face_index]} (Press SPACE)"
-        else:
-            text = "All faces scanned. Press ESC."
-        
-        cv2.putText(result_frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+            cv2.putText(result_frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(result_frame, pipeline.report(), (10, result_frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
 
-        cv2.imshow("Original Frame", resized)
-        cv2.imshow("Color Detection", result_frame)
+            cv2.imshow("Original Frame", resized)
+            cv2.imshow("Color Detection", result_frame)
+            pipeline.displayed(processed)
 
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
 
         if key == 27:  # ESC key
             break
-        elif key == 32:  # SPACE key
+        elif key == 32 and captured is None:  # SPACE key: capture the current frame right away
             if len(detected) != 9:
                 print(f"⚠️ Only {len(detected)} colors detected! Make sure 9 colors are visible.")
                 continue
+            sorted_colors = sort_detected([(x, y, color.lower()) for (x, y, color) in detected])
+            face_name = voter.center_to_face.get(sorted_colors[4])
+            if face_name is None:
+                print(f"⚠️ Unknown center color '{sorted_colors[4]}'.")
+                continue
+            captured = face_name, sorted_colors
 
-            detected = [(x, y, color.lower()) for (x, y, color) in detected]
-            sorted_colors = sort_detected(detected)[:9]
-            if face_index < len(face_order):
-                face_name = face_order[face_index]
-                faces_data[face_name] = sorted_colors
-                print(f"✅ Saved Face '{face_name}': {sorted_colors}")
-                face_index += 1
-
-                if face_index == len(face_order):  # After capturing all faces
-                    # Save faces
-                    with open("cube_detected.json", "w") as f:
-                        json.dump(faces_data, f, indent=4)
-                    print("🎯 All faces saved to cube_detected.json!")
+        if captured is not None:
+            face_name, sorted_colors = captured
+            faces_data[face_name] = sorted_colors
+            print(f"✅ Saved Face '{face_name}': {sorted_colors}")
 
-                    # Solve cube
-                    solution = solve_from_json()
-                    print("🧩 Solution:", solution)
+            if len(faces_data) == len(DEFAULT_CENTER_COLORS):  # After capturing all faces (or rescanning one)
+                # Save faces
+                with open("cube_detected.json", "w") as f:
+                    json.dump(faces_data, f, indent=4)
+                print("🎯 All faces saved to cube_detected.json!")
 
-            else:
-                print("✅ All 6 faces already recorded.")
+                # Solve cube
+                solution = solve_from_json()
+                print("🧩 Solution:", solution)
 
-    cap.release()
+    print("Pipeline:", pipeline.report())
+    pipeline.stop()
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":